@@ -0,0 +1,279 @@
+"""Benchmark de carga da API do Grupo do Porão.
+
+Sobe a aplicação contra um banco SQLite temporário, popula campanhas
+realistas e dispara os principais fluxos em paralelo, reportando vazão e
+latências p50/p99 por cenário.
+
+Uso:
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --concurrency 16 --requests 500 --json resultado.json
+    python benchmarks/load_test.py --baseline resultado.json --max-regression 0.2
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+from src.app import create_app
+from src.config import Config
+from src.database import upgrade_database
+from src.models.user import db, User, Player, Note, DiceRoll
+from src.security import hash_password
+
+MASTER_PASSWORD = 'mestre123'
+PLAYER_PASSWORD = 'jogador123'
+
+ITEMS = ['Espada longa', 'Escudo', 'Poção de cura', 'Corda (15m)', 'Tocha', 'Chave de ferro', 'Arco curto', 'Flechas (20)', 'Mapa antigo', 'Amuleto']
+DEBUFFS = ['Envenenado', 'Atordoado', 'Cego', 'Amedrontado', 'Sangrando', 'Exausto']
+THEMES = ['lore', 'sessao', 'npc', 'mapa', 'combate']
+WORDS = ('dragão taverna porão masmorra espada goblin rei castelo floresta tesouro '
+         'maldição ritual portal runa cripta vila mercador guarda torre sombra').split()
+
+def benchmark_config(database_path, real_hash):
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{database_path}'
+        SESSION_FILE_DIR = os.path.join(os.path.dirname(database_path), 'sessions')
+        RESET_TOKEN_STORE = 'memory'
+        METRICS_ENABLED = False
+        PROFILE_SLOW_REQUESTS_MS = 0
+        # Sem limite de tentativas: todos os clientes vêm do mesmo IP
+        LOGIN_MAX_ATTEMPTS_PER_IP = 10 ** 9
+        LOGIN_MAX_ATTEMPTS_PER_USER = 10 ** 9
+
+    if not real_hash:
+        BenchmarkConfig.PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    return BenchmarkConfig
+
+def seed(app, args, rng):
+    """Popula mestres, jogadores, notas e histórico de dados"""
+    masters = []
+    with app.app_context():
+        master_hash = hash_password(MASTER_PASSWORD)
+        player_hash = hash_password(PLAYER_PASSWORD)
+
+        for m in range(args.masters):
+            user = User(username=f'mestre{m}', email=f'mestre{m}@porao.test', password_hash=master_hash)
+            db.session.add(user)
+            db.session.flush()
+
+            players = []
+            for p in range(args.players):
+                player = Player(
+                    name=f'Personagem {m}-{p}', age=rng.randint(16, 80), money=rng.randint(0, 5000),
+                    health=rng.randint(1, 100), mana=rng.randint(0, 100), vigor=rng.randint(0, 100),
+                    master_id=user.id, player_username=f'jogador{m}_{p}', player_password_hash=player_hash
+                )
+                player.set_items(rng.sample(ITEMS, rng.randint(2, len(ITEMS))))
+                player.set_debuffs(rng.sample(DEBUFFS, rng.randint(0, 3)))
+                players.append(player)
+            db.session.add_all(players)
+            db.session.flush()
+
+            db.session.add_all([
+                Note(
+                    title=f'Nota {n} - {rng.choice(WORDS)}',
+                    content=' '.join(rng.choice(WORDS) for _ in range(rng.randint(50, 600))),
+                    theme=rng.choice(THEMES), master_id=user.id
+                )
+                for n in range(args.notes)
+            ])
+
+            now = datetime.utcnow()
+            dice_types = (4, 20, 100)
+            db.session.execute(db.insert(DiceRoll), [
+                {
+                    'dice_type': (dice_type := rng.choice(dice_types)),
+                    'result': rng.randint(1, dice_type),
+                    'master_id': user.id,
+                    'player_id': rng.choice(players).id,
+                    'created_at': now - timedelta(seconds=r)
+                }
+                for r in range(args.rolls)
+            ])
+
+            masters.append({
+                'username': user.username,
+                'player_ids': [player.id for player in players],
+                'player_usernames': [player.player_username for player in players]
+            })
+        db.session.commit()
+    return masters
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+class Scenario:
+    def __init__(self, name, prepare, run):
+        self.name = name
+        self.prepare = prepare
+        self.run = run
+
+def master_client(app, master):
+    client = app.test_client()
+    response = client.post('/api/auth/login', json={'username': master['username'], 'password': MASTER_PASSWORD})
+    assert response.status_code == 200, response.data
+    return client
+
+def player_client(app, master, rng):
+    client = app.test_client()
+    username = rng.choice(master['player_usernames'])
+    response = client.post('/api/auth/login-player', json={'username': username, 'password': PLAYER_PASSWORD})
+    assert response.status_code == 200, response.data
+    return client
+
+def build_scenarios(app, masters):
+    def login(client, master, rng):
+        return client.post('/api/auth/login', json={'username': master['username'], 'password': MASTER_PASSWORD})
+
+    def roll_dice(client, master, rng):
+        return client.post('/api/dice/roll', json={'dice_type': rng.choice((4, 20, 100))})
+
+    def dice_history(client, master, rng):
+        return client.get('/api/dice/history')
+
+    def get_players(client, master, rng):
+        return client.get('/api/players')
+
+    def update_status(client, master, rng):
+        player_id = rng.choice(master['player_ids'])
+        return client.put(f'/api/players/{player_id}/status', json={'health': rng.randint(0, 100)})
+
+    def get_notes(client, master, rng):
+        return client.get('/api/notes')
+
+    return [
+        Scenario('login', lambda master, rng: app.test_client(), login),
+        Scenario('roll_dice', lambda master, rng: player_client(app, master, rng), roll_dice),
+        Scenario('get_dice_history', lambda master, rng: master_client(app, master), dice_history),
+        Scenario('get_players', lambda master, rng: master_client(app, master), get_players),
+        Scenario('update_player_status', lambda master, rng: master_client(app, master), update_status),
+        Scenario('get_notes', lambda master, rng: master_client(app, master), get_notes),
+    ]
+
+def run_scenario(scenario, masters, args, seed_value):
+    """Executa um cenário com args.concurrency clientes em paralelo"""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    per_worker = max(1, args.requests // args.concurrency)
+
+    def worker(index):
+        rng = random.Random(seed_value + index)
+        master = masters[index % len(masters)]
+        client = scenario.prepare(master, rng)
+        local = []
+        local_errors = 0
+        for _ in range(per_worker):
+            started = time.perf_counter()
+            response = scenario.run(client, master, rng)
+            local.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors.append(local_errors)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(worker, range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': max(latencies) * 1000 if latencies else 0.0
+    }
+
+def compare_with_baseline(results, baseline_path, max_regression):
+    """Retorna os cenários cujo p99 piorou mais que max_regression em relação à base"""
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)['results']
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous['p99_ms']:
+            continue
+        change = (result['p99_ms'] - previous['p99_ms']) / previous['p99_ms']
+        if change > max_regression:
+            regressions.append((name, previous['p99_ms'], result['p99_ms'], change))
+    return regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark de carga da API')
+    parser.add_argument('--masters', type=int, default=4, help='mestres (mesas) criados')
+    parser.add_argument('--players', type=int, default=24, help='jogadores por mestre')
+    parser.add_argument('--notes', type=int, default=300, help='notas por mestre')
+    parser.add_argument('--rolls', type=int, default=50000, help='rolagens no histórico de cada mestre')
+    parser.add_argument('--requests', type=int, default=400, help='requisições por cenário')
+    parser.add_argument('--concurrency', type=int, default=8, help='clientes simultâneos')
+    parser.add_argument('--scenario', action='append', help='executar apenas estes cenários')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--real-hash', action='store_true', help='usar o custo de hash de produção')
+    parser.add_argument('--json', help='gravar os resultados neste arquivo')
+    parser.add_argument('--baseline', help='comparar com resultados anteriores (JSON)')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='piora máxima aceitável de p99 (0.2 = 20%%)')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix='porao-bench-')
+
+    try:
+        app = create_app(benchmark_config(os.path.join(workdir, 'bench.db'), args.real_hash))
+        upgrade_database(app)
+
+        started = time.perf_counter()
+        masters = seed(app, args, rng)
+        print(f'Base populada em {time.perf_counter() - started:.1f}s '
+              f'({args.masters} mestres, {args.players} jogadores, {args.notes} notas e {args.rolls} rolagens por mestre)')
+
+        results = {}
+        print(f"\n{'cenário':<24}{'reqs':>8}{'erros':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'máx ms':>10}")
+        for scenario in build_scenarios(app, masters):
+            if args.scenario and scenario.name not in args.scenario:
+                continue
+            result = run_scenario(scenario, masters, args, args.seed)
+            results[scenario.name] = result
+            print(f"{scenario.name:<24}{result['requests']:>8}{result['errors']:>8}{result['throughput_rps']:>10.1f}"
+                  f"{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['max_ms']:>10.2f}")
+
+        if args.json:
+            with open(args.json, 'w') as output:
+                json.dump({'args': vars(args), 'results': results}, output, indent=2)
+
+        failed = any(result['errors'] for result in results.values())
+        if failed:
+            print('\nFalha: alguns cenários retornaram erros')
+
+        if args.baseline:
+            regressions = compare_with_baseline(results, args.baseline, args.max_regression)
+            for name, before, after, change in regressions:
+                print(f'Regressão em {name}: p99 {before:.2f} ms -> {after:.2f} ms (+{change:.0%})')
+            failed = failed or bool(regressions)
+
+        return 1 if failed else 0
+    finally:
+        with app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""Benchmark do histórico de revisões das notas.
+
+Simula uma campanha em que cada nota é editada muitas vezes ao longo de
+semanas (parágrafos acrescentados, palavras trocadas, trechos removidos ou
+reescritos) e mede:
+
+- o espaço ocupado pelas revisões (snapshots + diffs) comparado a guardar
+  uma cópia completa por edição;
+- o tempo para gravar uma revisão e para reconstruir revisões recentes,
+  antigas e aleatórias;
+- o efeito da compactação (uma revisão por dia no histórico antigo).
+
+Uso:
+    python benchmarks/note_revisions.py
+    python benchmarks/note_revisions.py --notes 20 --edits 300 --interval 10 --json resultado.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+from src.app import create_app
+from src.config import TestConfig
+from src.database import upgrade_database
+from src.models.user import db, User, Note, NoteRevision
+from src.note_revisions import compact_revisions, materialize, record_revision
+from sqlalchemy import func
+
+WORDS = ('dragão taverna porão masmorra espada goblin rei castelo floresta tesouro '
+         'maldição ritual portal runa cripta vila mercador guarda torre sombra').split()
+
+class BenchmarkConfig(TestConfig):
+    METRICS_ENABLED = False
+
+def sentence(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))).capitalize() + '.'
+
+def paragraph(rng):
+    return ' '.join(sentence(rng) for _ in range(rng.randint(2, 6)))
+
+def edit(content, rng):
+    """Uma edição típica de nota de campanha"""
+    paragraphs = content.split('\n\n')
+    roll = rng.random()
+    if roll < 0.4:
+        paragraphs.append(paragraph(rng))
+    elif roll < 0.8:
+        index = rng.randrange(len(paragraphs))
+        words = paragraphs[index].split(' ')
+        words[rng.randrange(len(words))] = rng.choice(WORDS)
+        paragraphs[index] = ' '.join(words)
+    elif roll < 0.9 and len(paragraphs) > 1:
+        paragraphs.pop(rng.randrange(len(paragraphs)))
+    else:
+        paragraphs[rng.randrange(len(paragraphs))] = paragraph(rng)
+    return '\n\n'.join(paragraphs)
+
+def measure(function, iterations):
+    """Mediana do tempo (ms) de function em iterations execuções"""
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+def stored_bytes():
+    return db.session.query(func.coalesce(func.sum(func.length(NoteRevision.content)), 0)).scalar()
+
+def seed(args, rng, started_at):
+    """Cria as notas e grava uma revisão por edição; retorna os textos esperados e o tempo por revisão"""
+    user = User(username='mestre', email='mestre@porao.test', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+
+    expected = {}
+    record_timings = []
+    step = timedelta(days=args.days) / args.edits
+    for n in range(args.notes):
+        note = Note(title=f'Nota {n}', content=paragraph(rng), theme='lore', master_id=user.id)
+        db.session.add(note)
+        db.session.flush()
+        record_revision(note, None).created_at = started_at
+        texts = [note.content]
+
+        for e in range(args.edits):
+            previous = note.content
+            note.content = edit(previous, rng)
+            begin = time.perf_counter()
+            revision = record_revision(note, previous)
+            db.session.flush()
+            record_timings.append((time.perf_counter() - begin) * 1000)
+            revision.created_at = started_at + step * (e + 1)
+            texts.append(note.content)
+
+        db.session.commit()
+        expected[note.id] = texts
+
+    record_timings.sort()
+    return expected, record_timings[len(record_timings) // 2]
+
+def materialization(expected, args, rng):
+    note_ids = list(expected)
+    latest = lambda: materialize(rng.choice(note_ids), args.edits + 1)
+    oldest = lambda: materialize(rng.choice(note_ids), 1)
+    any_revision = lambda: materialize(rng.choice(note_ids), rng.randint(1, args.edits + 1))
+    return {
+        'latest_ms': measure(latest, args.iterations),
+        'oldest_ms': measure(oldest, args.iterations),
+        'random_ms': measure(any_revision, args.iterations),
+    }
+
+def verify(expected):
+    """Toda revisão existente reconstrói exatamente o texto gravado"""
+    for note_id, texts in expected.items():
+        numbers = [row.number for row in db.session.query(NoteRevision.number).filter_by(note_id=note_id)]
+        for number in numbers:
+            assert materialize(note_id, number)[1] == texts[number - 1], (note_id, number)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark do histórico de revisões das notas')
+    parser.add_argument('--notes', type=int, default=10, help='notas na campanha')
+    parser.add_argument('--edits', type=int, default=200, help='edições por nota')
+    parser.add_argument('--days', type=int, default=60, help='período coberto pelas edições')
+    parser.add_argument('--interval', type=int, default=None, help='revisões entre cópias completas (NOTE_SNAPSHOT_INTERVAL)')
+    parser.add_argument('--keep-days', type=int, default=30, help='compactar revisões mais antigas que N dias')
+    parser.add_argument('--iterations', type=int, default=50, help='execuções por caso (mediana)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='gravar os resultados neste arquivo')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.interval:
+        BenchmarkConfig.NOTE_SNAPSHOT_INTERVAL = args.interval
+    app = create_app(BenchmarkConfig)
+    upgrade_database(app)
+    rng = random.Random(args.seed)
+    started_at = datetime(2024, 1, 1)
+
+    with app.app_context():
+        expected, record_ms = seed(args, rng, started_at)
+        verify(expected)
+
+        naive = sum(len(text) for texts in expected.values() for text in texts)
+        stored = stored_bytes()
+        kinds = dict(db.session.query(NoteRevision.kind, func.count()).group_by(NoteRevision.kind).all())
+        results = {
+            'revisions': sum(kinds.values()),
+            'snapshots': kinds.get('snapshot', 0),
+            'diffs': kinds.get('diff', 0),
+            'full_copies_bytes': naive,
+            'stored_bytes': stored,
+            'record_ms': record_ms,
+            'materialize': materialization(expected, args, rng),
+        }
+
+        now = started_at + timedelta(days=args.days)
+        compaction = compact_revisions(args.keep_days, now=now)
+        verify(expected)
+        results['compaction'] = dict(
+            compaction,
+            revisions=db.session.query(func.count(NoteRevision.id)).scalar(),
+            stored_bytes=stored_bytes()
+        )
+
+    print(f"revisões: {results['revisions']} ({results['snapshots']} snapshots, {results['diffs']} diffs)")
+    print(f"cópias completas: {naive:>12} bytes")
+    print(f"snapshots + diffs: {stored:>11} bytes ({stored / naive:.1%})")
+    print(f"gravar revisão: {record_ms:>14.3f} ms")
+    for name, elapsed in results['materialize'].items():
+        print(f"reconstruir {name[:-3]:<10}{elapsed:>10.3f} ms")
+    after = results['compaction']
+    print(f"compactação: {after['removed']} revisões removidas em {after['notes']} notas, "
+          f"{after['revisions']} restantes, {after['stored_bytes']} bytes ({after['stored_bytes'] / naive:.1%})")
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump({'args': vars(args), 'results': results}, output, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""Benchmark de serialização e compressão das respostas grandes da API.
+
+Compara, para as listas de jogadores e de notas de uma campanha grande,
+o caminho original (to_dict + jsonify com o provider padrão do Flask) com
+o provider orjson e com o cache de JSON pré-serializado dos jogadores, e
+mede o custo e o ganho de tamanho da compressão gzip/br.
+
+Uso:
+    python benchmarks/serialization.py
+    python benchmarks/serialization.py --players 500 --notes 1000 --iterations 50 --json resultado.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+from flask.json.provider import DefaultJSONProvider
+from src.app import create_app
+from src.compression import brotli, compress_body
+from src.config import TestConfig
+from src.database import upgrade_database
+from src.json_provider import OrjsonProvider, orjson
+from src.models.user import db, User, Player, Note
+from src.player_cache import player_cache, json_bytes_response
+
+ITEMS = ['Espada longa', 'Escudo', 'Poção de cura', 'Corda (15m)', 'Tocha', 'Chave de ferro', 'Arco curto', 'Flechas (20)', 'Mapa antigo', 'Amuleto']
+DEBUFFS = ['Envenenado', 'Atordoado', 'Cego', 'Amedrontado', 'Sangrando', 'Exausto']
+WORDS = ('dragão taverna porão masmorra espada goblin rei castelo floresta tesouro '
+         'maldição ritual portal runa cripta vila mercador guarda torre sombra').split()
+
+class BenchmarkConfig(TestConfig):
+    METRICS_ENABLED = False
+    COMPRESS_ENABLED = False
+
+def seed(app, args, rng):
+    with app.app_context():
+        user = User(username='mestre', email='mestre@porao.test', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+
+        for p in range(args.players):
+            player = Player(
+                name=f'Personagem {p}', age=rng.randint(16, 80), money=rng.randint(0, 5000),
+                health=rng.randint(1, 100), mana=rng.randint(0, 100), vigor=rng.randint(0, 100),
+                master_id=user.id, player_username=f'jogador{p}'
+            )
+            player.set_items(rng.sample(ITEMS, rng.randint(2, len(ITEMS))))
+            player.set_debuffs(rng.sample(DEBUFFS, rng.randint(0, 3)))
+            db.session.add(player)
+
+        db.session.add_all([
+            Note(
+                title=f'Nota {n} - {rng.choice(WORDS)}',
+                content=' '.join(rng.choice(WORDS) for _ in range(rng.randint(50, 600))),
+                theme='lore', master_id=user.id
+            )
+            for n in range(args.notes)
+        ])
+        db.session.commit()
+        return user.id
+
+def measure(function, iterations):
+    """Mediana do tempo (ms) de function em iterations execuções"""
+    timings = []
+    result = None
+    for _ in range(iterations):
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], result
+
+def serialization_cases(app, master_id):
+    stdlib = DefaultJSONProvider(app)
+    fast = OrjsonProvider(app) if orjson is not None else None
+
+    def players():
+        return Player.query.filter_by(master_id=master_id).order_by(Player.id).all()
+
+    def notes():
+        return Note.query.filter_by(master_id=master_id).order_by(Note.created_at.desc()).all()
+
+    cases = {
+        'players_to_dict_jsonify': lambda: stdlib.response({'players': [p.to_dict() for p in players()]}).get_data(),
+        'notes_to_dict_jsonify': lambda: stdlib.response({'notes': [n.to_dict() for n in notes()]}).get_data(),
+    }
+    if fast is not None:
+        cases['players_to_dict_orjson'] = lambda: fast.response({'players': [p.to_dict() for p in players()]}).get_data()
+        cases['notes_to_dict_orjson'] = lambda: fast.response({'notes': [n.to_dict() for n in notes()]}).get_data()
+
+    def cached_players():
+        versions = db.session.query(Player.id, Player.version).filter_by(master_id=master_id).order_by(Player.id).all()
+        return json_bytes_response('players', player_cache.bodies_for(versions)).get_data()
+
+    cases['players_version_cache'] = cached_players
+    return cases
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark de serialização e compressão')
+    parser.add_argument('--players', type=int, default=300, help='jogadores na campanha')
+    parser.add_argument('--notes', type=int, default=500, help='notas na campanha')
+    parser.add_argument('--iterations', type=int, default=30, help='execuções por caso (mediana)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='gravar os resultados neste arquivo')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    app = create_app(BenchmarkConfig)
+    upgrade_database(app)
+    master_id = seed(app, args, random.Random(args.seed))
+
+    results = {'serialization': {}, 'compression': {}}
+    print(f"orjson: {'sim' if orjson is not None else 'não instalado'} | brotli: {'sim' if brotli is not None else 'não instalado'}")
+    print(f"\n{'serialização':<28}{'ms':>10}{'bytes':>12}")
+
+    payloads = {}
+    with app.test_request_context():
+        for name, case in serialization_cases(app, master_id).items():
+            # Sessão limpa a cada execução: inclui o custo de carregar as linhas
+            def run():
+                db.session.expire_all()
+                return case()
+            elapsed, body = measure(run, args.iterations)
+            results['serialization'][name] = {'ms': elapsed, 'bytes': len(body)}
+            payloads.setdefault(name.split('_')[0], body)
+            print(f"{name:<28}{elapsed:>10.2f}{len(body):>12}")
+
+        print(f"\n{'compressão':<28}{'ms':>10}{'bytes':>12}{'razão':>10}")
+        encodings = ['gzip'] + (['br'] if brotli is not None else [])
+        for payload_name, body in payloads.items():
+            for encoding in encodings:
+                elapsed, compressed = measure(lambda: compress_body(body, encoding, app.config), args.iterations)
+                name = f'{payload_name}_{encoding}'
+                ratio = len(compressed) / len(body)
+                results['compression'][name] = {'ms': elapsed, 'bytes': len(compressed), 'ratio': ratio}
+                print(f"{name:<28}{elapsed:>10.2f}{len(compressed):>12}{ratio:>10.1%}")
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump({'args': vars(args), 'results': results}, output, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
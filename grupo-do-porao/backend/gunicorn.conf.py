@@ -0,0 +1,29 @@
+# Configuração do Gunicorn: `gunicorn -c gunicorn.conf.py main:app`
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+# Um processo por padrão: o stream SSE, a sessão ao vivo e os buffers do chat ficam na
+# memória do processo. Vários workers (GUNICORN_WORKERS) são opt-in e desativam a sessão ao vivo
+workers = int(os.environ.get('GUNICORN_WORKERS', 1))
+# Cada stream SSE ocupa uma thread enquanto está conectado: o app limita os streams para
+# deixar EVENT_STREAM_RESERVED_THREADS threads livres para as demais requisições
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+
+# A aplicação é criada uma vez no processo mestre e compartilhada com os workers via fork
+preload_app = True
+
+def post_fork(server, worker):
+    # Conexões não podem ser compartilhadas entre processos: cada worker abre as suas
+    from src.models.user import db
+    app = worker.app.wsgi()
+    # Estado em memória por processo (sessão ao vivo) depende de saber quantos workers existem
+    app.config['WORKER_PROCESSES'] = server.cfg.workers
+    app.config['WORKER_THREADS'] = server.cfg.threads
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+def post_worker_init(worker):
+    # Journals de sessões ao vivo interrompidas por uma queda são aplicados antes da
+    # primeira requisição: depois dela, uma escrita direta poderia ser sobrescrita
+    from src.live_session import recover_live_sessions
+    recover_live_sessions(worker.app.wsgi())
@@ -0,0 +1,82 @@
+"""Esquema original (user, player, note, dice_roll)
+
+Revision ID: 0001_baseline
+Revises: 
+Create Date: 2025-01-01 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_baseline'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=80), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('password_hash', sa.String(length=255), nullable=False),
+        sa.Column('is_master', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username'),
+        sa.UniqueConstraint('email')
+    )
+    op.create_table(
+        'player',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('age', sa.Integer(), nullable=True),
+        sa.Column('money', sa.Integer(), nullable=True),
+        sa.Column('health', sa.Integer(), nullable=True),
+        sa.Column('mana', sa.Integer(), nullable=True),
+        sa.Column('vigor', sa.Integer(), nullable=True),
+        sa.Column('items', sa.Text(), nullable=True),
+        sa.Column('debuffs', sa.Text(), nullable=True),
+        sa.Column('avatar_url', sa.String(length=255), nullable=True),
+        sa.Column('master_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('player_username', sa.String(length=80), nullable=True),
+        sa.Column('player_password_hash', sa.String(length=255), nullable=True),
+        sa.ForeignKeyConstraint(['master_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'note',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('theme', sa.String(length=100), nullable=True),
+        sa.Column('master_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['master_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'dice_roll',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('dice_type', sa.Integer(), nullable=False),
+        sa.Column('result', sa.Integer(), nullable=False),
+        sa.Column('master_id', sa.Integer(), nullable=False),
+        sa.Column('player_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['master_id'], ['user.id']),
+        # Remover um jogador não pode falhar por causa do histórico (FKs valem no PostgreSQL)
+        sa.ForeignKeyConstraint(['player_id'], ['player.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('dice_roll')
+    op.drop_table('note')
+    op.drop_table('player')
+    op.drop_table('user')
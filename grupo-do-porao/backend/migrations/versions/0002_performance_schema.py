@@ -0,0 +1,125 @@
+"""Índices de histórico, versão de jogadores, tokens de recuperação e busca de notas
+
+Revision ID: 0002_performance_schema
+Revises: 0001_baseline
+Create Date: 2025-01-02 00:00:00
+
+Bancos que já receberam parte destas alterações pelo antigo ensure_schema()
+são tratados verificando cada objeto antes de criá-lo. No PostgreSQL os
+índices são criados com CONCURRENTLY para não bloquear escritas.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_performance_schema'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_dice_roll_master_created', 'dice_roll', ['master_id', 'created_at']),
+    ('ix_dice_roll_player_created', 'dice_roll', ['player_id', 'created_at']),
+    ('ix_note_master_created', 'note', ['master_id', 'created_at']),
+)
+
+NOTE_SEARCH_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS note_fts USING fts5(
+        title, content, theme,
+        content='note', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS note_fts_ai AFTER INSERT ON note BEGIN
+        INSERT INTO note_fts(rowid, title, content, theme) VALUES (new.id, new.title, new.content, new.theme);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS note_fts_ad AFTER DELETE ON note BEGIN
+        INSERT INTO note_fts(note_fts, rowid, title, content, theme) VALUES ('delete', old.id, old.title, old.content, old.theme);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS note_fts_au AFTER UPDATE ON note BEGIN
+        INSERT INTO note_fts(note_fts, rowid, title, content, theme) VALUES ('delete', old.id, old.title, old.content, old.theme);
+        INSERT INTO note_fts(rowid, title, content, theme) VALUES (new.id, new.title, new.content, new.theme);
+    END""",
+)
+
+
+def inspector():
+    if op.get_context().as_sql:
+        return None
+    return sa.inspect(op.get_bind())
+
+
+def has_table(name):
+    insp = inspector()
+    return insp is not None and name in insp.get_table_names()
+
+
+def has_column(table, column):
+    insp = inspector()
+    return insp is not None and column in {c['name'] for c in insp.get_columns(table)}
+
+
+def has_index(table, name):
+    insp = inspector()
+    return insp is not None and name in {i['name'] for i in insp.get_indexes(table)}
+
+
+def upgrade():
+    dialect = op.get_context().dialect.name
+
+    # Colunas novas do jogador (aditivas, com valor padrão para as linhas existentes)
+    if not has_column('player', 'version'):
+        op.add_column('player', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+    if not has_column('player', 'updated_at'):
+        op.add_column('player', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    if not has_table('password_reset_token'):
+        op.create_table(
+            'password_reset_token',
+            sa.Column('token_hash', sa.String(length=64), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('expires_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('token_hash')
+        )
+        op.create_index('ix_password_reset_token_expires', 'password_reset_token', ['expires_at'])
+        op.create_index('ix_password_reset_token_user_id', 'password_reset_token', ['user_id'])
+
+    if dialect == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+    else:
+        for name, table, columns in INDEXES:
+            if not has_index(table, name):
+                op.create_index(name, table, columns)
+
+    if dialect == 'sqlite':
+        bind = op.get_bind()
+        fts5 = op.get_context().as_sql or bind.exec_driver_sql("SELECT sqlite_compileoption_used('ENABLE_FTS5')").scalar()
+        if fts5:
+            rebuild = not has_table('note_fts')
+            for ddl in NOTE_SEARCH_DDL:
+                op.execute(ddl)
+            if rebuild:
+                # Indexar as notas já existentes
+                op.execute("INSERT INTO note_fts(note_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_context().dialect.name == 'sqlite':
+        for trigger in ('note_fts_ai', 'note_fts_ad', 'note_fts_au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS note_fts')
+
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table)
+
+    op.drop_index('ix_password_reset_token_user_id', table_name='password_reset_token')
+    op.drop_index('ix_password_reset_token_expires', table_name='password_reset_token')
+    op.drop_table('password_reset_token')
+
+    with op.batch_alter_table('player') as batch_op:
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('version')
@@ -0,0 +1,152 @@
+"""Inventário e debuffs em tabelas normalizadas
+
+Revision ID: 0003_inventory_tables
+Revises: 0002_performance_schema
+Create Date: 2025-01-03 00:00:00
+
+Os itens e debuffs que estavam serializados em JSON nas colunas player.items
+e player.debuffs são copiados para as tabelas inventory_item e debuff, e as
+colunas antigas são removidas. O downgrade faz o caminho inverso.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import json
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_inventory_tables'
+down_revision = '0002_performance_schema'
+branch_labels = None
+depends_on = None
+
+# Colunas conhecidas de cada tabela; o resto do dicionário vai para details
+KNOWN_FIELDS = {
+    'inventory_item': ('name', 'quantity'),
+    'debuff': ('name', 'rounds_remaining'),
+}
+
+
+def create_tables():
+    op.create_table(
+        'inventory_item',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('player_id', sa.Integer(), nullable=False),
+        sa.Column('master_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('details', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['player_id'], ['player.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['master_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_inventory_item_player_id', 'inventory_item', ['player_id'])
+    op.create_index('ix_inventory_item_master_name', 'inventory_item', ['master_id', 'name'])
+
+    op.create_table(
+        'debuff',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('player_id', sa.Integer(), nullable=False),
+        sa.Column('master_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('rounds_remaining', sa.Integer(), nullable=True),
+        sa.Column('details', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['player_id'], ['player.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['master_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_debuff_player_id', 'debuff', ['player_id'])
+    op.create_index('ix_debuff_master_name', 'debuff', ['master_id', 'name'])
+
+
+def decode_entries(raw):
+    try:
+        entries = json.loads(raw) if raw else []
+    except ValueError:
+        return []
+    return entries if isinstance(entries, list) else []
+
+
+def entry_row(table, entry, player_id, master_id, created_at):
+    if isinstance(entry, dict):
+        known = KNOWN_FIELDS[table]
+        row = {key: entry[key] for key in known if key in entry}
+        extra = {key: value for key, value in entry.items() if key not in known}
+        row['details'] = json.dumps(extra) if extra else None
+    else:
+        row = {'name': str(entry), 'details': None}
+    row['name'] = str(row.get('name') or '')[:100]
+    if table == 'inventory_item':
+        row.setdefault('quantity', 1)
+    else:
+        row.setdefault('rounds_remaining', None)
+    row.update(player_id=player_id, master_id=master_id, created_at=created_at)
+    return row
+
+
+def copy_json_entries():
+    bind = op.get_bind()
+    player = sa.table(
+        'player', sa.column('id'), sa.column('master_id'), sa.column('items'),
+        sa.column('debuffs'), sa.column('created_at')
+    )
+    targets = {
+        'inventory_item': sa.table(
+            'inventory_item', sa.column('player_id'), sa.column('master_id'), sa.column('name'),
+            sa.column('quantity'), sa.column('details'), sa.column('created_at')
+        ),
+        'debuff': sa.table(
+            'debuff', sa.column('player_id'), sa.column('master_id'), sa.column('name'),
+            sa.column('rounds_remaining'), sa.column('details'), sa.column('created_at')
+        ),
+    }
+
+    rows = {'inventory_item': [], 'debuff': []}
+    for player_id, master_id, items, debuffs, created_at in bind.execute(sa.select(player)):
+        for table, raw in (('inventory_item', items), ('debuff', debuffs)):
+            rows[table].extend(entry_row(table, entry, player_id, master_id, created_at) for entry in decode_entries(raw))
+
+    for table, table_rows in rows.items():
+        if table_rows:
+            bind.execute(targets[table].insert(), table_rows)
+
+
+def upgrade():
+    create_tables()
+
+    # Copiar os dados existentes (em modo offline não há dados)
+    if not op.get_context().as_sql:
+        copy_json_entries()
+
+    with op.batch_alter_table('player') as batch_op:
+        batch_op.drop_column('debuffs')
+        batch_op.drop_column('items')
+
+
+def downgrade():
+    with op.batch_alter_table('player') as batch_op:
+        batch_op.add_column(sa.Column('items', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('debuffs', sa.Text(), nullable=True))
+
+    if not op.get_context().as_sql:
+        bind = op.get_bind()
+        player = sa.table('player', sa.column('id'), sa.column('items'), sa.column('debuffs'))
+        serialized = {}
+        for table, column in (('inventory_item', 'items'), ('debuff', 'debuffs')):
+            result = bind.execute(sa.text(f'SELECT player_id, name FROM {table} ORDER BY id'))
+            for player_id, name in result:
+                serialized.setdefault(player_id, {'items': [], 'debuffs': []})[column].append(name)
+        for player_id, values in serialized.items():
+            bind.execute(
+                player.update().where(player.c.id == player_id),
+                {'items': json.dumps(values['items']), 'debuffs': json.dumps(values['debuffs'])}
+            )
+
+    op.drop_index('ix_debuff_master_name', table_name='debuff')
+    op.drop_index('ix_debuff_player_id', table_name='debuff')
+    op.drop_table('debuff')
+    op.drop_index('ix_inventory_item_master_name', table_name='inventory_item')
+    op.drop_index('ix_inventory_item_player_id', table_name='inventory_item')
+    op.drop_table('inventory_item')
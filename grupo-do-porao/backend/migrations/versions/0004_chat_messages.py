@@ -0,0 +1,39 @@
+"""Mensagens do chat da mesa
+
+Revision ID: 0004_chat_messages
+Revises: 0003_inventory_tables
+Create Date: 2025-01-04 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_chat_messages'
+down_revision = '0003_inventory_tables'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'chat_message',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('master_id', sa.Integer(), nullable=False),
+        sa.Column('player_id', sa.Integer(), nullable=True),
+        sa.Column('author', sa.String(length=100), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('data', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['master_id'], ['user.id']),
+        sa.ForeignKeyConstraint(['player_id'], ['player.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_chat_message_master_id', 'chat_message', ['master_id', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_chat_message_master_id', table_name='chat_message')
+    op.drop_table('chat_message')
@@ -0,0 +1,32 @@
+"""Documento de estado do jogo por mestre
+
+Revision ID: 0005_game_state
+Revises: 0004_chat_messages
+Create Date: 2025-01-05 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_game_state'
+down_revision = '0004_chat_messages'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'game_state',
+        sa.Column('master_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('data', sa.Text(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['master_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('master_id')
+    )
+
+
+def downgrade():
+    op.drop_table('game_state')
@@ -0,0 +1,45 @@
+"""Histórico de revisões das notas
+
+Revision ID: 0006_note_revisions
+Revises: 0005_game_state
+Create Date: 2025-01-06 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_note_revisions'
+down_revision = '0005_game_state'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'note_revision',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('note_id', sa.Integer(), nullable=False),
+        sa.Column('master_id', sa.Integer(), nullable=False),
+        sa.Column('number', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=10), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('theme', sa.String(length=100), nullable=True),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['note_id'], ['note.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['master_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('note_id', 'number', name='uq_note_revision_number')
+    )
+
+    # O conteúdo atual de cada nota existente vira a primeira revisão
+    op.execute(
+        "INSERT INTO note_revision (note_id, master_id, number, kind, title, theme, content, created_at) "
+        "SELECT id, master_id, 1, 'snapshot', title, theme, content, COALESCE(updated_at, created_at) FROM note"
+    )
+
+
+def downgrade():
+    op.drop_table('note_revision')
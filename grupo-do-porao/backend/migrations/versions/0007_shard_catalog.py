@@ -0,0 +1,39 @@
+"""Catálogo de roteamento dos shards por mestre
+
+Revision ID: 0007_shard_catalog
+Revises: 0006_note_revisions
+Create Date: 2025-01-07 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_shard_catalog'
+down_revision = '0006_note_revisions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'shard_route',
+        sa.Column('master_id', sa.Integer(), nullable=False),
+        sa.Column('shard', sa.String(length=100), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['master_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('master_id')
+    )
+    op.create_table(
+        'shard_player_login',
+        sa.Column('player_username', sa.String(length=80), nullable=False),
+        sa.Column('master_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['master_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('player_username', 'master_id')
+    )
+
+
+def downgrade():
+    op.drop_table('shard_player_login')
+    op.drop_table('shard_route')
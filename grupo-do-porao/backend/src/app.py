@@ -0,0 +1,135 @@
+from flask import Flask
+from flask_cors import CORS
+from src.config import Config, BASE_DIR
+from src.database import configure_database, upgrade_database
+from src.metrics import init_metrics
+from src.session_store import init_sessions
+from src.json_provider import json_provider_class
+from src.compression import init_compression
+from src.sharding import init_sharding
+import click
+import importlib
+import os
+import time
+
+def load_blueprint(path):
+    """Importa um blueprint a partir de "modulo:atributo" apenas quando ele está habilitado"""
+    module_name, attribute = path.split(':')
+    return getattr(importlib.import_module(module_name), attribute)
+
+def create_app(config=Config):
+    """Cria a aplicação Flask sem tocar no banco de dados.
+
+    O esquema não é criado aqui: use `flask --app main init-db` (ou
+    `flask --app main db upgrade`) antes de subir os workers.
+    """
+    started = time.perf_counter()
+    timings = {}
+
+    # Arquivos estáticos servidos pelo blueprint de páginas (com compressão e cache), não pela rota padrão do Flask
+    app = Flask('main',
+                static_folder=None,
+                template_folder=os.path.join(BASE_DIR, '..', 'templates'))
+    app.config.from_object(config)
+
+    # Habilitar CORS para todas as rotas
+    CORS(app, supports_credentials=True)
+
+    init_sessions(app)
+    app.json = json_provider_class(app.config.get('JSON_PROVIDER', 'auto'))(app)
+
+    step = time.perf_counter()
+    configure_database(app)
+    init_sharding(app)
+    timings['database'] = time.perf_counter() - step
+
+    if app.config.get('METRICS_ENABLED'):
+        init_metrics(app)
+
+    if app.config.get('COMPRESS_ENABLED'):
+        init_compression(app)
+
+    # Registrar blueprints definidos em BLUEPRINTS
+    step = time.perf_counter()
+    for path, url_prefix in app.config['BLUEPRINTS']:
+        app.register_blueprint(load_blueprint(path), url_prefix=url_prefix)
+    timings['blueprints'] = time.perf_counter() - step
+
+    register_commands(app)
+
+    timings['total'] = time.perf_counter() - started
+    app.extensions['startup_timings'] = timings
+    app.logger.info(
+        "Aplicação criada em %.1f ms (banco %.1f ms, blueprints %.1f ms)",
+        timings['total'] * 1000, timings['database'] * 1000, timings['blueprints'] * 1000
+    )
+
+    return app
+
+def register_commands(app):
+    @app.cli.command('init-db')
+    def init_db():
+        """Cria ou atualiza o esquema do banco aplicando as migrações"""
+        started = time.perf_counter()
+        upgrade_database(app)
+        print(f"Banco de dados atualizado em {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    @app.cli.command('build-assets')
+    def build_static_assets():
+        """Gera os arquivos estáticos com hash no nome e as variantes .gz/.br"""
+        from src.assets import build_assets
+        manifest = build_assets(app.config['STATIC_FOLDER'])
+        print(f"{len(manifest)} arquivos processados em {app.config['STATIC_FOLDER']}")
+
+    @app.cli.command('live-recover')
+    def live_recover():
+        """Grava no banco os status pendentes em journals de sessões ao vivo interrompidas"""
+        from src.live_session import live_sessions
+        for master_id, count in live_sessions.recover_all().items():
+            print(f"Mestre {master_id}: {count} jogadores recuperados")
+
+    @app.cli.command('compact-note-revisions')
+    @click.option('--days', type=int, default=None, help='compactar revisões mais antigas que N dias')
+    def compact_note_revisions(days):
+        """Junta os diffs antigos do histórico de notas, mantendo uma revisão por dia"""
+        from src.models.user import db
+        from src.note_revisions import compact_revisions
+        from src.sharding import master_scope, sharded_masters
+        days = app.config['NOTE_REVISION_KEEP_DAYS'] if days is None else days
+        # Banco principal e, com sharding, o shard de cada mestre
+        for master_id in [None] + sharded_masters():
+            with master_scope(master_id):
+                try:
+                    stats = compact_revisions(days)
+                finally:
+                    # Os ids se repetem entre shards: cada banco começa com a sessão vazia
+                    db.session.close()
+            where = f"shard do mestre {master_id}" if master_id else "banco principal"
+            print(f"{where}: {stats['removed']} revisões removidas em {stats['notes']} notas")
+
+    @app.cli.command('shard-rebalance')
+    @click.option('--master-id', 'master_ids', type=int, multiple=True, help='mestre a mover (pode repetir)')
+    @click.option('--all', 'move_all', is_flag=True, help='mover todos os mestres ainda no banco principal')
+    @click.option('--dry-run', is_flag=True, help='apenas contar as linhas que seriam movidas')
+    def shard_rebalance(master_ids, move_all, dry_run):
+        """Move os dados de mestres do banco principal para shards próprios (rode com a aplicação parada)"""
+        from src.sharding import rebalance_master, unsharded_masters
+        if move_all:
+            master_ids = unsharded_masters()
+        if not master_ids:
+            raise click.UsageError('Informe --master-id ou --all')
+        for master_id in master_ids:
+            started = time.perf_counter()
+            counts = rebalance_master(master_id, dry_run=dry_run)
+            if counts is None:
+                print(f"Mestre {master_id}: já está em um shard")
+                continue
+            rows = ', '.join(f"{table}={count}" for table, count in counts.items() if count)
+            action = 'seriam movidas' if dry_run else f"movidas em {(time.perf_counter() - started) * 1000:.1f} ms"
+            print(f"Mestre {master_id}: {sum(counts.values())} linhas {action} ({rows or 'nenhuma'})")
+
+    @app.cli.command('startup-timing')
+    def startup_timing():
+        """Mostra o tempo gasto em cada etapa da criação da aplicação"""
+        for name, seconds in app.extensions['startup_timings'].items():
+            print(f"{name}: {seconds * 1000:.1f} ms")
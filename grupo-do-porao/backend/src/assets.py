@@ -0,0 +1,125 @@
+from werkzeug.security import safe_join
+import gzip
+import hashlib
+import json
+import os
+
+try:
+    import brotli
+except ImportError:  # Brotli é opcional: sem ele apenas as variantes .gz são geradas
+    brotli = None
+
+# Manifesto gerado pelo build: nome original -> nome com hash do conteúdo
+MANIFEST_NAME = 'manifest.json'
+
+# Extensões que valem a pena comprimir (imagens e fontes já são comprimidas)
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.html', '.svg', '.json', '.map', '.txt', '.xml', '.ico')
+MIN_COMPRESS_SIZE = 256
+
+# Variantes pré-comprimidas, em ordem de preferência
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+HASH_LENGTH = 12
+
+def fingerprint_name(path, digest):
+    base, extension = os.path.splitext(path)
+    return f'{base}.{digest[:HASH_LENGTH]}{extension}'
+
+def compress_variants(path):
+    """Grava path.gz (e path.br, se disponível) quando a compressão reduz o arquivo"""
+    if not path.endswith(COMPRESSIBLE_EXTENSIONS):
+        return
+    with open(path, 'rb') as source:
+        data = source.read()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return
+
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(data):
+            with open(path + suffix, 'wb') as target:
+                target.write(compressed)
+
+def remove_outputs(static_dir, manifest):
+    """Remove os arquivos gerados por um build anterior"""
+    for original, fingerprinted in manifest.items():
+        for name in (fingerprinted, fingerprinted + '.gz', fingerprinted + '.br', original + '.gz', original + '.br'):
+            path = os.path.join(static_dir, name)
+            if os.path.isfile(path):
+                os.remove(path)
+
+def build_assets(static_dir):
+    """Gera cópias com hash no nome, variantes .gz/.br e o manifesto dos arquivos estáticos"""
+    manifest_path = os.path.join(static_dir, MANIFEST_NAME)
+    if os.path.isfile(manifest_path):
+        with open(manifest_path) as previous:
+            remove_outputs(static_dir, json.load(previous))
+
+    sources = []
+    for directory, _, files in os.walk(static_dir):
+        for name in files:
+            if name == MANIFEST_NAME or name.endswith(('.gz', '.br')):
+                continue
+            sources.append(os.path.relpath(os.path.join(directory, name), static_dir).replace(os.sep, '/'))
+
+    manifest = {}
+    for relative in sorted(sources):
+        path = os.path.join(static_dir, relative)
+        with open(path, 'rb') as source:
+            data = source.read()
+        fingerprinted = fingerprint_name(relative, hashlib.sha256(data).hexdigest())
+        with open(os.path.join(static_dir, fingerprinted), 'wb') as target:
+            target.write(data)
+        compress_variants(path)
+        compress_variants(os.path.join(static_dir, fingerprinted))
+        manifest[relative] = fingerprinted
+
+    with open(manifest_path, 'w') as target:
+        json.dump(manifest, target, indent=2, sort_keys=True)
+    return manifest
+
+class AssetManifest:
+    """Manifesto do build em memória, recarregado quando o arquivo muda"""
+
+    def __init__(self, static_dir):
+        self.path = os.path.join(static_dir, MANIFEST_NAME)
+        self._mtime = None
+        self.assets = {}
+        self.fingerprinted = frozenset()
+
+    def refresh(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            assets = {}
+            if mtime is not None:
+                with open(self.path) as manifest:
+                    assets = json.load(manifest)
+            self.assets = assets
+            self.fingerprinted = frozenset(assets.values())
+            self._mtime = mtime
+        return self
+
+    @property
+    def version(self):
+        return self._mtime
+
+    def url_name(self, filename):
+        return self.refresh().assets.get(filename, filename)
+
+    def is_fingerprinted(self, filename):
+        return filename in self.refresh().fingerprinted
+
+def precompressed_variant(static_dir, filename, accept_encodings):
+    """Escolhe a variante .br/.gz aceita pelo cliente; (encoding, arquivo) ou (None, filename)"""
+    if filename.endswith(COMPRESSIBLE_EXTENSIONS):
+        for encoding, suffix in ENCODINGS:
+            if accept_encodings[encoding]:
+                path = safe_join(static_dir, filename + suffix)
+                if path and os.path.isfile(path):
+                    return encoding, filename + suffix
+    return None, filename
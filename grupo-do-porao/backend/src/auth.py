@@ -1,17 +1,19 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, Response, request, jsonify, session
 from src.models.user import db, User, Player
+from src.player_cache import player_cache
+from src.session_store import start_session
+from src.sharding import master_scope, place_new_master, player_login_candidates
+from src.security import HashingBusyError, login_throttle, login_throttle_settings
+from src.token_store import get_token_store, reset_token_ttl
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import secrets
 import string
-from datetime import datetime, timedelta
+from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__)
 
-# Armazenamento temporário para tokens de recuperação (em produção, usar Redis ou banco)
-password_reset_tokens = {}
-
 def generate_reset_token():
     return ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(32))
 
@@ -23,6 +25,22 @@ def send_reset_email(email, token):
     print(f"Link: http://localhost:5000/reset-password?token={token}")
     return True
 
+def throttle_keys(kind, username):
+    """Chaves de limitação de tentativas: IP do cliente e username"""
+    return (f"ip:{request.remote_addr}", f"{kind}:{username.lower()}")
+
+def throttled_response(keys):
+    """Retorna 429 antes de qualquer hashing se o IP ou username excedeu as tentativas"""
+    window, limits = login_throttle_settings()
+    retry_after = login_throttle.retry_after(keys, window, limits)
+    if retry_after is None:
+        return None
+    return jsonify({'error': 'Muitas tentativas de login. Tente novamente mais tarde'}), 429, {'Retry-After': str(retry_after)}
+
+def record_login_failure(keys):
+    window, _ = login_throttle_settings()
+    login_throttle.record_failure(keys, window)
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     try:
@@ -48,17 +66,20 @@ def register():
         
         db.session.add(user)
         db.session.commit()
+        place_new_master(user.id)
         
-        # Fazer login automático
-        session['user_id'] = user.id
-        session['username'] = user.username
-        session['is_master'] = user.is_master
+        # Fazer login automático (principal em cache na sessão para o check-session)
+        user_data = user.to_dict()
+        start_session(user_id=user.id, username=user.username, is_master=user.is_master, principal=user_data)
         
         return jsonify({
             'message': 'Usuário criado com sucesso',
-            'user': user.to_dict()
+            'user': user_data
         }), 201
         
+    except HashingBusyError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
@@ -74,22 +95,37 @@ def login():
         username = data['username'].strip()
         password = data['password']
         
+        keys = throttle_keys('master', username)
+        throttled = throttled_response(keys)
+        if throttled:
+            return throttled
+        
         # Buscar usuário
         user = User.query.filter_by(username=username).first()
         
         if not user or not user.check_password(password):
+            record_login_failure(keys)
             return jsonify({'error': 'Credenciais inválidas'}), 401
         
-        # Fazer login
-        session['user_id'] = user.id
-        session['username'] = user.username
-        session['is_master'] = user.is_master
+        login_throttle.reset(keys[1:])
+        
+        # Atualizar o hash para o custo configurado, aproveitando a senha em texto
+        if user.password_needs_rehash():
+            user.set_password(password)
+            db.session.commit()
+        
+        # Fazer login (principal em cache na sessão para o check-session)
+        user_data = user.to_dict()
+        start_session(user_id=user.id, username=user.username, is_master=user.is_master, principal=user_data)
         
         return jsonify({
             'message': 'Login realizado com sucesso',
-            'user': user.to_dict()
+            'user': user_data
         }), 200
         
+    except HashingBusyError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
@@ -104,23 +140,41 @@ def login_player():
         username = data['username'].strip()
         password = data['password']
         
-        # Buscar jogador
-        player = Player.query.filter_by(player_username=username).first()
-        
-        if not player or not player.check_player_password(password):
+        keys = throttle_keys('player', username)
+        throttled = throttled_response(keys)
+        if throttled:
+            return throttled
+        
+        # Buscar jogador (o mesmo login pode existir em mesas de shards diferentes)
+        player = None
+        for candidate in player_login_candidates(username):
+            if candidate.check_player_password(password):
+                player = candidate
+                break
+            db.session.expunge(candidate)
+        
+        if not player:
+            record_login_failure(keys)
             return jsonify({'error': 'Credenciais inválidas'}), 401
         
-        # Fazer login do jogador
-        session['player_id'] = player.id
-        session['player_name'] = player.name
-        session['master_id'] = player.master_id
-        session['is_player'] = True
+        login_throttle.reset(keys[1:])
         
-        return jsonify({
-            'message': 'Login do jogador realizado com sucesso',
-            'player': player.to_dict()
-        }), 200
+        with master_scope(player.master_id):
+            if player.player_password_needs_rehash():
+                player.set_player_password(password)
+                db.session.commit()
+            
+            # Fazer login do jogador
+            start_session(player_id=player.id, player_name=player.name, master_id=player.master_id, is_player=True)
+            
+            return jsonify({
+                'message': 'Login do jogador realizado com sucesso',
+                'player': player.to_dict()
+            }), 200
         
+    except HashingBusyError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
@@ -146,10 +200,7 @@ def forgot_password():
         
         # Gerar token de recuperação
         token = generate_reset_token()
-        password_reset_tokens[token] = {
-            'user_id': user.id,
-            'expires_at': datetime.utcnow() + timedelta(hours=1)
-        }
+        get_token_store().put(token, user.id, reset_token_ttl())
         
         # Enviar email
         if send_reset_email(email, token):
@@ -172,13 +223,13 @@ def reset_password():
         new_password = data['new_password']
         
         # Verificar token
-        if token not in password_reset_tokens:
+        token_store = get_token_store()
+        token_data = token_store.get(token)
+        if not token_data:
             return jsonify({'error': 'Token inválido'}), 400
         
-        token_data = password_reset_tokens[token]
-        
         if datetime.utcnow() > token_data['expires_at']:
-            del password_reset_tokens[token]
+            token_store.delete(token)
             return jsonify({'error': 'Token expirado'}), 400
         
         # Atualizar senha
@@ -190,10 +241,13 @@ def reset_password():
         db.session.commit()
         
         # Remover token usado
-        del password_reset_tokens[token]
+        token_store.delete(token)
         
         return jsonify({'message': 'Senha alterada com sucesso'}), 200
         
+    except HashingBusyError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
@@ -201,21 +255,26 @@ def reset_password():
 @auth_bp.route('/check-session', methods=['GET'])
 def check_session():
     if 'user_id' in session:
-        user = User.query.get(session['user_id'])
-        if user:
+        # Identidade do mestre servida da sessão, sem consultar o banco
+        principal = session.get('principal')
+        if principal is None:
+            user = User.query.get(session['user_id'])
+            if user:
+                principal = session['principal'] = user.to_dict()
+        if principal:
             return jsonify({
                 'logged_in': True,
-                'user': user.to_dict()
+                'user': principal
             }), 200
     
     if 'player_id' in session:
-        player = Player.query.get(session['player_id'])
-        if player:
-            return jsonify({
-                'logged_in': True,
-                'is_player': True,
-                'player': player.to_dict()
-            }), 200
+        # A ficha muda durante o jogo: validar apenas a versão e reaproveitar o JSON em cache
+        row = db.session.query(Player.id, Player.version).filter_by(id=session['player_id']).first()
+        if row:
+            body = player_cache.bodies_for([row])[0]
+            return Response(
+                b'{"logged_in": true, "is_player": true, "player": ' + body + b'}',
+                mimetype='application/json'
+            )
     
     return jsonify({'logged_in': False}), 200
-
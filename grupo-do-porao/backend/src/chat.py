@@ -0,0 +1,225 @@
+from flask import Blueprint, current_app, request, jsonify, session
+from src.models.user import db, ChatMessage
+from src.events import publish_event, current_master_id
+from sqlalchemy import func
+from collections import deque
+import json
+import threading
+
+chat_bp = Blueprint('chat', __name__)
+
+# Tamanho máximo de uma mensagem e de uma página do histórico
+MAX_MESSAGE_LENGTH = 2000
+MAX_HISTORY_PAGE = 200
+DEFAULT_HISTORY_PAGE = 50
+
+# Mensagens recentes mantidas em memória por mesa
+DEFAULT_BUFFER_SIZE = 200
+
+class TableBuffer:
+    """Mensagens mais recentes de uma mesa, em ordem de id.
+
+    floor é o menor id a partir do qual o buffer contém todas as mensagens
+    da mesa (0 enquanto nada foi descartado).
+    """
+
+    def __init__(self, messages, size, complete):
+        self.messages = deque(messages, maxlen=size)
+        self.floor = 0 if complete or not messages else messages[0]['id']
+
+    def append(self, message):
+        if self.messages and message['id'] < self.messages[-1]['id']:
+            # Commits simultâneos podem chegar fora de ordem
+            ordered = sorted(list(self.messages) + [message], key=lambda item: item['id'])
+            self.messages.clear()
+            self.messages.extend(ordered)
+        elif len(self.messages) == self.messages.maxlen:
+            self.messages.append(message)
+        else:
+            self.messages.append(message)
+            return
+        self.floor = self.messages[0]['id']
+
+    def covers(self, after_id):
+        return after_id >= self.floor
+
+    def after(self, after_id, limit):
+        messages = [message for message in self.messages if message['id'] > after_id]
+        return messages[:limit]
+
+    def latest(self, limit):
+        return list(self.messages)[-limit:]
+
+    def first_id(self):
+        return self.messages[0]['id'] if self.messages else 0
+
+    def last_id(self):
+        return self.messages[-1]['id'] if self.messages else None
+
+class ChatBuffers:
+    """Ring buffers por mesa para que clientes entrando na mesa recebam as mensagens sem ir ao banco"""
+
+    def __init__(self):
+        self._buffers = {}
+        self._table_locks = {}
+        self._lock = threading.Lock()
+
+    def table_lock(self, master_id):
+        """Lock do buffer de uma mesa: leituras de mesas diferentes não esperam umas pelas outras"""
+        with self._lock:
+            return self._table_locks.setdefault(master_id, threading.Lock())
+
+    def size(self):
+        return current_app.config.get('CHAT_BUFFER_SIZE', DEFAULT_BUFFER_SIZE)
+
+    def load(self, master_id):
+        size = self.size()
+        rows = (
+            ChatMessage.query.filter_by(master_id=master_id)
+            .order_by(ChatMessage.id.desc())
+            .limit(size)
+            .all()
+        )
+        messages = [message.to_dict() for message in reversed(rows)]
+        return TableBuffer(messages, size, len(rows) < size)
+
+    def in_sync(self, master_id, buffer):
+        """Confere se o buffer tem todas as mensagens gravadas a partir da primeira que guarda.
+
+        Só com vários workers (WORKER_PROCESSES > 1), que gravam mensagens que este
+        processo não vê: o último id e a contagem vêm do índice (master_id, id), sem
+        ler as mensagens. Com um único processo, todas as mensagens passam por append.
+        """
+        if current_app.config.get('WORKER_PROCESSES', 1) <= 1:
+            return True
+        last_id, count = (
+            db.session.query(func.max(ChatMessage.id), func.count(ChatMessage.id))
+            .filter(ChatMessage.master_id == master_id, ChatMessage.id >= buffer.first_id())
+            .one()
+        )
+        return last_id == buffer.last_id() and count == len(buffer.messages)
+
+    def read(self, master_id, after_id, limit):
+        """Mensagens da mesa a partir do buffer (as mais recentes, ou as posteriores a after_id);
+        None se o buffer não guarda mais todas as mensagens depois de after_id"""
+        with self.table_lock(master_id):
+            buffer = self._buffers.get(master_id)
+            if buffer is None or not self.in_sync(master_id, buffer):
+                # Buffer recarregado do banco quando há mensagens que ele não recebeu
+                buffer = self._buffers[master_id] = self.load(master_id)
+            if after_id is None:
+                return buffer.latest(limit)
+            if not buffer.covers(after_id):
+                return None
+            return buffer.after(after_id, limit)
+
+    def append(self, master_id, message):
+        with self.table_lock(master_id):
+            buffer = self._buffers.get(master_id)
+            # Buffers ainda não carregados vão buscar a mensagem no banco quando forem usados
+            if buffer is not None:
+                buffer.append(message)
+
+    def clear(self):
+        with self._lock:
+            self._buffers.clear()
+
+chat_buffers = ChatBuffers()
+
+def post_chat_message(master_id, author, content, player_id=None, kind='message', data=None):
+    """Grava uma mensagem, atualiza o buffer da mesa e notifica os clientes conectados"""
+    message = ChatMessage(
+        master_id=master_id,
+        player_id=player_id,
+        author=author,
+        kind=kind,
+        content=content,
+        data=json.dumps(data) if data is not None else None
+    )
+    db.session.add(message)
+    db.session.commit()
+
+    message_data = message.to_dict()
+    chat_buffers.append(master_id, message_data)
+    publish_event(master_id, 'chat_message', message_data)
+    return message_data
+
+def chat_author():
+    """(nome, player_id) de quem está escrevendo, a partir da sessão"""
+    if 'user_id' in session:
+        return session.get('username') or 'Mestre', None
+    return session.get('player_name') or 'Jogador', session.get('player_id')
+
+@chat_bp.route('/messages', methods=['POST'])
+def send_message():
+    master_id = current_master_id()
+    if master_id is None:
+        return jsonify({'error': 'Acesso negado'}), 403
+
+    try:
+        data = request.get_json() or {}
+        content = data.get('content')
+        if not isinstance(content, str) or not content.strip():
+            return jsonify({'error': 'Mensagem é obrigatória'}), 400
+        if len(content) > MAX_MESSAGE_LENGTH:
+            return jsonify({'error': f'Mensagem deve ter no máximo {MAX_MESSAGE_LENGTH} caracteres'}), 400
+
+        author, player_id = chat_author()
+        message = post_chat_message(master_id, author, content.strip(), player_id=player_id)
+
+        return jsonify({'message': message}), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@chat_bp.route('/messages', methods=['GET'])
+def get_messages():
+    """Mensagens da mesa.
+
+    Sem parâmetros: as mais recentes. ?after=<id>: novas mensagens (replay ao
+    entrar/reconectar, servido do buffer em memória). ?before=<id>: páginas
+    mais antigas do histórico, direto do banco.
+    """
+    master_id = current_master_id()
+    if master_id is None:
+        return jsonify({'error': 'Acesso negado'}), 403
+
+    try:
+        limit = min(max(request.args.get('limit', DEFAULT_HISTORY_PAGE, type=int), 1), MAX_HISTORY_PAGE)
+        after_id = request.args.get('after', type=int)
+        before_id = request.args.get('before', type=int)
+
+        if before_id is not None:
+            rows = (
+                ChatMessage.query
+                .filter(ChatMessage.master_id == master_id, ChatMessage.id < before_id)
+                .order_by(ChatMessage.id.desc())
+                .limit(limit)
+                .all()
+            )
+            messages = [message.to_dict() for message in reversed(rows)]
+            return jsonify({
+                'messages': messages,
+                'next_before': messages[0]['id'] if len(messages) == limit else None
+            }), 200
+
+        messages = chat_buffers.read(master_id, after_id, limit)
+        if messages is None:
+            # Cliente ficou desconectado por mais mensagens do que o buffer guarda
+            rows = (
+                ChatMessage.query
+                .filter(ChatMessage.master_id == master_id, ChatMessage.id > after_id)
+                .order_by(ChatMessage.id)
+                .limit(limit)
+                .all()
+            )
+            messages = [message.to_dict() for message in rows]
+
+        return jsonify({
+            'messages': messages,
+            'last_id': messages[-1]['id'] if messages else after_id
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
@@ -0,0 +1,61 @@
+from flask import request
+import gzip
+
+try:
+    import brotli
+except ImportError:  # Brotli é opcional: sem ele apenas gzip é oferecido
+    brotli = None
+
+# Tipos de conteúdo comprimidos dinamicamente
+COMPRESSIBLE_MIMETYPES = frozenset((
+    'application/json', 'application/x-ndjson', 'application/javascript',
+    'text/html', 'text/css', 'text/csv', 'text/plain', 'image/svg+xml'
+))
+
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 4
+
+def choose_encoding(accept_encodings):
+    """Melhor codificação aceita pelo cliente ('br', 'gzip' ou None)"""
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+def compress_body(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config.get('COMPRESS_BROTLI_QUALITY', DEFAULT_BROTLI_QUALITY))
+    return gzip.compress(data, compresslevel=config.get('COMPRESS_GZIP_LEVEL', DEFAULT_GZIP_LEVEL), mtime=0)
+
+def init_compression(app):
+    """Comprime respostas grandes com br/gzip conforme o Accept-Encoding do cliente"""
+    min_size = app.config.get('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE)
+
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code != 200
+                or response.direct_passthrough
+                or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        response.set_data(compress_body(data, encoding, app.config))
+        response.headers['Content-Encoding'] = encoding
+
+        # A representação comprimida é outra sequência de bytes: o ETag passa a ser fraco
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,133 @@
+from datetime import timedelta
+import os
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+class Config:
+    """Configuração da aplicação, com valores sobrescritos por variáveis de ambiente"""
+
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'rpg_grupo_porao_secret_key_2025')
+
+    # Sessões no servidor: o cookie guarda apenas o id assinado ('cookie' mantém a sessão do Flask)
+    SESSION_TYPE = os.environ.get('SESSION_TYPE', 'filesystem')
+    SESSION_FILE_DIR = os.environ.get('SESSION_FILE_DIR', os.path.join(BASE_DIR, 'flask_session'))
+    SESSION_FILE_THRESHOLD = env_int('SESSION_FILE_THRESHOLD', 10000)
+    SESSION_USE_SIGNER = True
+    PERMANENT_SESSION_LIFETIME = timedelta(seconds=env_int('SESSION_LIFETIME_SECONDS', 7 * 24 * 3600))
+    # Não regravar a sessão a cada requisição: apenas quando ela muda
+    SESSION_REFRESH_EACH_REQUEST = False
+
+    # Arquivos estáticos (gere as versões com hash com `flask --app main build-assets`)
+    STATIC_FOLDER = os.environ.get('STATIC_FOLDER', os.path.abspath(os.path.join(BASE_DIR, '..', 'static')))
+
+    # Banco de dados
+    SQLALCHEMY_DATABASE_URI = os.environ.get(
+        'DATABASE_URL',
+        f"sqlite:///{os.path.join(BASE_DIR, 'database', 'app.db')}"
+    )
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Pool de conexões
+    DB_POOL_SIZE = env_int('DB_POOL_SIZE', 5)
+    DB_MAX_OVERFLOW = env_int('DB_MAX_OVERFLOW', 10)
+    DB_POOL_TIMEOUT = env_int('DB_POOL_TIMEOUT', 30)
+    DB_POOL_RECYCLE = env_int('DB_POOL_RECYCLE', 1800)
+
+    # PRAGMAs aplicados a cada conexão SQLite
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = env_int('SQLITE_BUSY_TIMEOUT_MS', 5000)
+    SQLITE_MMAP_SIZE = env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+    SQLITE_CACHE_SIZE_KB = env_int('SQLITE_CACHE_SIZE_KB', 64 * 1024)
+
+    # Blueprints registrados pela aplicação ("modulo:atributo", prefixo de URL)
+    BLUEPRINTS = (
+        ('src.auth:auth_bp', '/api/auth'),
+        ('src.players:players_bp', '/api'),
+        ('src.inventory:inventory_bp', '/api'),
+        ('src.notes:notes_bp', '/api'),
+        ('src.dice:dice_bp', '/api/dice'),
+        ('src.events:events_bp', '/api/events'),
+        ('src.live_session:live_bp', '/api/live'),
+        ('src.chat:chat_bp', '/api/chat'),
+        ('src.game_state:game_state_bp', '/api'),
+        ('src.pages:pages_bp', None),
+        ('src.metrics:metrics_bp', None),
+    )
+
+    # Serialização JSON: 'auto' usa orjson se instalado, 'stdlib' força o provider padrão do Flask
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'auto')
+
+    # Compressão br/gzip das respostas acima de COMPRESS_MIN_SIZE bytes
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', '1') == '1'
+    COMPRESS_MIN_SIZE = env_int('COMPRESS_MIN_SIZE', 1024)
+    COMPRESS_GZIP_LEVEL = env_int('COMPRESS_GZIP_LEVEL', 6)
+    COMPRESS_BROTLI_QUALITY = env_int('COMPRESS_BROTLI_QUALITY', 4)
+
+    # Sessão ao vivo: status da party em memória, gravados no banco a cada intervalo
+    LIVE_SESSION_FLUSH_SECONDS = env_int('LIVE_SESSION_FLUSH_SECONDS', 5)
+    LIVE_SESSION_JOURNAL_DIR = os.environ.get('LIVE_SESSION_JOURNAL_DIR', os.path.join(BASE_DIR, 'live_journal'))
+    LIVE_SESSION_FSYNC = os.environ.get('LIVE_SESSION_FSYNC', '1') == '1'
+
+    # Processos servindo a aplicação (o gunicorn.conf.py preenche com o valor real). A sessão
+    # ao vivo fica na memória de um processo e só pode ser iniciada com um único worker
+    WORKER_PROCESSES = env_int('WORKER_PROCESSES', 1)
+
+    # Threads de cada worker (o gunicorn.conf.py preenche com o valor real). Cada stream SSE
+    # ocupa uma thread enquanto está conectado: acima de EVENT_STREAM_MAX_CLIENTS streams no
+    # processo, /api/events/stream responde 503. Com 0, o limite é WORKER_THREADS menos
+    # EVENT_STREAM_RESERVED_THREADS, que ficam livres para as demais requisições
+    WORKER_THREADS = env_int('WORKER_THREADS', 32)
+    EVENT_STREAM_MAX_CLIENTS = env_int('EVENT_STREAM_MAX_CLIENTS', 0)
+    EVENT_STREAM_RESERVED_THREADS = env_int('EVENT_STREAM_RESERVED_THREADS', 8)
+
+    # Chat: mensagens recentes de cada mesa mantidas em memória para o replay
+    CHAT_BUFFER_SIZE = env_int('CHAT_BUFFER_SIZE', 200)
+
+    # Estado do jogo: versões com patch mantidas em memória e tamanho máximo do documento
+    GAME_STATE_LOG_SIZE = env_int('GAME_STATE_LOG_SIZE', 100)
+    GAME_STATE_MAX_BYTES = env_int('GAME_STATE_MAX_BYTES', 512 * 1024)
+
+    # Histórico de notas: cópia completa a cada N revisões; a compactação deixa uma revisão
+    # por dia no histórico mais antigo que NOTE_REVISION_KEEP_DAYS
+    NOTE_SNAPSHOT_INTERVAL = env_int('NOTE_SNAPSHOT_INTERVAL', 20)
+    NOTE_REVISION_KEEP_DAYS = env_int('NOTE_REVISION_KEEP_DAYS', 30)
+
+    # Sharding por mestre: dados de cada mesa em um banco (SQLite) ou schema (PostgreSQL) próprio.
+    # SHARD_URL recebe {shard}; o catálogo de rotas fica no banco principal
+    SHARDING_ENABLED = os.environ.get('SHARDING_ENABLED', '0') == '1'
+    SHARD_URL = os.environ.get(
+        'SHARD_URL',
+        f"sqlite:///{os.path.join(BASE_DIR, 'database', 'shards', '{shard}.db')}"
+    )
+    SHARD_NAME_TEMPLATE = os.environ.get('SHARD_NAME_TEMPLATE', 'master_{master_id}')
+    SHARD_NEW_MASTERS = os.environ.get('SHARD_NEW_MASTERS', '1') == '1'
+    SHARD_MAX_OPEN_ENGINES = env_int('SHARD_MAX_OPEN_ENGINES', 32)
+    SHARD_ROUTE_CACHE_SECONDS = env_int('SHARD_ROUTE_CACHE_SECONDS', 30)
+
+    # Métricas Prometheus em /metrics: exige "Authorization: Bearer <METRICS_TOKEN>";
+    # sem token o endpoint fica fechado, a menos que METRICS_PUBLIC=1
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', '0') == '1'
+
+    # Perfilador por amostragem: grava pilhas das requisições acima deste limite (ms)
+    PROFILE_SLOW_REQUESTS_MS = env_int('PROFILE_SLOW_REQUESTS_MS', 0)
+    PROFILE_SAMPLE_INTERVAL_MS = env_int('PROFILE_SAMPLE_INTERVAL_MS', 5)
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+
+    # Custo do hash de senhas (hashes antigos são atualizados no próximo login)
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+
+class TestConfig(Config):
+    """Banco em memória e hashing barato para testes e benchmarks"""
+
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    RESET_TOKEN_STORE = 'memory'
+    SESSION_TYPE = 'cookie'
@@ -0,0 +1,112 @@
+from flask_migrate import Migrate, stamp, upgrade
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, StaticPool
+from src.models.user import db, reset_note_search_cache
+import os
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+# Revisão correspondente ao esquema criado pelo antigo db.create_all()
+BASELINE_REVISION = '0001_baseline'
+
+migrate = Migrate()
+
+SQLITE_JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+SQLITE_SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+def is_sqlite_memory(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+def engine_options(config):
+    """Monta SQLALCHEMY_ENGINE_OPTIONS a partir da configuração da aplicação"""
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+
+    if is_sqlite_memory(url):
+        # Banco em memória: uma única conexão compartilhada entre threads
+        return {
+            'poolclass': StaticPool,
+            'connect_args': {'check_same_thread': False}
+        }
+
+    options = {
+        'poolclass': QueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': url.get_backend_name() != 'sqlite'
+    }
+    if url.get_backend_name() == 'sqlite':
+        options['connect_args'] = {
+            'timeout': config['SQLITE_BUSY_TIMEOUT_MS'] / 1000,
+            'check_same_thread': False
+        }
+    return options
+
+def sqlite_pragmas(config):
+    """Lista de PRAGMAs executados em cada nova conexão SQLite"""
+    journal_mode = config['SQLITE_JOURNAL_MODE'].upper()
+    synchronous = config['SQLITE_SYNCHRONOUS'].upper()
+    if journal_mode not in SQLITE_JOURNAL_MODES:
+        raise ValueError(f'SQLITE_JOURNAL_MODE inválido: {journal_mode}')
+    if synchronous not in SQLITE_SYNCHRONOUS_MODES:
+        raise ValueError(f'SQLITE_SYNCHRONOUS inválido: {synchronous}')
+
+    return [
+        f"PRAGMA journal_mode={journal_mode}",
+        f"PRAGMA synchronous={synchronous}",
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}",
+        # Valor negativo: tamanho do cache em KiB em vez de páginas
+        f"PRAGMA cache_size=-{int(config['SQLITE_CACHE_SIZE_KB'])}",
+        "PRAGMA temp_store=MEMORY"
+    ]
+
+def install_sqlite_pragmas(engine, config):
+    """Registra os PRAGMAs de desempenho para as conexões de um engine SQLite"""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas(config)
+    if is_sqlite_memory(engine.url):
+        # WAL e mmap não se aplicam a bancos em memória
+        pragmas = [pragma for pragma in pragmas if 'journal_mode' not in pragma and 'mmap_size' not in pragma]
+
+    @event.listens_for(engine, 'connect')
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+def configure_database(app):
+    """Inicializa o SQLAlchemy com pool e PRAGMAs definidos na configuração"""
+    options = engine_options(app.config)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    db.init_app(app)
+    migrate.init_app(app, db, directory=MIGRATIONS_DIR, render_as_batch=True)
+
+    with app.app_context():
+        install_sqlite_pragmas(db.engine, app.config)
+
+def upgrade_database(app):
+    """Aplica as migrações pendentes.
+
+    Bancos criados antes das migrações (sem a tabela alembic_version) são
+    marcados na revisão base antes do upgrade.
+    """
+    with app.app_context():
+        tables = db.inspect(db.engine).get_table_names()
+        if 'alembic_version' not in tables and 'user' in tables:
+            stamp(revision=BASELINE_REVISION)
+        upgrade()
+    # O esquema (ex: índice FTS5 das notas) pode ter mudado
+    reset_note_search_cache()
+
+    # Shards existentes recebem as mesmas migrações
+    from src.sharding import upgrade_shards
+    upgrade_shards(app)
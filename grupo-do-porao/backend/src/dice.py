@@ -1,9 +1,20 @@
 from flask import Blueprint, request, jsonify, session
 from src.models.user import db, DiceRoll
+from src.events import publish_event
+from src.chat import chat_author, post_chat_message
+from src.http_cache import compute_etag, conditional_response
+from src.dice_notation import DiceExpressionError, parse_expression, normalize_expression, roll_groups
+from src.dice_probability import probability_summary
+from sqlalchemy import and_, case, func, or_
+from datetime import datetime
+import base64
 import random
 
 dice_bp = Blueprint('dice', __name__)
 
+# Tamanho máximo de página do histórico de rolagens
+MAX_HISTORY_PAGE = 200
+
 @dice_bp.route('/roll', methods=['POST'])
 def roll_dice():
     try:
@@ -48,36 +59,250 @@ def roll_dice():
             elif result == 1:
                 special_effect = 'critical_failure'
         
-        return jsonify({
+        roll_data = {
             'dice_type': dice_type,
             'result': result,
             'special_effect': special_effect,
             'timestamp': dice_roll.created_at.isoformat() if 'dice_roll' in locals() else None
-        }), 200
+        }
+        
+        if 'dice_roll' in locals():
+            publish_event(dice_roll.master_id, 'dice_roll', dict(roll_data, id=dice_roll.id, player_id=dice_roll.player_id))
+            
+            # Opcionalmente publicar a rolagem no chat da mesa
+            if data.get('chat'):
+                author, player_id = chat_author()
+                post_chat_message(
+                    dice_roll.master_id,
+                    author,
+                    f'rolou d{dice_type}: {result}',
+                    player_id=player_id,
+                    kind='dice_roll',
+                    data=dict(roll_data, id=dice_roll.id)
+                )
+        
+        return jsonify(roll_data), 200
         
     except Exception as e:
         if 'dice_roll' in locals():
             db.session.rollback()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
-@dice_bp.route('/history', methods=['GET'])
-def get_dice_history():
+@dice_bp.route('/roll-batch', methods=['POST'])
+def roll_batch():
     try:
+        data = request.get_json()
+        
+        if not data or not data.get('expression'):
+            return jsonify({'error': 'Expressão de dados é obrigatória'}), 400
+        
+        try:
+            groups = parse_expression(data['expression'])
+        except DiceExpressionError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        results, total = roll_groups(groups)
+        
         if 'user_id' in session:
-            # Mestre pode ver todo o histórico
             master_id = session['user_id']
-            rolls = DiceRoll.query.filter_by(master_id=master_id).order_by(DiceRoll.created_at.desc()).limit(50).all()
+            player_id = data.get('player_id')
         elif 'player_id' in session:
-            # Jogador vê apenas suas rolagens
+            master_id = session['master_id']
             player_id = session['player_id']
-            rolls = DiceRoll.query.filter_by(player_id=player_id).order_by(DiceRoll.created_at.desc()).limit(20).all()
         else:
+            master_id = None
+            player_id = None
+        
+        timestamp = None
+        if master_id is not None:
+            # Persistir todos os dados da expressão em um único INSERT e um único commit
+            created_at = datetime.utcnow()
+            rows = [
+                {
+                    'dice_type': group['sides'],
+                    'result': value,
+                    'master_id': master_id,
+                    'player_id': player_id,
+                    'created_at': created_at
+                }
+                for group in results if 'rolls' in group
+                for value in group['rolls']
+            ]
+            if rows:
+                db.session.execute(db.insert(DiceRoll), rows)
+                db.session.commit()
+            timestamp = created_at.isoformat()
+        
+        batch_data = {
+            'expression': normalize_expression(groups),
+            'groups': results,
+            'total': total,
+            'dice_count': sum(len(group['rolls']) for group in results if 'rolls' in group),
+            'timestamp': timestamp
+        }
+        
+        if master_id is not None:
+            publish_event(master_id, 'dice_batch', dict(batch_data, player_id=player_id))
+        
+        return jsonify(batch_data), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+def encode_cursor(roll):
+    """Gera um cursor opaco a partir da última rolagem retornada"""
+    raw = f"{roll.created_at.isoformat()}|{roll.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    created_at, roll_id = raw.rsplit('|', 1)
+    return datetime.fromisoformat(created_at), int(roll_id)
+
+def history_scope():
+    """Retorna o filtro de histórico da sessão atual e o limite padrão de página"""
+    if 'user_id' in session:
+        # Mestre pode ver todo o histórico
+        return DiceRoll.master_id == session['user_id'], 50
+    if 'player_id' in session:
+        # Jogador vê apenas suas rolagens
+        return DiceRoll.player_id == session['player_id'], 20
+    return None, None
+
+@dice_bp.route('/history', methods=['GET'])
+def get_dice_history():
+    try:
+        scope, default_limit = history_scope()
+        if scope is None:
             return jsonify({'error': 'Acesso negado'}), 403
         
+        limit = min(max(request.args.get('limit', default_limit, type=int), 1), MAX_HISTORY_PAGE)
+        query = DiceRoll.query.filter(scope)
+        
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                cursor_created_at, cursor_id = decode_cursor(cursor)
+            except (ValueError, UnicodeDecodeError):
+                return jsonify({'error': 'Cursor inválido'}), 400
+            # Paginação por chave: continua exatamente após a última rolagem vista
+            query = query.filter(or_(
+                DiceRoll.created_at < cursor_created_at,
+                and_(DiceRoll.created_at == cursor_created_at, DiceRoll.id < cursor_id)
+            ))
+        
+        # Rolagens nunca são editadas: a mais recente do escopo identifica a versão do histórico
+        newest = db.session.query(DiceRoll.id).filter(scope).order_by(DiceRoll.created_at.desc(), DiceRoll.id.desc()).first()
+        etag = compute_etag(
+            'dice_history', session.get('user_id'), session.get('player_id'),
+            newest.id if newest else None, limit, cursor
+        )
+        
+        def build():
+            rolls = query.order_by(DiceRoll.created_at.desc(), DiceRoll.id.desc()).limit(limit + 1).all()
+            
+            has_more = len(rolls) > limit
+            rolls = rolls[:limit]
+            
+            return jsonify({
+                'rolls': [roll.to_dict() for roll in rolls],
+                'next_cursor': encode_cursor(rolls[-1]) if has_more else None
+            }), 200
+        
+        return conditional_response(etag, build)
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@dice_bp.route('/stats', methods=['GET'])
+def get_dice_stats():
+    try:
+        scope, _ = history_scope()
+        if scope is None:
+            return jsonify({'error': 'Acesso negado'}), 403
+        
+        filters = [scope]
+        if 'user_id' in session and request.args.get('player_id'):
+            filters.append(DiceRoll.player_id == request.args.get('player_id', type=int))
+        if request.args.get('dice_type'):
+            filters.append(DiceRoll.dice_type == request.args.get('dice_type', type=int))
+        
+        # Resumo por jogador e tipo de dado calculado inteiramente no banco
+        summary_rows = db.session.query(
+            DiceRoll.player_id,
+            DiceRoll.dice_type,
+            func.count(DiceRoll.id),
+            func.avg(DiceRoll.result),
+            func.min(DiceRoll.result),
+            func.max(DiceRoll.result),
+            func.sum(case((DiceRoll.result == DiceRoll.dice_type, 1), else_=0)),
+            func.sum(case((DiceRoll.result == 1, 1), else_=0))
+        ).filter(*filters).group_by(DiceRoll.player_id, DiceRoll.dice_type).all()
+        
+        distribution_rows = db.session.query(
+            DiceRoll.player_id,
+            DiceRoll.dice_type,
+            DiceRoll.result,
+            func.count(DiceRoll.id)
+        ).filter(*filters).group_by(DiceRoll.player_id, DiceRoll.dice_type, DiceRoll.result).all()
+        
+        distributions = {}
+        for player_id, dice_type, result, count in distribution_rows:
+            distributions.setdefault((player_id, dice_type), {})[result] = count
+        
+        stats = []
+        total_rolls = 0
+        for player_id, dice_type, count, average, minimum, maximum, crit_success, crit_failure in summary_rows:
+            total_rolls += count
+            stats.append({
+                'player_id': player_id,
+                'dice_type': dice_type,
+                'count': count,
+                'average': round(float(average), 3) if average is not None else None,
+                'expected_average': (dice_type + 1) / 2,
+                'min': minimum,
+                'max': maximum,
+                'critical_successes': int(crit_success or 0),
+                'critical_failures': int(crit_failure or 0),
+                'critical_success_rate': round((crit_success or 0) / count, 4) if count else 0,
+                'critical_failure_rate': round((crit_failure or 0) / count, 4) if count else 0,
+                'distribution': distributions.get((player_id, dice_type), {})
+            })
+        
         return jsonify({
-            'rolls': [roll.to_dict() for roll in rolls]
+            'stats': stats,
+            'total_rolls': total_rolls
         }), 200
         
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+@dice_bp.route('/probability', methods=['GET'])
+def get_dice_probability():
+    """Distribuição de uma expressão de dados e chance de atingir a CD (?expression=4d6kh3&dc=12).
+
+    Expressões pequenas têm a distribuição exata; as maiores são estimadas por
+    Monte Carlo, com intervalo de confiança de 95% para a chance de sucesso.
+    """
+    try:
+        expression = request.args.get('expression', '')
+        dc = request.args.get('dc', type=int)
+        if 'dc' in request.args and dc is None:
+            return jsonify({'error': 'CD deve ser um número inteiro'}), 400
+        
+        try:
+            normalized = normalize_expression(parse_expression(expression))
+        except DiceExpressionError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # O resultado depende apenas da expressão normalizada e da CD
+        etag = compute_etag('dice-probability', normalized, dc)
+        
+        def build():
+            return jsonify(probability_summary(normalized, dc)), 200
+        
+        return conditional_response(etag, build)
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
@@ -0,0 +1,128 @@
+import random
+import re
+
+# Limites para evitar expressões abusivas (ex: 100000d100000)
+MAX_DICE = 200
+MAX_SIDES = 1000
+MAX_GROUPS = 20
+
+TOKEN_RE = re.compile(r'\s*([+-])?\s*(?:(\d*)d(\d+|%)(?:(kh|kl|k)(\d+))?|(\d+))', re.IGNORECASE)
+
+class DiceExpressionError(ValueError):
+    """Erro de sintaxe ou limite em uma expressão de dados"""
+    pass
+
+def parse_expression(expression):
+    """Converte uma expressão como "4d6kh3+1d8-2" em uma lista de grupos.
+
+    Cada grupo é um dicionário com 'sign' e, para dados, 'count', 'sides' e
+    'keep' (('h'|'l', n) ou None); para modificadores fixos, 'value'.
+    """
+    if not expression or not isinstance(expression, str):
+        raise DiceExpressionError('Expressão de dados é obrigatória')
+
+    text = expression.strip()
+    groups = []
+    total_dice = 0
+    position = 0
+
+    while position < len(text):
+        match = TOKEN_RE.match(text, position)
+        if not match or match.end() == position:
+            raise DiceExpressionError(f'Expressão inválida perto de "{text[position:]}"')
+
+        sign_symbol, count, sides, keep_mode, keep_count, constant = match.groups()
+        if sign_symbol is None and groups:
+            raise DiceExpressionError(f'Operador ausente perto de "{text[position:]}"')
+        sign = -1 if sign_symbol == '-' else 1
+
+        if constant is not None:
+            groups.append({'sign': sign, 'value': int(constant)})
+        else:
+            count = int(count) if count else 1
+            sides = 100 if sides == '%' else int(sides)
+
+            if count < 1:
+                raise DiceExpressionError('Quantidade de dados deve ser pelo menos 1')
+            if sides < 2 or sides > MAX_SIDES:
+                raise DiceExpressionError(f'Número de faces deve estar entre 2 e {MAX_SIDES}')
+
+            keep = None
+            if keep_mode:
+                keep_count = int(keep_count)
+                if keep_count < 1 or keep_count > count:
+                    raise DiceExpressionError('Quantidade mantida deve estar entre 1 e a quantidade de dados')
+                keep = ('l' if keep_mode.lower() == 'kl' else 'h', keep_count)
+
+            total_dice += count
+            groups.append({'sign': sign, 'count': count, 'sides': sides, 'keep': keep})
+
+        position = match.end()
+
+    if not groups:
+        raise DiceExpressionError('Expressão de dados é obrigatória')
+    if len(groups) > MAX_GROUPS:
+        raise DiceExpressionError(f'Máximo de {MAX_GROUPS} grupos por expressão')
+    if total_dice > MAX_DICE:
+        raise DiceExpressionError(f'Máximo de {MAX_DICE} dados por rolagem')
+
+    return groups
+
+def group_notation(group):
+    """Representação canônica de um grupo (sem sinal)"""
+    if 'value' in group:
+        return str(group['value'])
+    notation = f"{group['count']}d{group['sides']}"
+    if group['keep']:
+        notation += f"k{group['keep'][0]}{group['keep'][1]}"
+    return notation
+
+def normalize_expression(groups):
+    """Representação canônica de uma expressão já interpretada"""
+    parts = []
+    for index, group in enumerate(groups):
+        if group['sign'] < 0:
+            parts.append('-')
+        elif index > 0:
+            parts.append('+')
+        parts.append(group_notation(group))
+    return ''.join(parts)
+
+def kept_indices(rolls, keep):
+    """Índices dos dados mantidos de acordo com a regra kh/kl"""
+    if not keep:
+        return list(range(len(rolls)))
+    mode, amount = keep
+    ordered = sorted(range(len(rolls)), key=lambda i: rolls[i], reverse=(mode == 'h'))
+    return sorted(ordered[:amount])
+
+def roll_groups(groups, rng=random):
+    """Rola todos os grupos de uma expressão e retorna os resultados detalhados"""
+    results = []
+    total = 0
+
+    for group in groups:
+        if 'value' in group:
+            subtotal = group['sign'] * group['value']
+            results.append({
+                'notation': group_notation(group),
+                'sign': group['sign'],
+                'modifier': group['value'],
+                'subtotal': subtotal
+            })
+        else:
+            # Todos os dados do grupo em uma única chamada
+            rolls = rng.choices(range(1, group['sides'] + 1), k=group['count'])
+            kept = kept_indices(rolls, group['keep'])
+            subtotal = group['sign'] * sum(rolls[i] for i in kept)
+            results.append({
+                'notation': group_notation(group),
+                'sign': group['sign'],
+                'sides': group['sides'],
+                'rolls': rolls,
+                'kept': kept,
+                'subtotal': subtotal
+            })
+        total += subtotal
+
+    return results, total
@@ -0,0 +1,220 @@
+from src.dice_notation import group_notation, normalize_expression, parse_expression
+from collections import Counter
+from functools import lru_cache
+from itertools import accumulate, combinations_with_replacement
+from math import comb, factorial, sqrt
+import random
+import zlib
+
+try:
+    import numpy
+except ImportError:  # NumPy é opcional: sem ele a simulação roda em Python puro
+    numpy = None
+
+# Orçamento de operações para calcular a distribuição exata; acima disso, Monte Carlo
+EXACT_MAX_OPERATIONS = 2_000_000
+
+# Amostras da simulação e limite de dados rolados individualmente (grupos kh/kl grandes)
+MONTE_CARLO_SAMPLES = 20_000
+MONTE_CARLO_MAX_DICE_ROLLS = 2_000_000
+
+# Distribuições com mais resultados possíveis que isso não são enviadas por completo
+MAX_DISTRIBUTION_POINTS = 2000
+
+# Expressões normalizadas mantidas em cache
+CACHE_SIZE = 256
+
+# z da normal para o intervalo de confiança de 95%
+CONFIDENCE_Z = 1.96
+
+class Distribution:
+    """Distribuição exata: counts[i] maneiras de obter offset + i, em denominator resultados"""
+
+    def __init__(self, offset, counts, denominator):
+        self.offset = offset
+        self.counts = counts
+        self.denominator = denominator
+
+    def negated(self):
+        return Distribution(-(self.offset + len(self.counts) - 1), self.counts[::-1], self.denominator)
+
+    def convolve(self, other):
+        counts = [0] * (len(self.counts) + len(other.counts) - 1)
+        for i, a in enumerate(self.counts):
+            if a:
+                for j, b in enumerate(other.counts):
+                    counts[i + j] += a * b
+        return Distribution(self.offset + other.offset, counts, self.denominator * other.denominator)
+
+    def items(self):
+        return [(self.offset + index, count) for index, count in enumerate(self.counts) if count]
+
+def group_range(group):
+    if 'value' in group:
+        return 1
+    amount = group['keep'][1] if group['keep'] else group['count']
+    return amount * (group['sides'] - 1) + 1
+
+def exact_cost(group):
+    """Operações aproximadas para a distribuição exata de um grupo"""
+    if 'value' in group:
+        return 0
+    if group['keep']:
+        # Um termo por multiconjunto de resultados
+        return comb(group['sides'] + group['count'] - 1, group['count']) * group['count']
+    return group['count'] * group_range(group)
+
+def expression_cost(groups):
+    cost = sum(exact_cost(group) for group in groups)
+    width = 1
+    for group in groups:
+        cost += width * group_range(group)
+        width += group_range(group) - 1
+    return cost
+
+def uniform_sum(count, sides):
+    """Soma de count dados de sides faces, um dado por vez com somas de prefixo"""
+    counts = [1]
+    for _ in range(count):
+        prefix = [0] + list(accumulate(counts))
+        size = len(counts) + sides - 1
+        counts = [
+            prefix[min(total + 1, len(counts))] - prefix[max(total - sides + 1, 0)]
+            for total in range(size)
+        ]
+    return Distribution(count, counts, sides ** count)
+
+def keep_sum(count, sides, keep):
+    """Soma dos dados mantidos (kh/kl), enumerando multiconjuntos com seus pesos multinomiais"""
+    mode, amount = keep
+    totals = Counter()
+    for faces in combinations_with_replacement(range(1, sides + 1), count):
+        kept = faces[-amount:] if mode == 'h' else faces[:amount]
+        weight = factorial(count)
+        for multiplicity in Counter(faces).values():
+            weight //= factorial(multiplicity)
+        totals[sum(kept)] += weight
+    offset = min(totals)
+    counts = [totals.get(offset + index, 0) for index in range(max(totals) - offset + 1)]
+    return Distribution(offset, counts, sides ** count)
+
+def group_distribution(group):
+    if 'value' in group:
+        distribution = Distribution(group['value'], [1], 1)
+    elif group['keep']:
+        distribution = keep_sum(group['count'], group['sides'], group['keep'])
+    else:
+        distribution = uniform_sum(group['count'], group['sides'])
+    return distribution.negated() if group['sign'] < 0 else distribution
+
+def exact_distribution(groups):
+    result = Distribution(0, [1], 1)
+    for group in groups:
+        result = result.convolve(group_distribution(group))
+    return result
+
+def sample_groups_python(groups, samples, seed):
+    rng = random.Random(seed)
+    totals = [0] * samples
+    for group in groups:
+        if 'value' in group:
+            draws = [group['sign'] * group['value']] * samples
+        elif exact_cost(group) <= EXACT_MAX_OPERATIONS:
+            # Sorteia direto da distribuição exata do grupo: um sorteio por amostra
+            values, weights = zip(*group_distribution(group).items())
+            draws = rng.choices(values, cum_weights=list(accumulate(weights)), k=samples)
+        else:
+            mode, amount = group['keep'] or ('h', group['count'])
+            faces = range(1, group['sides'] + 1)
+            draws = []
+            for _ in range(samples):
+                rolls = sorted(rng.choices(faces, k=group['count']))
+                draws.append(group['sign'] * sum(rolls[-amount:] if mode == 'h' else rolls[:amount]))
+        totals = [total + draw for total, draw in zip(totals, draws)]
+    return Counter(totals)
+
+def sample_groups_numpy(groups, samples, seed):
+    rng = numpy.random.default_rng(seed)
+    totals = numpy.zeros(samples, dtype=numpy.int64)
+    for group in groups:
+        if 'value' in group:
+            totals += group['sign'] * group['value']
+        elif exact_cost(group) <= EXACT_MAX_OPERATIONS:
+            distribution = group_distribution(group)
+            values, weights = zip(*distribution.items())
+            probabilities = numpy.array([weight / distribution.denominator for weight in weights])
+            totals += rng.choice(numpy.array(values, dtype=numpy.int64), size=samples, p=probabilities / probabilities.sum())
+        else:
+            mode, amount = group['keep'] or ('h', group['count'])
+            rolls = numpy.sort(rng.integers(1, group['sides'] + 1, size=(samples, group['count'])), axis=1)
+            kept = rolls[:, -amount:] if mode == 'h' else rolls[:, :amount]
+            totals += group['sign'] * kept.sum(axis=1)
+    values, counts = numpy.unique(totals, return_counts=True)
+    return Counter(dict(zip(values.tolist(), counts.tolist())))
+
+def monte_carlo_samples(groups):
+    """Amostras da simulação, reduzidas quando cada amostra rola muitos dados individualmente"""
+    rolled = sum(group['count'] for group in groups if 'value' not in group and exact_cost(group) > EXACT_MAX_OPERATIONS)
+    if not rolled:
+        return MONTE_CARLO_SAMPLES
+    return max(1000, min(MONTE_CARLO_SAMPLES, MONTE_CARLO_MAX_DICE_ROLLS // rolled))
+
+@lru_cache(maxsize=CACHE_SIZE)
+def analyze(expression):
+    """Distribuição de uma expressão normalizada: (método, [(total, contagem)], denominador)
+
+    Expressões pequenas são calculadas exatamente por convolução; as demais por
+    Monte Carlo (NumPy, se instalado), com semente derivada da expressão para
+    que a mesma consulta sempre dê a mesma estimativa.
+    """
+    groups = parse_expression(expression)
+    if expression_cost(groups) <= EXACT_MAX_OPERATIONS:
+        distribution = exact_distribution(groups)
+        return 'exact', tuple(distribution.items()), distribution.denominator
+
+    samples = monte_carlo_samples(groups)
+    seed = zlib.crc32(expression.encode('utf-8'))
+    sampler = sample_groups_numpy if numpy is not None else sample_groups_python
+    counts = sampler(groups, samples, seed)
+    return 'monte_carlo', tuple(sorted(counts.items())), samples
+
+def wilson_interval(successes, samples, z=CONFIDENCE_Z):
+    """Intervalo de confiança de Wilson para uma proporção"""
+    proportion = successes / samples
+    denominator = 1 + z * z / samples
+    center = (proportion + z * z / (2 * samples)) / denominator
+    margin = z * sqrt(proportion * (1 - proportion) / samples + z * z / (4 * samples * samples)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+def probability_summary(expression, dc=None):
+    """Resumo da distribuição de uma expressão de dados e, com dc, a chance de total >= dc"""
+    groups = parse_expression(expression)
+    normalized = normalize_expression(groups)
+    method, items, denominator = analyze(normalized)
+
+    mean = sum(total * count for total, count in items) / denominator
+    variance = sum(count * (total - mean) ** 2 for total, count in items) / denominator
+    summary = {
+        'expression': normalized,
+        'groups': [group_notation(group) for group in groups],
+        'method': method,
+        'samples': denominator if method == 'monte_carlo' else None,
+        'min': items[0][0],
+        'max': items[-1][0],
+        'mean': round(mean, 4),
+        'stddev': round(sqrt(variance), 4),
+        'distribution': (
+            {total: count / denominator for total, count in items}
+            if len(items) <= MAX_DISTRIBUTION_POINTS else None
+        ),
+        'dc': dc,
+        'success_probability': None,
+        'confidence_interval': None
+    }
+
+    if dc is not None:
+        successes = sum(count for total, count in items if total >= dc)
+        summary['success_probability'] = successes / denominator
+        if method == 'monte_carlo':
+            summary['confidence_interval'] = list(wilson_interval(successes, denominator))
+    return summary
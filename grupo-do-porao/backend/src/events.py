@@ -0,0 +1,135 @@
+from flask import Blueprint, Response, current_app, jsonify, session, stream_with_context
+import json
+import queue
+import threading
+
+events_bp = Blueprint('events', __name__)
+
+# Intervalo (segundos) entre comentários de keepalive enviados para conexões ociosas
+KEEPALIVE_INTERVAL = 15
+
+# Quantidade máxima de eventos pendentes por cliente antes de descartar os mais antigos
+MAX_PENDING_EVENTS = 100
+
+class EventBroker:
+    """Distribui eventos em memória para os clientes inscritos em cada mesa (master_id)"""
+
+    def __init__(self, max_pending=MAX_PENDING_EVENTS):
+        self.max_pending = max_pending
+        self._subscribers = {}
+        self._counters = {}
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, master_id, limit=None):
+        """Inscreve um cliente na mesa; None se o processo já tem limit clientes conectados"""
+        subscriber = queue.Queue(maxsize=self.max_pending)
+        with self._lock:
+            if limit is not None and self._total >= limit:
+                return None
+            self._subscribers.setdefault(master_id, set()).add(subscriber)
+            self._total += 1
+        return subscriber
+
+    def unsubscribe(self, master_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(master_id)
+            if not subscribers or subscriber not in subscribers:
+                return
+            subscribers.discard(subscriber)
+            self._total -= 1
+            if not subscribers:
+                del self._subscribers[master_id]
+
+    def publish(self, master_id, event_type, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(master_id, ()))
+            if not subscribers:
+                return
+            event_id = self._counters.get(master_id, 0) + 1
+            self._counters[master_id] = event_id
+
+        # Serializar uma única vez e reaproveitar a mensagem para todos os clientes
+        message = f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # Cliente lento: descartar o evento mais antigo para não bloquear a mesa
+                try:
+                    subscriber.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    subscriber.put_nowait(message)
+                except queue.Full:
+                    pass
+
+    def subscriber_count(self, master_id):
+        with self._lock:
+            return len(self._subscribers.get(master_id, ()))
+
+    def total_subscribers(self):
+        with self._lock:
+            return self._total
+
+broker = EventBroker()
+
+def publish_event(master_id, event_type, data):
+    """Publica um evento para todos os clientes conectados à mesa do mestre"""
+    if master_id is None:
+        return
+    broker.publish(master_id, event_type, data)
+
+def stream_limit(config):
+    """Streams SSE simultâneos permitidos no processo (ver EVENT_STREAM_MAX_CLIENTS)"""
+    if config.get('EVENT_STREAM_MAX_CLIENTS'):
+        return config['EVENT_STREAM_MAX_CLIENTS']
+    return max(1, config.get('WORKER_THREADS', 32) - config.get('EVENT_STREAM_RESERVED_THREADS', 8))
+
+def current_master_id():
+    """Retorna o master_id da mesa associada à sessão atual (mestre ou jogador)"""
+    if 'user_id' in session:
+        return session['user_id']
+    if 'player_id' in session:
+        return session.get('master_id')
+    return None
+
+@events_bp.route('/stream', methods=['GET'])
+def stream_events():
+    master_id = current_master_id()
+    if master_id is None:
+        return jsonify({'error': 'Acesso negado'}), 403
+
+    # Sem limite, os streams ocupariam todas as threads do worker e as demais requisições esperariam
+    subscriber = broker.subscribe(master_id, limit=stream_limit(current_app.config))
+    if subscriber is None:
+        response = jsonify({'error': 'Limite de conexões de eventos atingido, tente novamente em instantes'})
+        response.headers['Retry-After'] = str(KEEPALIVE_INTERVAL)
+        return response, 503
+
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = subscriber.get(timeout=KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield message
+        finally:
+            broker.unsubscribe(master_id, subscriber)
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+    # O finally do gerador não roda se o servidor fechar a resposta sem iterá-la
+    response.call_on_close(lambda: broker.unsubscribe(master_id, subscriber))
+    return response
@@ -0,0 +1,228 @@
+from flask import Blueprint, current_app, request, jsonify, session
+from src.models.user import db, GameState
+from src.events import publish_event
+from src.json_patch import JsonPatchError, apply_patch, make_patch
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from collections import deque
+from datetime import datetime
+import json
+import threading
+
+game_state_bp = Blueprint('game_state', __name__)
+
+# Versões mantidas em memória para responder ?since= com deltas
+DEFAULT_LOG_SIZE = 100
+
+# Tamanho máximo do documento serializado
+DEFAULT_MAX_BYTES = 512 * 1024
+
+def require_master():
+    """Decorator para verificar se o usuário é um mestre logado"""
+    if 'user_id' not in session or not session.get('is_master'):
+        return jsonify({'error': 'Acesso negado. Apenas mestres podem acessar esta funcionalidade'}), 403
+    return None
+
+class GameStateLog:
+    """Documento atual de um mestre e os patches das últimas versões"""
+
+    def __init__(self, version, document, size):
+        self.version = version
+        self.document = document
+        self.changes = deque(maxlen=size)
+
+    def record(self, version, document, patch):
+        if version <= self.version:
+            return
+        if version != self.version + 1:
+            # Versões intermediárias não passaram por este processo
+            self.changes.clear()
+        self.changes.append((version, patch))
+        self.version = version
+        self.document = document
+
+    def patch_since(self, since):
+        """Operações de since até a versão atual, ou None se o log não cobre esse intervalo"""
+        if since == self.version:
+            return []
+        if since > self.version or not self.changes or self.changes[0][0] > since + 1:
+            return None
+        operations = []
+        for version, patch in self.changes:
+            if version > since:
+                operations.extend(patch)
+        return operations
+
+class GameStateStore:
+    """Logs de alterações por mestre; o banco continua sendo a fonte da verdade"""
+
+    def __init__(self):
+        self._logs = {}
+        self._lock = threading.Lock()
+
+    def load(self, master_id):
+        """Log com a versão atual do banco (recarrega o documento se outro processo o alterou)"""
+        version = db.session.query(GameState.version).filter_by(master_id=master_id).scalar() or 0
+        with self._lock:
+            log = self._logs.get(master_id)
+        if log is not None and log.version == version:
+            return log
+
+        state = db.session.get(GameState, master_id)
+        fresh = GameStateLog(
+            state.version if state else 0,
+            state.get_data() if state else {},
+            current_app.config.get('GAME_STATE_LOG_SIZE', DEFAULT_LOG_SIZE)
+        )
+        with self._lock:
+            log = self._logs.get(master_id)
+            if log is None or log.version < fresh.version:
+                log = self._logs[master_id] = fresh
+            return log
+
+    def record(self, master_id, version, document, patch):
+        with self._lock:
+            log = self._logs.get(master_id)
+            if log is not None:
+                log.record(version, document, patch)
+
+    def clear(self):
+        with self._lock:
+            self._logs.clear()
+
+game_states = GameStateStore()
+
+def state_payload(log, since=None):
+    """Deltas desde since quando possível, senão o documento completo"""
+    if since is not None:
+        patch = log.patch_since(since)
+        if patch is not None:
+            return {'version': log.version, 'since': since, 'patch': patch}
+    return {'version': log.version, 'state': log.document}
+
+def conflict_response(log, base_version):
+    payload = state_payload(log, base_version)
+    payload['error'] = 'Conflito de versão: o estado do jogo foi alterado'
+    return jsonify(payload), 409
+
+def save_state(master_id, base_version, document):
+    """Compare-and-set: grava o documento se a versão no banco ainda é base_version.
+
+    Retorna a nova versão ou None em caso de conflito.
+    """
+    data = json.dumps(document, separators=(',', ':'), ensure_ascii=False)
+    new_version = base_version + 1
+
+    if base_version == 0:
+        db.session.add(GameState(master_id=master_id, version=new_version, data=data))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return None
+        return new_version
+
+    result = db.session.execute(
+        update(GameState)
+        .where(GameState.master_id == master_id, GameState.version == base_version)
+        .values(data=data, version=new_version, updated_at=datetime.utcnow())
+    )
+    if result.rowcount == 0:
+        db.session.rollback()
+        return None
+    db.session.commit()
+    return new_version
+
+def write_state(master_id, base_version, document, patch):
+    """Grava, registra o patch no log e notifica os outros dispositivos do mestre"""
+    max_bytes = current_app.config.get('GAME_STATE_MAX_BYTES', DEFAULT_MAX_BYTES)
+    if len(json.dumps(document, separators=(',', ':'), ensure_ascii=False).encode('utf-8')) > max_bytes:
+        return jsonify({'error': f'Estado do jogo deve ter no máximo {max_bytes} bytes'}), 413
+
+    version = save_state(master_id, base_version, document)
+    if version is None:
+        return conflict_response(game_states.load(master_id), base_version)
+
+    game_states.record(master_id, version, document, patch)
+    publish_event(master_id, 'game_state', {'version': version, 'since': base_version, 'patch': patch})
+    return jsonify({'version': version}), 200
+
+def read_base_version(data):
+    base_version = data.get('version')
+    if isinstance(base_version, bool) or not isinstance(base_version, int) or base_version < 0:
+        return None
+    return base_version
+
+@game_state_bp.route('/game-state', methods=['GET'])
+def get_game_state():
+    """Estado do jogo do mestre. Com ?since=<versão> retorna apenas o patch JSON
+    desde essa versão, ou o documento completo se o log em memória não a cobre."""
+    auth_error = require_master()
+    if auth_error:
+        return auth_error
+
+    try:
+        since = request.args.get('since', type=int)
+        log = game_states.load(session['user_id'])
+        return jsonify(state_payload(log, since)), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@game_state_bp.route('/game-state', methods=['PUT'])
+def replace_game_state():
+    """Substitui o documento inteiro: {"version": <versão base>, "state": {...}}"""
+    auth_error = require_master()
+    if auth_error:
+        return auth_error
+
+    try:
+        data = request.get_json() or {}
+        base_version = read_base_version(data)
+        if base_version is None:
+            return jsonify({'error': 'Versão base é obrigatória'}), 400
+        if not isinstance(data.get('state'), dict):
+            return jsonify({'error': 'Estado deve ser um objeto JSON'}), 400
+
+        master_id = session['user_id']
+        log = game_states.load(master_id)
+        if log.version != base_version:
+            return conflict_response(log, base_version)
+
+        document = data['state']
+        return write_state(master_id, base_version, document, make_patch(log.document, document))
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@game_state_bp.route('/game-state', methods=['PATCH'])
+def patch_game_state():
+    """Aplica um patch JSON (RFC 6902): {"version": <versão base>, "patch": [...]}"""
+    auth_error = require_master()
+    if auth_error:
+        return auth_error
+
+    try:
+        data = request.get_json() or {}
+        base_version = read_base_version(data)
+        if base_version is None:
+            return jsonify({'error': 'Versão base é obrigatória'}), 400
+
+        master_id = session['user_id']
+        log = game_states.load(master_id)
+        if log.version != base_version:
+            return conflict_response(log, base_version)
+
+        try:
+            document = apply_patch(log.document, data.get('patch'))
+        except JsonPatchError as e:
+            return jsonify({'error': str(e)}), 400
+        if not isinstance(document, dict):
+            return jsonify({'error': 'Estado deve ser um objeto JSON'}), 400
+
+        return write_state(master_id, base_version, document, data['patch'])
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
@@ -0,0 +1,24 @@
+from flask import Response, make_response, request
+import hashlib
+
+def compute_etag(*parts):
+    """Gera um ETag forte a partir dos marcadores de versão de um recurso"""
+    digest = hashlib.sha1(repr(parts).encode('utf-8'))
+    return digest.hexdigest()
+
+def conditional_response(etag, build_response):
+    """Responde 304 quando o cliente já possui a versão atual (If-None-Match).
+
+    build_response só é chamado quando o corpo precisa ser enviado, evitando
+    consultar e serializar o recurso completo nas requisições de polling.
+    """
+    # Comparação fraca (RFC 7232): respostas comprimidas enviam o mesmo ETag como W/"..."
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = make_response(build_response())
+        if response.status_code != 200:
+            return response
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
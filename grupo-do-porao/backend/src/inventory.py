@@ -0,0 +1,295 @@
+from flask import Blueprint, request, jsonify, session
+from src.models.user import db, Player, InventoryItem, Debuff
+from src.events import publish_event
+from src.players import require_master
+from src.live_session import live_sessions
+from sqlalchemy import delete, update
+from datetime import datetime
+import json
+
+inventory_bp = Blueprint('inventory', __name__)
+
+# Quantidade máxima de jogadores retornados nas consultas da mesa
+MAX_PARTY_RESULTS = 500
+
+def master_player_id(player_id):
+    """Confirma que o jogador pertence ao mestre logado sem carregar a ficha completa"""
+    return db.session.query(Player.id).filter_by(id=player_id, master_id=session['user_id']).scalar()
+
+def touch_players(player_ids):
+    """Incrementa a versão dos jogadores para invalidar caches e ETags das fichas"""
+    db.session.execute(
+        update(Player)
+        .where(Player.id.in_(player_ids))
+        .values(version=Player.version + 1, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    live = live_sessions.get(session['user_id'])
+    if live:
+        live.bump(player_ids)
+
+def read_details(data):
+    details = data.get('details')
+    return json.dumps(details) if details is not None else None
+
+@inventory_bp.route('/players/<int:player_id>/items', methods=['POST'])
+def add_item(player_id):
+    auth_error = require_master()
+    if auth_error:
+        return auth_error
+
+    try:
+        if not master_player_id(player_id):
+            return jsonify({'error': 'Jogador não encontrado'}), 404
+
+        data = request.get_json() or {}
+        name = (data.get('name') or '').strip()
+        quantity = data.get('quantity', 1)
+        if not name:
+            return jsonify({'error': 'Nome do item é obrigatório'}), 400
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+            return jsonify({'error': 'Quantidade deve ser um inteiro positivo'}), 400
+
+        # Itens sem detalhes com o mesmo nome são empilhados na mesma linha
+        item = None
+        if data.get('details') is None:
+            item = InventoryItem.query.filter_by(player_id=player_id, name=name, details=None).first()
+        if item:
+            item.quantity = InventoryItem.quantity + quantity
+        else:
+            item = InventoryItem(
+                player_id=player_id,
+                master_id=session['user_id'],
+                name=name,
+                quantity=quantity,
+                details=read_details(data)
+            )
+            db.session.add(item)
+
+        touch_players([player_id])
+        db.session.commit()
+
+        publish_event(session['user_id'], 'player_item', {'id': player_id, 'item': item.to_dict()})
+
+        return jsonify({
+            'message': 'Item adicionado com sucesso',
+            'item': item.to_dict()
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@inventory_bp.route('/players/<int:player_id>/items/<int:item_id>', methods=['DELETE'])
+def remove_item(player_id, item_id):
+    auth_error = require_master()
+    if auth_error:
+        return auth_error
+
+    try:
+        item = InventoryItem.query.filter_by(id=item_id, player_id=player_id, master_id=session['user_id']).first()
+        if not item:
+            return jsonify({'error': 'Item não encontrado'}), 404
+
+        # ?quantity=N remove apenas parte da pilha
+        quantity = request.args.get('quantity', type=int)
+        if quantity is not None and quantity < 1:
+            return jsonify({'error': 'Quantidade deve ser um inteiro positivo'}), 400
+
+        if quantity is not None and quantity < item.quantity:
+            item.quantity = InventoryItem.quantity - quantity
+            removed = False
+        else:
+            db.session.delete(item)
+            removed = True
+
+        touch_players([player_id])
+        db.session.commit()
+
+        if removed:
+            publish_event(session['user_id'], 'player_item', {'id': player_id, 'item_id': item_id, 'removed': True})
+            return jsonify({'message': 'Item removido com sucesso'}), 200
+
+        publish_event(session['user_id'], 'player_item', {'id': player_id, 'item': item.to_dict()})
+        return jsonify({
+            'message': 'Quantidade atualizada com sucesso',
+            'item': item.to_dict()
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@inventory_bp.route('/players/<int:player_id>/debuffs', methods=['POST'])
+def add_debuff(player_id):
+    auth_error = require_master()
+    if auth_error:
+        return auth_error
+
+    try:
+        if not master_player_id(player_id):
+            return jsonify({'error': 'Jogador não encontrado'}), 404
+
+        data = request.get_json() or {}
+        name = (data.get('name') or '').strip()
+        rounds = data.get('rounds_remaining')
+        if not name:
+            return jsonify({'error': 'Nome do debuff é obrigatório'}), 400
+        if rounds is not None and (not isinstance(rounds, int) or isinstance(rounds, bool) or rounds < 1):
+            return jsonify({'error': 'Duração deve ser um inteiro positivo de rodadas'}), 400
+
+        debuff = Debuff(
+            player_id=player_id,
+            master_id=session['user_id'],
+            name=name,
+            rounds_remaining=rounds,
+            details=read_details(data)
+        )
+        db.session.add(debuff)
+        touch_players([player_id])
+        db.session.commit()
+
+        publish_event(session['user_id'], 'player_debuff', {'id': player_id, 'debuff': debuff.to_dict()})
+
+        return jsonify({
+            'message': 'Debuff aplicado com sucesso',
+            'debuff': debuff.to_dict()
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@inventory_bp.route('/players/<int:player_id>/debuffs/<int:debuff_id>', methods=['DELETE'])
+def remove_debuff(player_id, debuff_id):
+    auth_error = require_master()
+    if auth_error:
+        return auth_error
+
+    try:
+        result = db.session.execute(
+            delete(Debuff)
+            .where(Debuff.id == debuff_id, Debuff.player_id == player_id, Debuff.master_id == session['user_id'])
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            db.session.rollback()
+            return jsonify({'error': 'Debuff não encontrado'}), 404
+
+        touch_players([player_id])
+        db.session.commit()
+
+        publish_event(session['user_id'], 'player_debuff', {'id': player_id, 'debuff_id': debuff_id, 'removed': True})
+
+        return jsonify({'message': 'Debuff removido com sucesso'}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@inventory_bp.route('/debuffs/advance-round', methods=['POST'])
+def advance_round():
+    """Avança uma rodada: decrementa a duração dos debuffs da mesa e remove os expirados"""
+    auth_error = require_master()
+    if auth_error:
+        return auth_error
+
+    try:
+        master_id = session['user_id']
+        timed = (Debuff.master_id == master_id, Debuff.rounds_remaining.isnot(None))
+
+        player_ids = [row[0] for row in db.session.query(Debuff.player_id).filter(*timed).distinct()]
+        if player_ids:
+            db.session.execute(
+                update(Debuff)
+                .where(*timed)
+                .values(rounds_remaining=Debuff.rounds_remaining - 1)
+                .execution_options(synchronize_session=False)
+            )
+            expired = db.session.execute(
+                delete(Debuff)
+                .where(Debuff.master_id == master_id, Debuff.rounds_remaining <= 0)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            touch_players(player_ids)
+        else:
+            expired = 0
+
+        db.session.commit()
+
+        if player_ids:
+            publish_event(master_id, 'debuffs_round', {'players': player_ids, 'expired': expired})
+
+        return jsonify({
+            'message': 'Rodada avançada com sucesso',
+            'players': player_ids,
+            'expired': expired
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@inventory_bp.route('/party/items', methods=['GET'])
+def party_items():
+    """Quem carrega um item (?name=Chave), usando o índice (master_id, name)"""
+    auth_error = require_master()
+    if auth_error:
+        return auth_error
+
+    name = (request.args.get('name') or '').strip()
+    if not name:
+        return jsonify({'error': 'Parâmetro name é obrigatório'}), 400
+
+    try:
+        rows = (
+            db.session.query(InventoryItem.player_id, Player.name, InventoryItem.id, InventoryItem.quantity)
+            .join(Player, Player.id == InventoryItem.player_id)
+            .filter(InventoryItem.master_id == session['user_id'], InventoryItem.name == name)
+            .order_by(InventoryItem.player_id, InventoryItem.id)
+            .limit(MAX_PARTY_RESULTS)
+            .all()
+        )
+
+        return jsonify({
+            'name': name,
+            'players': [
+                {'player_id': player_id, 'player_name': player_name, 'item_id': item_id, 'quantity': quantity}
+                for player_id, player_name, item_id, quantity in rows
+            ]
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@inventory_bp.route('/party/debuffs', methods=['GET'])
+def party_debuffs():
+    """Quem está sob um debuff (?name=Envenenado), usando o índice (master_id, name)"""
+    auth_error = require_master()
+    if auth_error:
+        return auth_error
+
+    name = (request.args.get('name') or '').strip()
+    if not name:
+        return jsonify({'error': 'Parâmetro name é obrigatório'}), 400
+
+    try:
+        rows = (
+            db.session.query(Debuff.player_id, Player.name, Debuff.id, Debuff.rounds_remaining)
+            .join(Player, Player.id == Debuff.player_id)
+            .filter(Debuff.master_id == session['user_id'], Debuff.name == name)
+            .order_by(Debuff.player_id, Debuff.id)
+            .limit(MAX_PARTY_RESULTS)
+            .all()
+        )
+
+        return jsonify({
+            'name': name,
+            'players': [
+                {'player_id': player_id, 'player_name': player_name, 'debuff_id': debuff_id, 'rounds_remaining': rounds}
+                for player_id, player_name, debuff_id, rounds in rows
+            ]
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
@@ -0,0 +1,185 @@
+import copy
+import json
+
+# Deslocamento máximo procurado ao comparar listas que receberam itens no início
+MAX_LIST_SHIFT = 16
+
+class JsonPatchError(ValueError):
+    """Patch JSON (RFC 6902) inválido ou que não se aplica ao documento"""
+    pass
+
+def escape_token(token):
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+def parse_pointer(pointer):
+    """Converte um JSON Pointer (RFC 6901) em lista de chaves"""
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith('/')):
+        raise JsonPatchError(f'Caminho inválido: {pointer!r}')
+    if not pointer:
+        return []
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+def list_index(container, token, allow_end=False):
+    if allow_end and token == '-':
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith('0')):
+        raise JsonPatchError(f'Índice de lista inválido: {token!r}')
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise JsonPatchError(f'Índice fora da lista: {index}')
+    return index
+
+def resolve_parent(document, tokens):
+    """(container, última chave) do caminho"""
+    target = document
+    for token in tokens[:-1]:
+        target = get_child(target, token)
+    return target, tokens[-1]
+
+def get_child(target, token):
+    if isinstance(target, dict):
+        if token not in target:
+            raise JsonPatchError(f'Chave inexistente: {token!r}')
+        return target[token]
+    if isinstance(target, list):
+        return target[list_index(target, token)]
+    raise JsonPatchError(f'Caminho atravessa um valor simples em {token!r}')
+
+def get_value(document, pointer):
+    target = document
+    for token in parse_pointer(pointer):
+        target = get_child(target, token)
+    return target
+
+def add_value(document, tokens, value):
+    if not tokens:
+        return value
+    container, key = resolve_parent(document, tokens)
+    if isinstance(container, dict):
+        container[key] = value
+    elif isinstance(container, list):
+        container.insert(list_index(container, key, allow_end=True), value)
+    else:
+        raise JsonPatchError(f'Não é possível adicionar em um valor simples: {key!r}')
+    return document
+
+def remove_value(document, tokens):
+    if not tokens:
+        raise JsonPatchError('Não é possível remover a raiz do documento')
+    container, key = resolve_parent(document, tokens)
+    if isinstance(container, dict):
+        if key not in container:
+            raise JsonPatchError(f'Chave inexistente: {key!r}')
+        return container.pop(key)
+    if isinstance(container, list):
+        return container.pop(list_index(container, key))
+    raise JsonPatchError(f'Não é possível remover de um valor simples: {key!r}')
+
+def same_value(a, b):
+    """Igualdade JSON (true != 1, ao contrário do == do Python)"""
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(same_value(a[key], b[key]) for key in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(same_value(x, y) for x, y in zip(a, b))
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return a == b
+    return type(a) is type(b) and a == b
+
+def apply_patch(document, operations):
+    """Aplica as operações a uma cópia do documento e retorna o novo documento"""
+    if not isinstance(operations, list):
+        raise JsonPatchError('Patch deve ser uma lista de operações')
+
+    document = copy.deepcopy(document)
+    for operation in operations:
+        if not isinstance(operation, dict) or 'op' not in operation:
+            raise JsonPatchError('Operação sem "op"')
+        op = operation['op']
+        tokens = parse_pointer(operation.get('path'))
+
+        if op in ('add', 'replace', 'test') and 'value' not in operation:
+            raise JsonPatchError(f'Operação "{op}" sem "value"')
+
+        if op == 'add':
+            document = add_value(document, tokens, copy.deepcopy(operation['value']))
+        elif op == 'remove':
+            remove_value(document, tokens)
+        elif op == 'replace':
+            if tokens:
+                remove_value(document, tokens)
+            document = add_value(document, tokens, copy.deepcopy(operation['value']))
+        elif op in ('move', 'copy'):
+            from_tokens = parse_pointer(operation.get('from'))
+            if op == 'move':
+                if tokens[:len(from_tokens)] == from_tokens and tokens != from_tokens:
+                    raise JsonPatchError('Não é possível mover um valor para dentro dele mesmo')
+                value = remove_value(document, from_tokens)
+            else:
+                value = copy.deepcopy(get_value(document, operation['from']))
+            document = add_value(document, tokens, value)
+        elif op == 'test':
+            if not same_value(get_value(document, operation['path']), operation['value']):
+                raise JsonPatchError(f'Teste falhou em {operation["path"]!r}')
+        else:
+            raise JsonPatchError(f'Operação desconhecida: {op!r}')
+    return document
+
+def encoded_size(value):
+    return len(json.dumps(value, separators=(',', ':'), ensure_ascii=False))
+
+def list_shift(old, new):
+    """Quantos itens foram inseridos no início de old para formar new (ou None)"""
+    for shift in range(1, min(len(new), MAX_LIST_SHIFT) + 1):
+        kept = len(new) - shift
+        if kept <= len(old) and kept > 0 and same_value(new[shift:], old[:kept]):
+            return shift
+    return None
+
+def diff_lists(old, new, path):
+    shift = list_shift(old, new)
+    if shift is not None:
+        # Itens novos no início (ex: histórico mais recente primeiro, truncado no fim)
+        operations = [{'op': 'remove', 'path': f'{path}/{index}'} for index in range(len(old) - 1, len(new) - shift - 1, -1)]
+        operations += [{'op': 'add', 'path': f'{path}/{index}', 'value': new[index]} for index in range(shift)]
+        return operations
+
+    operations = []
+    common = min(len(old), len(new))
+    for index in range(common):
+        operations += make_patch(old[index], new[index], f'{path}/{index}')
+    for index in range(len(old) - 1, common - 1, -1):
+        operations.append({'op': 'remove', 'path': f'{path}/{index}'})
+    for index in range(common, len(new)):
+        operations.append({'op': 'add', 'path': f'{path}/-', 'value': new[index]})
+    return operations
+
+def make_patch(old, new, path=''):
+    """Operações que transformam old em new.
+
+    Dicionários são comparados chave a chave e listas item a item; quando o
+    patch de uma lista fica maior que a própria lista, ela é substituída inteira.
+    """
+    if same_value(old, new):
+        return []
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        operations = []
+        for key in old:
+            if key not in new:
+                operations.append({'op': 'remove', 'path': f'{path}/{escape_token(key)}'})
+        for key, value in new.items():
+            child = f'{path}/{escape_token(key)}'
+            if key not in old:
+                operations.append({'op': 'add', 'path': child, 'value': value})
+            else:
+                operations += make_patch(old[key], value, child)
+        return operations
+
+    if isinstance(old, list) and isinstance(new, list):
+        operations = diff_lists(old, new, path)
+        if encoded_size(operations) < encoded_size(new):
+            return operations
+
+    return [{'op': 'replace', 'path': path, 'value': new}]
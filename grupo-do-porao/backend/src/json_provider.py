@@ -0,0 +1,61 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional: sem ele o provider padrão do Flask é usado
+    orjson = None
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Provider JSON do Flask baseado no orjson.
+
+    Mantém o comportamento do provider padrão (chaves ordenadas, datas no
+    formato HTTP via default, saída indentada em debug), mas serializa
+    direto para bytes, sem passar por str. O que o orjson não serializa
+    (ex: inteiros acima de 64 bits) volta para o provider padrão.
+    """
+
+    def _options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        # Argumentos específicos do json.dumps (ex: separators) ficam com o provider padrão
+        if set(kwargs) - {'default', 'indent', 'sort_keys'}:
+            return super().dumps(obj, **kwargs)
+        if 'sort_keys' in kwargs and kwargs['sort_keys'] != self.sort_keys:
+            return super().dumps(obj, **kwargs)
+        default = kwargs.get('default', self.default)
+        try:
+            return orjson.dumps(obj, default=default, option=self._options(bool(kwargs.get('indent')))).decode('utf-8')
+        except orjson.JSONEncodeError:
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        try:
+            body = orjson.dumps(obj, default=self.default, option=self._options(indent) | orjson.OPT_APPEND_NEWLINE)
+        except orjson.JSONEncodeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+def json_provider_class(name):
+    """Classe do provider JSON para JSON_PROVIDER ('auto', 'orjson' ou 'stdlib')"""
+    if name == 'stdlib':
+        return DefaultJSONProvider
+    if name not in ('auto', 'orjson'):
+        raise ValueError(f"JSON_PROVIDER inválido: {name}")
+    if orjson is None:
+        if name == 'orjson':
+            raise RuntimeError('JSON_PROVIDER=orjson, mas o pacote orjson não está instalado')
+        return DefaultJSONProvider
+    return OrjsonProvider
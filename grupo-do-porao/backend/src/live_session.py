@@ -0,0 +1,427 @@
+from flask import Blueprint, current_app, jsonify, session
+from contextlib import suppress
+from src.models.user import db, Player
+from src.events import publish_event, current_master_id
+from src.sharding import master_scope
+from sqlalchemy import bindparam, event
+from datetime import datetime
+import json
+import os
+import threading
+import time
+
+live_bp = Blueprint('live', __name__)
+
+# Atributos de status mantidos em memória durante a sessão ao vivo
+LIVE_FIELDS = ('health', 'mana', 'vigor')
+
+DEFAULT_FLUSH_SECONDS = 5
+
+class LiveSession:
+    """Status da party de um mestre em memória, com journal em disco das alterações pendentes.
+
+    versions guarda a versão esperada de cada ficha no banco. Ela vai em cada
+    entrada do journal: na recuperação, uma ficha gravada depois da entrada
+    (versão maior no banco) não é sobrescrita.
+    """
+
+    def __init__(self, master_id, statuses, versions, journal_path, fsync):
+        self.master_id = master_id
+        self.statuses = statuses
+        self.versions = versions
+        self.dirty = set()
+        self.revision = 0
+        self.journal_path = journal_path
+        self.fsync = fsync
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.closed = False
+        self._journal = open(journal_path, 'a')
+
+    def _append_journal(self, player_id, status, dirty):
+        # dirty=False: o valor já está no banco e não precisa ser reaplicado na recuperação
+        entry = dict(status, id=player_id, dirty=dirty, version=self.versions.get(player_id))
+        self._journal.write(json.dumps(entry) + '\n')
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    def apply(self, player_id, values=None, deltas=None, dirty=True):
+        """Aplica valores absolutos e/ou variações ao jogador; None se ele não está na sessão
+        ou se a sessão foi encerrada (quem chama grava direto no banco)"""
+        with self.lock:
+            status = self.statuses.get(player_id)
+            if status is None or self.closed:
+                return None
+            for field, value in (values or {}).items():
+                status[field] = max(0, min(100, value))
+            for field, delta in (deltas or {}).items():
+                status[field] = max(0, min(100, status[field] + delta))
+            # Registrar no journal antes de confirmar a alteração ao cliente
+            self._append_journal(player_id, status, dirty)
+            if dirty:
+                self.dirty.add(player_id)
+            self.revision += 1
+            return dict(status)
+
+    def status(self, player_id):
+        with self.lock:
+            status = self.statuses.get(player_id)
+            return dict(status) if status is not None else None
+
+    def track(self, player_id, status):
+        """Inclui na sessão um jogador criado depois do início"""
+        with self.lock:
+            self.statuses.setdefault(player_id, {field: status[field] for field in LIVE_FIELDS})
+            self.versions.setdefault(player_id, status.get('version'))
+            self.revision += 1
+
+    def bump(self, player_ids):
+        """Registra fichas gravadas diretamente no banco (a versão delas subiu um)"""
+        with self.lock:
+            self._bump_versions(player_ids, 1)
+
+    def forget(self, player_id):
+        with self.lock:
+            self.statuses.pop(player_id, None)
+            self.versions.pop(player_id, None)
+            self.dirty.discard(player_id)
+            self.revision += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {player_id: dict(status) for player_id, status in self.statuses.items()}, self.revision
+
+    def take_dirty(self):
+        """Retira as alterações pendentes e move o journal atual para o arquivo de flush"""
+        with self.lock:
+            rows = [dict(self.statuses[player_id], id=player_id) for player_id in self.dirty]
+            # O flush incrementa a versão: entradas escritas durante ele já usam a nova
+            self._bump_versions(self.dirty, 1)
+            self.dirty = set()
+            self._journal.close()
+            flushing_path = self.journal_path + '.flushing'
+            if os.path.exists(flushing_path):
+                # Um flush anterior falhou: acumular as entradas no mesmo arquivo
+                with open(self.journal_path) as pending, open(flushing_path, 'a') as flushing:
+                    flushing.write(pending.read())
+                os.remove(self.journal_path)
+            else:
+                os.replace(self.journal_path, flushing_path)
+            self._journal = open(self.journal_path, 'a')
+            return rows
+
+    def restore_dirty(self, player_ids):
+        with self.lock:
+            player_ids = [player_id for player_id in player_ids if player_id in self.statuses]
+            self._bump_versions(player_ids, -1)
+            self.dirty.update(player_ids)
+
+    def _bump_versions(self, player_ids, step):
+        for player_id in player_ids:
+            if self.versions.get(player_id) is not None:
+                self.versions[player_id] += step
+
+    def finish(self, write):
+        """Encerra a sessão gravando as alterações pendentes com write(rows).
+
+        Alterações recebidas durante a gravação esperam pelo lock e, com a
+        sessão fechada, vão direto ao banco depois dela. Se write falhar, o
+        journal fica no disco para a recuperação.
+        """
+        with self.flush_lock, self.lock:
+            self.closed = True
+            self._journal.close()
+            rows = [dict(self.statuses[player_id], id=player_id) for player_id in self.dirty]
+            self.dirty = set()
+            if rows:
+                write(rows)
+            return len(rows)
+
+    def overlay(self, bodies):
+        """Substitui o status dos corpos JSON já serializados pelos valores em memória"""
+        statuses, _ = self.snapshot()
+        result = []
+        for body in bodies:
+            data = json.loads(body)
+            status = statuses.get(data.get('id'))
+            if status:
+                data.update(status)
+                body = current_app.json.dumps(data).encode('utf-8')
+            result.append(body)
+        return result
+
+@event.listens_for(Player, 'after_update')
+def bump_live_version(mapper, connection, player):
+    """Fichas gravadas pelo ORM (edição, login com rehash) sobem a versão também na sessão ao vivo"""
+    live = live_sessions.get(player.master_id)
+    if live:
+        live.bump([player.id])
+
+def write_statuses(rows):
+    """Grava os status em lote (executemany), incrementando a versão de cada jogador"""
+    table = Player.__table__
+    statement = (
+        table.update()
+        .where(table.c.id == bindparam('player_id'))
+        .values(
+            version=table.c.version + 1,
+            updated_at=bindparam('flushed_at'),
+            **{field: bindparam(f'new_{field}') for field in LIVE_FIELDS}
+        )
+    )
+    now = datetime.utcnow()
+    params = [
+        dict({f'new_{field}': row[field] for field in LIVE_FIELDS}, player_id=row['id'], flushed_at=now)
+        for row in rows
+    ]
+    db.session.execute(statement, params)
+    db.session.commit()
+
+def read_journal(*paths):
+    """Último status de cada jogador com alteração pendente nos journals (em ordem cronológica)"""
+    latest = {}
+    dirty = set()
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path) as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Linha truncada por uma queda no meio da escrita
+                    continue
+                # Entradas sem a marca (journals antigos) eram todas pendentes
+                if entry.pop('dirty', True):
+                    dirty.add(entry['id'])
+                latest[entry['id']] = entry
+    return {player_id: latest[player_id] for player_id in dirty}
+
+def replayable(entries, versions):
+    """Entradas do journal que ainda podem ser aplicadas: a ficha existe e não foi
+    gravada por outra requisição depois delas (versão no banco maior que a da entrada)"""
+    rows = []
+    for player_id, entry in entries.items():
+        version = versions.get(player_id)
+        if version is None:
+            continue
+        # Journals antigos não têm a versão: aplicados como antes
+        if entry.get('version') is not None and version > entry['version']:
+            continue
+        rows.append(entry)
+    return rows
+
+class LiveSessionStore:
+    """Sessões ao vivo do processo atual, com flush periódico (write-behind) para o banco"""
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def get(self, master_id):
+        return self._sessions.get(master_id)
+
+    def journal_path(self, master_id):
+        directory = current_app.config['LIVE_SESSION_JOURNAL_DIR']
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f'{master_id}.journal')
+
+    def recover(self, master_id):
+        """Aplica no banco as alterações de journals deixados por uma queda do processo"""
+        path = self.journal_path(master_id)
+        latest = read_journal(path + '.flushing', path)
+        rows = []
+        if latest:
+            with master_scope(master_id):
+                versions = dict(db.session.query(Player.id, Player.version).filter(Player.id.in_(latest)).all())
+                rows = replayable(latest, versions)
+                if rows:
+                    write_statuses(rows)
+            if len(rows) < len(latest):
+                current_app.logger.warning(
+                    "Journal do mestre %s: %d jogadores alterados depois da queda não foram sobrescritos",
+                    master_id, len(latest) - len(rows)
+                )
+        for leftover in (path + '.flushing', path):
+            # Com vários workers, outro processo pode ter recuperado a mesma mesa
+            with suppress(FileNotFoundError):
+                os.remove(leftover)
+        return len(rows)
+
+    def recover_all(self):
+        """Recupera os journals de todas as mesas sem sessão ativa neste processo"""
+        directory = current_app.config['LIVE_SESSION_JOURNAL_DIR']
+        if not os.path.isdir(directory):
+            return {}
+        master_ids = {int(name.split('.', 1)[0]) for name in os.listdir(directory) if '.journal' in name}
+        return {master_id: self.recover(master_id) for master_id in sorted(master_ids) if master_id not in self._sessions}
+
+    def start(self, master_id):
+        with self._lock:
+            live = self._sessions.get(master_id)
+            if live is not None:
+                return live, 0
+
+            recovered = self.recover(master_id)
+            rows = db.session.query(
+                Player.id, Player.version, *[getattr(Player, field) for field in LIVE_FIELDS]
+            ).filter_by(master_id=master_id).all()
+            statuses = {row[0]: dict(zip(LIVE_FIELDS, row[2:])) for row in rows}
+            versions = {row[0]: row[1] for row in rows}
+            live = LiveSession(
+                master_id, statuses, versions, self.journal_path(master_id),
+                current_app.config.get('LIVE_SESSION_FSYNC', True)
+            )
+            self._sessions[master_id] = live
+            self._ensure_flusher(current_app._get_current_object())
+            return live, recovered
+
+    def flush(self, master_id):
+        live = self._sessions.get(master_id)
+        if live is None:
+            return 0
+        # O flush também roda na thread de gravação, fora da requisição do mestre
+        with live.flush_lock, master_scope(master_id):
+            if live.closed:
+                return 0
+            rows = live.take_dirty()
+            try:
+                if rows:
+                    write_statuses(rows)
+            except Exception:
+                db.session.rollback()
+                live.restore_dirty(row['id'] for row in rows)
+                raise
+            os.remove(live.journal_path + '.flushing')
+            return len(rows)
+
+    def stop(self, master_id):
+        # Sob o lock do store: um start da mesma mesa espera o journal ser removido
+        with self._lock:
+            live = self._sessions.pop(master_id, None)
+            if live is None:
+                return None
+            with master_scope(master_id):
+                try:
+                    flushed = live.finish(write_statuses)
+                except Exception:
+                    db.session.rollback()
+                    raise
+            for leftover in (live.journal_path + '.flushing', live.journal_path):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            return flushed
+
+    def _ensure_flusher(self, app):
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._run, args=(app,), name='live-session-flush', daemon=True)
+            self._flusher.start()
+
+    def _run(self, app):
+        interval = app.config.get('LIVE_SESSION_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS)
+        while True:
+            time.sleep(interval)
+            for master_id in list(self._sessions):
+                with app.app_context():
+                    try:
+                        self.flush(master_id)
+                    except Exception:
+                        app.logger.exception("Falha ao gravar a sessão ao vivo do mestre %s", master_id)
+
+live_sessions = LiveSessionStore()
+
+def recover_live_sessions(app):
+    """Aplica os journals deixados por uma queda antes de o processo atender requisições"""
+    with app.app_context():
+        try:
+            recovered = live_sessions.recover_all()
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("Falha ao recuperar os journals das sessões ao vivo")
+            return
+        for master_id, count in recovered.items():
+            app.logger.info("Sessão ao vivo do mestre %s: %d jogadores recuperados", master_id, count)
+
+def require_master():
+    """Decorator para verificar se o usuário é um mestre logado"""
+    if 'user_id' not in session or not session.get('is_master'):
+        return jsonify({'error': 'Acesso negado. Apenas mestres podem acessar esta funcionalidade'}), 403
+    return None
+
+@live_bp.route('/start', methods=['POST'])
+def start_live_session():
+    auth_error = require_master()
+    if auth_error:
+        return auth_error
+
+    # Com vários workers, escritas atendidas por outro processo iriam direto ao banco
+    # e seriam sobrescritas pelo flush deste
+    workers = current_app.config.get('WORKER_PROCESSES', 1)
+    if workers > 1:
+        return jsonify({'error': f'Sessão ao vivo exige um único worker (em execução: {workers})'}), 409
+
+    try:
+        live, recovered = live_sessions.start(session['user_id'])
+        statuses, revision = live.snapshot()
+        publish_event(session['user_id'], 'live_session', {'active': True})
+        return jsonify({
+            'message': 'Sessão ao vivo iniciada',
+            'recovered': recovered,
+            'players': [dict(status, id=player_id) for player_id, status in statuses.items()],
+            'revision': revision
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@live_bp.route('/flush', methods=['POST'])
+def flush_live_session():
+    auth_error = require_master()
+    if auth_error:
+        return auth_error
+
+    try:
+        if live_sessions.get(session['user_id']) is None:
+            return jsonify({'error': 'Nenhuma sessão ao vivo ativa'}), 404
+        flushed = live_sessions.flush(session['user_id'])
+        return jsonify({'message': 'Status gravados no banco', 'flushed': flushed}), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@live_bp.route('/stop', methods=['POST'])
+def stop_live_session():
+    auth_error = require_master()
+    if auth_error:
+        return auth_error
+
+    try:
+        flushed = live_sessions.stop(session['user_id'])
+        if flushed is None:
+            return jsonify({'error': 'Nenhuma sessão ao vivo ativa'}), 404
+        publish_event(session['user_id'], 'live_session', {'active': False})
+        return jsonify({'message': 'Sessão ao vivo encerrada', 'flushed': flushed}), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@live_bp.route('/status', methods=['GET'])
+def live_status():
+    """Status da party servido da memória (mestre ou jogadores da mesa)"""
+    master_id = current_master_id()
+    if master_id is None:
+        return jsonify({'error': 'Acesso negado'}), 403
+
+    live = live_sessions.get(master_id)
+    if live is None:
+        return jsonify({'active': False}), 200
+
+    statuses, revision = live.snapshot()
+    return jsonify({
+        'active': True,
+        'revision': revision,
+        'players': [dict(status, id=player_id) for player_id, status in statuses.items()]
+    }), 200
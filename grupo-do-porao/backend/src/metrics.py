@@ -0,0 +1,263 @@
+from flask import Blueprint, Response, current_app, g, has_request_context, request, jsonify
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from collections import Counter as StackCounter
+from functools import wraps
+import bisect
+import os
+import sys
+import threading
+import time
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# Limites dos histogramas (segundos e quantidade de consultas)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SERIALIZATION_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05)
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(names, values, extra=None):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Histogram:
+    """Histograma no formato de exposição do Prometheus"""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for label_values, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = format_labels(self.label_names, label_values, f'le="{bound}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            total = cumulative + series[len(self.buckets)]
+            inf_labels = format_labels(self.label_names, label_values, 'le="+Inf"')
+            lines.append(f'{self.name}_bucket{inf_labels} {total}')
+            lines.append(f'{self.name}_sum{format_labels(self.label_names, label_values)} {series[-1]}')
+            lines.append(f'{self.name}_count{format_labels(self.label_names, label_values)} {total}')
+        return lines
+
+class Counter:
+    """Contador no formato de exposição do Prometheus"""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            snapshot = dict(self._values)
+        for label_values, value in sorted(snapshot.items()):
+            lines.append(f'{self.name}{format_labels(self.label_names, label_values)} {value}')
+        return lines
+
+request_latency = Histogram(
+    'http_request_duration_seconds', 'Latência das requisições por rota',
+    ('method', 'endpoint', 'status'), LATENCY_BUCKETS
+)
+request_queries = Histogram(
+    'http_request_db_queries', 'Consultas SQL executadas por requisição',
+    ('endpoint',), QUERY_COUNT_BUCKETS
+)
+request_query_time = Histogram(
+    'http_request_db_duration_seconds', 'Tempo gasto em SQL por requisição',
+    ('endpoint',), LATENCY_BUCKETS
+)
+db_queries_total = Counter(
+    'db_queries_total', 'Total de consultas SQL executadas', ('endpoint',)
+)
+serialization_time = Histogram(
+    'serialization_duration_seconds', 'Tempo de serialização (to_dict) por modelo',
+    ('model',), SERIALIZATION_BUCKETS
+)
+slow_requests_total = Counter(
+    'http_slow_requests_total', 'Requisições acima do limite de perfilamento', ('endpoint',)
+)
+
+ALL_METRICS = (request_latency, request_queries, request_query_time, db_queries_total, serialization_time, slow_requests_total)
+
+def timed_serialization(model):
+    """Decorator que registra o tempo de to_dict no histograma de serialização"""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                serialization_time.observe(time.perf_counter() - started, model)
+        return wrapper
+    return decorator
+
+def endpoint_label():
+    # Usar a regra da rota (e não a URL) para manter a cardinalidade baixa
+    if request.url_rule is not None:
+        return request.url_rule.rule
+    return 'not_found'
+
+class SamplingProfiler:
+    """Amostra periodicamente as pilhas das threads que estão atendendo requisições.
+
+    As pilhas de requisições lentas são gravadas no formato "collapsed"
+    (frame;frame;frame contagem), pronto para flamegraph.pl ou speedscope.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, thread_id):
+        with self._lock:
+            self._active[thread_id] = StackCounter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._thread.start()
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._active.pop(thread_id, None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[collapse_stack(frame)] += 1
+
+def collapse_stack(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+def write_profile(directory, endpoint, duration, samples):
+    os.makedirs(directory, exist_ok=True)
+    name = endpoint.strip('/').replace('/', '_').replace('<', '').replace('>', '').replace(':', '_') or 'root'
+    path = os.path.join(directory, f'{time.strftime("%Y%m%d-%H%M%S")}-{int(duration * 1000)}ms-{name}.folded')
+    with open(path, 'w') as profile:
+        for stack, count in samples.most_common():
+            profile.write(f'{stack} {count}\n')
+    return path
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('query_started')
+    if not started:
+        # Conexão aberta antes dos hooks serem instalados
+        return
+    elapsed = time.perf_counter() - started.pop()
+    if has_request_context():
+        g.metrics_query_count = g.get('metrics_query_count', 0) + 1
+        g.metrics_query_time = g.get('metrics_query_time', 0.0) + elapsed
+
+def install_query_hooks():
+    """Conta consultas e tempo de SQL da requisição atual em todos os engines (inclusive shards)"""
+    if not event.contains(Engine, 'before_cursor_execute', before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+
+def init_metrics(app):
+    """Registra os hooks de métricas (e do perfilador, se habilitado) na aplicação"""
+    install_query_hooks()
+
+    threshold_ms = app.config.get('PROFILE_SLOW_REQUESTS_MS')
+    profiler = None
+    if threshold_ms:
+        profiler = SamplingProfiler(app.config.get('PROFILE_SAMPLE_INTERVAL_MS', 5) / 1000)
+    profile_dir = app.config.get('PROFILE_DIR', 'profiles')
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        g.metrics_query_count = 0
+        g.metrics_query_time = 0.0
+        if profiler:
+            profiler.start(threading.get_ident())
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+
+        duration = time.perf_counter() - started
+        endpoint = endpoint_label()
+        request_latency.observe(duration, request.method, endpoint, str(response.status_code))
+        request_queries.observe(g.metrics_query_count, endpoint)
+        request_query_time.observe(g.metrics_query_time, endpoint)
+        db_queries_total.inc(g.metrics_query_count, endpoint)
+
+        if profiler:
+            samples = profiler.stop(threading.get_ident())
+            if duration * 1000 >= threshold_ms:
+                slow_requests_total.inc(1, endpoint)
+                if samples:
+                    path = write_profile(profile_dir, endpoint, duration, samples)
+                    app.logger.warning("Requisição lenta %s %s (%.1f ms): perfil em %s", request.method, endpoint, duration * 1000, path)
+
+        return response
+
+    if profiler:
+        @app.teardown_request
+        def stop_request_profiler(exception):
+            # Requisições que falharam antes do after_request não devem continuar sendo amostradas
+            profiler.stop(threading.get_ident())
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            return jsonify({'error': 'Acesso negado'}), 403
+    elif not current_app.config.get('METRICS_PUBLIC'):
+        # Sem token configurado o endpoint só é aberto explicitamente
+        return jsonify({'error': 'Acesso negado (defina METRICS_TOKEN)'}), 403
+
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
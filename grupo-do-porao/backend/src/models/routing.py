@@ -0,0 +1,39 @@
+from flask import current_app, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import inspect
+from sqlalchemy.sql.util import find_tables
+
+# Tabelas com os dados de cada mesa, que podem morar no shard do mestre.
+# Usuários e o catálogo de roteamento ficam sempre no banco principal.
+SHARDED_TABLES = frozenset((
+    'player', 'inventory_item', 'debuff', 'note', 'note_fts', 'note_revision',
+    'dice_roll', 'chat_message', 'game_state'
+))
+
+def statement_tables(mapper, clause):
+    """Nomes das tabelas usadas pela operação (None se não for possível saber, ex: SQL textual)"""
+    if mapper is not None:
+        return {inspect(mapper).local_table.name}
+    if clause is None:
+        return None
+    tables = {table.name for table in find_tables(clause, include_aliases=True, include_crud=True, include_joins=True)}
+    return tables or None
+
+class RoutingSession(Session):
+    """Sessão que envia as operações nas tabelas de mesa para o shard do mestre atual.
+
+    Sem sharding habilitado (ou para mestres ainda no banco principal) o
+    comportamento é o da sessão padrão do Flask-SQLAlchemy.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            router = current_app.extensions.get('sharding')
+            if router is not None:
+                engine = router.current_engine()
+                if engine is not None:
+                    tables = statement_tables(mapper, clause)
+                    # SQL textual (ex: busca FTS das notas) segue o shard da mesa atual
+                    if tables is None or tables & SHARDED_TABLES:
+                        return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
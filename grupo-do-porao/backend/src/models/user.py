@@ -1,9 +1,18 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from src.security import hash_password, verify_password, needs_rehash
+from src.metrics import timed_serialization
+from src.models.routing import RoutingSession
 from datetime import datetime
 import json
 
-db = SQLAlchemy()
+# A sessão roteia as tabelas de mesa para o shard do mestre quando o sharding está habilitado
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# Índice de busca textual das notas (SQLite FTS5), criado pelas migrações
+NOTE_SEARCH_TABLE = 'note_fts'
+
+# Cache por banco indicando se o índice FTS5 está disponível (limpo após as migrações)
+_note_search_engines = {}
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -18,14 +27,18 @@ class User(db.Model):
     notes = db.relationship('Note', backref='master', lazy=True, cascade='all, delete-orphan')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return needs_rehash(self.password_hash)
 
     def __repr__(self):
         return f'<User {self.username}>'
 
+    @timed_serialization('user')
     def to_dict(self):
         return {
             'id': self.id,
@@ -43,47 +56,61 @@ class Player(db.Model):
     health = db.Column(db.Integer, default=100)
     mana = db.Column(db.Integer, default=50)
     vigor = db.Column(db.Integer, default=75)
-    items = db.Column(db.Text)  # JSON string
-    debuffs = db.Column(db.Text)  # JSON string
     avatar_url = db.Column(db.String(255))
     master_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Credenciais para login do jogador
     player_username = db.Column(db.String(80))
     player_password_hash = db.Column(db.String(255))
+    
+    # Versão da linha, incrementada pelo SQLAlchemy a cada UPDATE
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    
+    __mapper_args__ = {'version_id_col': version}
+    
+    # Inventário e debuffs em tabelas próprias, carregados em lote (selectin) para listas de jogadores
+    inventory_items = db.relationship(
+        'InventoryItem', backref='player', lazy='selectin', order_by='InventoryItem.id',
+        cascade='all, delete-orphan', passive_deletes=True
+    )
+    active_debuffs = db.relationship(
+        'Debuff', backref='player', lazy='selectin', order_by='Debuff.id',
+        cascade='all, delete-orphan', passive_deletes=True
+    )
 
     def set_player_password(self, password):
         if password:
-            self.player_password_hash = generate_password_hash(password)
+            self.player_password_hash = hash_password(password)
 
     def check_player_password(self, password):
         if not self.player_password_hash:
             return False
-        return check_password_hash(self.player_password_hash, password)
+        return verify_password(self.player_password_hash, password)
+
+    def player_password_needs_rehash(self):
+        return bool(self.player_password_hash) and needs_rehash(self.player_password_hash)
 
     def get_items(self):
-        if self.items:
-            try:
-                return json.loads(self.items)
-            except:
-                return []
-        return []
+        return [item.to_dict() for item in self.inventory_items]
 
     def set_items(self, items_list):
-        self.items = json.dumps(items_list)
+        """Substitui o inventário; aceita nomes (str) ou dicionários com name/quantity/details"""
+        # Marcar a linha do jogador como alterada para incrementar a versão
+        self.updated_at = datetime.utcnow()
+        self.inventory_items = [InventoryItem.from_entry(entry, self.master_id) for entry in items_list]
 
     def get_debuffs(self):
-        if self.debuffs:
-            try:
-                return json.loads(self.debuffs)
-            except:
-                return []
-        return []
+        return [debuff.to_dict() for debuff in self.active_debuffs]
 
     def set_debuffs(self, debuffs_list):
-        self.debuffs = json.dumps(debuffs_list)
+        """Substitui os debuffs; aceita nomes (str) ou dicionários com name/rounds_remaining/details"""
+        # Marcar a linha do jogador como alterada para incrementar a versão
+        self.updated_at = datetime.utcnow()
+        self.active_debuffs = [Debuff.from_entry(entry, self.master_id) for entry in debuffs_list]
 
+    @timed_serialization('player')
     def to_dict(self):
         return {
             'id': self.id,
@@ -97,10 +124,91 @@ class Player(db.Model):
             'debuffs': self.get_debuffs(),
             'avatar_url': self.avatar_url,
             'player_username': self.player_username,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'version': self.version,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+def split_entry(entry, known_fields):
+    """Separa um item/debuff recebido como str ou dict em campos conhecidos e detalhes extras"""
+    if not isinstance(entry, dict):
+        return {'name': str(entry)}, None
+    fields = {key: entry[key] for key in known_fields if key in entry}
+    details = entry.get('details')
+    if details is None:
+        extra = {key: value for key, value in entry.items() if key not in known_fields and key != 'id'}
+        details = extra or None
+    return fields, details
+
+class InventoryItem(db.Model):
+    __table_args__ = (
+        # "Quem carrega a chave?" dentro da mesa
+        db.Index('ix_inventory_item_master_name', 'master_id', 'name'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id', ondelete='CASCADE'), nullable=False, index=True)
+    master_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=1)
+    details = db.Column(db.Text)  # JSON string
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @classmethod
+    def from_entry(cls, entry, master_id):
+        fields, details = split_entry(entry, ('name', 'quantity'))
+        return cls(
+            name=fields.get('name') or '',
+            quantity=fields.get('quantity', 1),
+            details=json.dumps(details) if details is not None else None,
+            master_id=master_id
+        )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'quantity': self.quantity,
+            'details': json.loads(self.details) if self.details else None
+        }
+
+class Debuff(db.Model):
+    __table_args__ = (
+        # "Quais jogadores estão envenenados?" dentro da mesa
+        db.Index('ix_debuff_master_name', 'master_id', 'name'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id', ondelete='CASCADE'), nullable=False, index=True)
+    master_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    rounds_remaining = db.Column(db.Integer)  # None = sem expiração
+    details = db.Column(db.Text)  # JSON string
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @classmethod
+    def from_entry(cls, entry, master_id):
+        fields, details = split_entry(entry, ('name', 'rounds_remaining'))
+        return cls(
+            name=fields.get('name') or '',
+            rounds_remaining=fields.get('rounds_remaining'),
+            details=json.dumps(details) if details is not None else None,
+            master_id=master_id
+        )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'rounds_remaining': self.rounds_remaining,
+            'details': json.loads(self.details) if self.details else None
         }
 
 class Note(db.Model):
+    __table_args__ = (
+        db.Index('ix_note_master_created', 'master_id', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
@@ -109,6 +217,17 @@ class Note(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    def to_summary_dict(self):
+        """Versão leve da nota para listagens, sem o conteúdo"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'theme': self.theme,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    @timed_serialization('note')
     def to_dict(self):
         return {
             'id': self.id,
@@ -119,19 +238,135 @@ class Note(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+class NoteRevision(db.Model):
+    """Revisão de uma nota: cópia completa (snapshot) ou diff em relação à revisão anterior"""
+    __table_args__ = (
+        db.UniqueConstraint('note_id', 'number', name='uq_note_revision_number'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    note_id = db.Column(db.Integer, db.ForeignKey('note.id', ondelete='CASCADE'), nullable=False)
+    master_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    number = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(10), nullable=False)  # snapshot, diff
+    title = db.Column(db.String(200), nullable=False)
+    theme = db.Column(db.String(100))
+    content = db.Column(db.Text, nullable=False)  # texto completo ou diff (JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_summary_dict(self):
+        return {
+            'number': self.number,
+            'kind': self.kind,
+            'title': self.title,
+            'theme': self.theme,
+            'stored_bytes': len(self.content.encode('utf-8')),
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
 class DiceRoll(db.Model):
+    __table_args__ = (
+        # Histórico e estatísticas sempre filtram por mesa ou jogador e ordenam por data
+        db.Index('ix_dice_roll_master_created', 'master_id', 'created_at'),
+        db.Index('ix_dice_roll_player_created', 'player_id', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     dice_type = db.Column(db.Integer, nullable=False)  # 4, 20, 100
     result = db.Column(db.Integer, nullable=False)
     master_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    player_id = db.Column(db.Integer, db.ForeignKey('player.id'))
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id', ondelete='SET NULL'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    @timed_serialization('diceroll')
     def to_dict(self):
         return {
             'id': self.id,
             'dice_type': self.dice_type,
             'result': self.result,
+            'player_id': self.player_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class ChatMessage(db.Model):
+    """Mensagem do chat da mesa (tabela somente de inserção)"""
+    __table_args__ = (
+        # Histórico paginado por id dentro de cada mesa
+        db.Index('ix_chat_message_master_id', 'master_id', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    master_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id', ondelete='SET NULL'))
+    author = db.Column(db.String(100), nullable=False)
+    kind = db.Column(db.String(20), nullable=False, default='message')  # message, dice_roll
+    content = db.Column(db.Text, nullable=False)
+    data = db.Column(db.Text)  # JSON string (ex: detalhes da rolagem)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @timed_serialization('chatmessage')
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'player_id': self.player_id,
+            'author': self.author,
+            'kind': self.kind,
+            'content': self.content,
+            'data': json.loads(self.data) if self.data else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+class GameState(db.Model):
+    """Documento de estado do jogo de cada mestre (o antigo estado do GameContext)"""
+    master_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    # Incrementada a cada escrita; usada para compare-and-set e deltas incrementais
+    version = db.Column(db.Integer, nullable=False, default=0)
+    data = db.Column(db.Text, nullable=False, default='{}')  # JSON string
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def get_data(self):
+        return json.loads(self.data) if self.data else {}
+
+class ShardRoute(db.Model):
+    """Catálogo de roteamento: shard onde ficam os dados de cada mestre.
+
+    Mestres sem linha no catálogo continuam no banco principal.
+    """
+    master_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    shard = db.Column(db.String(100), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ShardPlayerLogin(db.Model):
+    """Mestre de cada login de jogador em shard, para o login antes de se saber a mesa"""
+    player_username = db.Column(db.String(80), primary_key=True)
+    master_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+
+class PasswordResetToken(db.Model):
+    __table_args__ = (
+        db.Index('ix_password_reset_token_expires', 'expires_at'),
+    )
+
+    # Guardamos apenas o SHA-256 do token enviado por email
+    token_hash = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+def note_search_available():
+    """Indica se o índice FTS5 das notas existe no banco atual"""
+    # Banco onde ficam as notas da mesa atual (o shard do mestre, se houver)
+    engine = db.session.get_bind(mapper=Note)
+    key = str(engine.url)
+    available = _note_search_engines.get(key)
+    if available is None:
+        available = (
+            engine.dialect.name == 'sqlite'
+            and NOTE_SEARCH_TABLE in db.inspect(engine).get_table_names()
+        )
+        # Um banco SQLite sem o índice volta a ser verificado: as migrações podem criá-lo depois
+        if available or engine.dialect.name != 'sqlite':
+            _note_search_engines[key] = available
+    return available
+
+def reset_note_search_cache():
+    """Esquece o resultado de note_search_available (chamado após as migrações)"""
+    _note_search_engines.clear()
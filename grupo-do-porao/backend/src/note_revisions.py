@@ -0,0 +1,194 @@
+from flask import current_app
+from src.models.user import db, NoteRevision
+from sqlalchemy import func
+from datetime import datetime, timedelta
+from itertools import takewhile
+import difflib
+import json
+import re
+
+# Uma cópia completa a cada SNAPSHOT_INTERVAL revisões limita quantos diffs
+# precisam ser aplicados para reconstruir uma versão
+DEFAULT_SNAPSHOT_INTERVAL = 20
+
+# Palavras e espaços dentro de cada linha: edições pequenas em parágrafos longos geram diffs pequenos
+TOKEN_RE = re.compile(r'\s+|\S+')
+
+def tokenize_lines(text):
+    """Tokens de cada linha (com a quebra de linha no último token)"""
+    return [TOKEN_RE.findall(line) for line in text.splitlines(keepends=True)]
+
+def tokenize(text):
+    return [token for line in tokenize_lines(text) for token in line]
+
+def diff_text(old, new):
+    """Diff de old para new: lista de [início, fim, texto] sobre os tokens de old.
+
+    Compara primeiro linha a linha e só refina por palavra as linhas alteradas,
+    para que notas longas não paguem a comparação token a token do texto todo.
+    """
+    old_lines, new_lines = tokenize_lines(old), tokenize_lines(new)
+    old_offsets = [0]
+    for line in old_lines:
+        old_offsets.append(old_offsets[-1] + len(line))
+
+    operations = []
+    matcher = difflib.SequenceMatcher(None, [''.join(line) for line in old_lines], [''.join(line) for line in new_lines], autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        old_tokens = [token for line in old_lines[i1:i2] for token in line]
+        new_tokens = [token for line in new_lines[j1:j2] for token in line]
+        if tag != 'replace':
+            operations.append([old_offsets[i1], old_offsets[i2], ''.join(new_tokens)])
+            continue
+        words = difflib.SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+        for word_tag, a1, a2, b1, b2 in words.get_opcodes():
+            if word_tag != 'equal':
+                operations.append([old_offsets[i1] + a1, old_offsets[i1] + a2, ''.join(new_tokens[b1:b2])])
+    return operations
+
+def patch_text(old, operations):
+    """Aplica um diff gerado por diff_text"""
+    tokens = tokenize(old)
+    parts = []
+    position = 0
+    for start, end, text in operations:
+        parts.extend(tokens[position:start])
+        parts.append(text)
+        position = end
+    parts.extend(tokens[position:])
+    return ''.join(parts)
+
+def snapshot_interval():
+    return current_app.config.get('NOTE_SNAPSHOT_INTERVAL', DEFAULT_SNAPSHOT_INTERVAL)
+
+def encode_revision(previous, content, diffs_since_snapshot, interval):
+    """(kind, conteúdo armazenado) da revisão com o texto content.
+
+    Grava uma cópia completa na primeira revisão, a cada interval revisões e
+    quando o diff não seria menor que metade do texto.
+    """
+    if previous is None or diffs_since_snapshot + 1 >= interval:
+        return 'snapshot', content
+    stored = json.dumps(diff_text(previous, content), ensure_ascii=False, separators=(',', ':'))
+    if len(stored) > len(content) // 2:
+        return 'snapshot', content
+    return 'diff', stored
+
+def record_revision(note, previous_content):
+    """Adiciona à sessão a revisão com o estado atual da nota.
+
+    previous_content é o texto da última revisão (o conteúdo da nota antes da
+    alteração), ou None para uma nota nova.
+    """
+    interval = snapshot_interval()
+    recent = (
+        db.session.query(NoteRevision.number, NoteRevision.kind)
+        .filter_by(note_id=note.id)
+        .order_by(NoteRevision.number.desc())
+        .limit(interval)
+        .all()
+    )
+    if not recent:
+        # Notas sem histórico começam com uma cópia completa
+        previous_content = None
+
+    diffs_since_snapshot = next((index for index, row in enumerate(recent) if row.kind == 'snapshot'), interval)
+    kind, stored = encode_revision(previous_content, note.content, diffs_since_snapshot, interval)
+
+    revision = NoteRevision(
+        note_id=note.id,
+        master_id=note.master_id,
+        number=recent[0].number + 1 if recent else 1,
+        kind=kind,
+        title=note.title,
+        theme=note.theme,
+        content=stored
+    )
+    db.session.add(revision)
+    return revision
+
+def materialize(note_id, number):
+    """(revisão, texto completo) da revisão number, ou None se ela não existe"""
+    snapshot_number = (
+        db.session.query(func.max(NoteRevision.number))
+        .filter(NoteRevision.note_id == note_id, NoteRevision.number <= number, NoteRevision.kind == 'snapshot')
+        .scalar()
+    )
+    if snapshot_number is None:
+        return None
+
+    rows = (
+        NoteRevision.query
+        .filter(NoteRevision.note_id == note_id, NoteRevision.number.between(snapshot_number, number))
+        .order_by(NoteRevision.number)
+        .all()
+    )
+    if not rows or rows[-1].number != number:
+        return None
+
+    content = rows[0].content
+    for row in rows[1:]:
+        content = patch_text(content, json.loads(row.content))
+    return rows[-1], content
+
+def compact_note(note_id, cutoff, interval):
+    """Mantém uma revisão por dia antes de cutoff, juntando os diffs das demais.
+
+    Retorna quantas revisões foram removidas.
+    """
+    rows = NoteRevision.query.filter_by(note_id=note_id).order_by(NoteRevision.number).all()
+    old = list(takewhile(lambda row: row.created_at is not None and row.created_at < cutoff, rows))
+    if len(old) < 2:
+        return 0
+
+    # Última revisão de cada dia; a última revisão antiga sempre fica, pois a
+    # primeira revisão recente é um diff em relação a ela
+    keep = set({row.created_at.date(): row.number for row in old}.values())
+    if len(keep) == len(old):
+        return 0
+
+    # Texto completo de cada revisão antiga
+    texts = {}
+    content = None
+    for row in old:
+        content = row.content if row.kind == 'snapshot' else patch_text(content, json.loads(row.content))
+        texts[row.number] = content
+
+    removed = 0
+    previous = None
+    diffs_since_snapshot = 0
+    for row in old:
+        if row.number not in keep:
+            db.session.delete(row)
+            removed += 1
+            continue
+        row.kind, row.content = encode_revision(previous, texts[row.number], diffs_since_snapshot, interval)
+        diffs_since_snapshot = 0 if row.kind == 'snapshot' else diffs_since_snapshot + 1
+        previous = texts[row.number]
+
+    db.session.commit()
+    return removed
+
+def compact_revisions(older_than_days, now=None):
+    """Compacta o histórico de todas as notas com mais de uma revisão por dia antes do limite"""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=older_than_days)
+    interval = snapshot_interval()
+
+    note_ids = [
+        row.note_id for row in
+        db.session.query(NoteRevision.note_id)
+        .filter(NoteRevision.created_at < cutoff)
+        .group_by(NoteRevision.note_id)
+        .having(func.count() > func.count(func.distinct(func.date(NoteRevision.created_at))))
+        .all()
+    ]
+
+    stats = {'notes': 0, 'removed': 0}
+    for note_id in note_ids:
+        removed = compact_note(note_id, cutoff, interval)
+        if removed:
+            stats['notes'] += 1
+            stats['removed'] += removed
+    return stats
@@ -1,15 +1,55 @@
 from flask import Blueprint, request, jsonify, session
-from src.models.user import db, Note
+from src.models.user import db, Note, NoteRevision, note_search_available
+from src.note_revisions import record_revision, materialize
+from src.http_cache import compute_etag, conditional_response
+from sqlalchemy.exc import IntegrityError, OperationalError
 from datetime import datetime
 
 notes_bp = Blueprint('notes', __name__)
 
+# Quantidade máxima de resultados retornados pela busca
+MAX_SEARCH_RESULTS = 100
+
+# Tamanho máximo de página da lista de revisões
+MAX_REVISIONS_PAGE = 200
+
+# Tentativas de uma edição que perdeu a disputa com outra edição da mesma nota
+EDIT_ATTEMPTS = 3
+
 def require_master():
     """Decorator para verificar se o usuário é um mestre logado"""
     if 'user_id' not in session or not session.get('is_master'):
         return jsonify({'error': 'Acesso negado. Apenas mestres podem acessar esta funcionalidade'}), 403
     return None
 
+def edit_note(note_id, master_id, change, always_record=False):
+    """Aplica change(note) e grava a revisão; retorna a nota, ou None se ela não existe.
+    
+    A linha da nota é travada (FOR UPDATE) para que o número e a base do diff
+    da revisão venham da última edição gravada. No SQLite, sem trava de linha,
+    a transação que perde a disputa falha e é refeita com a nota atualizada.
+    """
+    for attempt in range(EDIT_ATTEMPTS):
+        try:
+            note = Note.query.filter_by(id=note_id, master_id=master_id).with_for_update().first()
+            if not note:
+                return None
+            
+            previous = (note.title, note.content, note.theme)
+            change(note)
+            note.updated_at = datetime.utcnow()
+            
+            # Guardar a versão anterior no histórico (apenas o diff, na maioria das vezes)
+            if always_record or (note.title, note.content, note.theme) != previous:
+                record_revision(note, previous[1])
+            
+            db.session.commit()
+            return note
+        except (IntegrityError, OperationalError):
+            db.session.rollback()
+            if attempt == EDIT_ATTEMPTS - 1:
+                raise
+
 @notes_bp.route('/notes', methods=['GET'])
 def get_notes():
     auth_error = require_master()
@@ -18,10 +58,105 @@ def get_notes():
     
     try:
         master_id = session['user_id']
-        notes = Note.query.filter_by(master_id=master_id).order_by(Note.created_at.desc()).all()
+        # ?mode=list retorna apenas títulos, temas e datas, sem o conteúdo
+        list_mode = request.args.get('mode') == 'list'
+        theme = request.args.get('theme')
+        
+        filters = [Note.master_id == master_id]
+        if theme:
+            filters.append(Note.theme == theme)
+        
+        # Versão da lista: ids e datas de atualização, sem carregar o conteúdo das notas
+        versions = db.session.query(Note.id, Note.updated_at).filter(*filters).order_by(Note.created_at.desc()).all()
+        etag = compute_etag('notes', master_id, list_mode, theme, [tuple(row) for row in versions])
+        
+        def build():
+            query = Note.query.filter(*filters).order_by(Note.created_at.desc())
+            if list_mode:
+                notes = query.options(db.defer(Note.content)).all()
+                return jsonify({
+                    'notes': [note.to_summary_dict() for note in notes]
+                }), 200
+            
+            notes = query.all()
+            return jsonify({
+                'notes': [note.to_dict() for note in notes]
+            }), 200
+        
+        return conditional_response(etag, build)
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+def build_match_query(text):
+    """Converte o texto digitado em uma consulta FTS5 segura (termos entre aspas, com prefixo)"""
+    terms = [term.replace('"', '""') for term in text.split()]
+    return ' '.join(f'"{term}"*' for term in terms if term)
+
+@notes_bp.route('/notes/search', methods=['GET'])
+def search_notes():
+    auth_error = require_master()
+    if auth_error:
+        return auth_error
+    
+    try:
+        text = request.args.get('q', '').strip()
+        if not text:
+            return jsonify({'error': 'Termo de busca é obrigatório'}), 400
+        
+        master_id = session['user_id']
+        theme = request.args.get('theme')
+        limit = min(max(request.args.get('limit', 20, type=int), 1), MAX_SEARCH_RESULTS)
+        
+        if note_search_available():
+            sql = """
+                SELECT note.id, note.title, note.theme, note.created_at, note.updated_at,
+                       highlight(note_fts, 0, '<mark>', '</mark>') AS title_highlight,
+                       snippet(note_fts, 1, '<mark>', '</mark>', '…', 24) AS snippet,
+                       bm25(note_fts, 10.0, 1.0, 5.0) AS rank
+                FROM note_fts
+                JOIN note ON note.id = note_fts.rowid
+                WHERE note_fts MATCH :query AND note.master_id = :master_id
+            """
+            params = {'query': build_match_query(text), 'master_id': master_id, 'limit': limit}
+            if theme:
+                sql += " AND note.theme = :theme"
+                params['theme'] = theme
+            sql += " ORDER BY rank LIMIT :limit"
+            
+            results = [
+                {
+                    'id': row.id,
+                    'title': row.title,
+                    'title_highlight': row.title_highlight,
+                    'theme': row.theme,
+                    'snippet': row.snippet,
+                    'rank': row.rank,
+                    'created_at': row.created_at.isoformat() if row.created_at else None,
+                    'updated_at': row.updated_at.isoformat() if row.updated_at else None
+                }
+                for row in db.session.execute(db.text(sql).columns(created_at=db.DateTime, updated_at=db.DateTime), params)
+            ]
+        else:
+            # Sem FTS5: busca simples por LIKE no título e no conteúdo
+            pattern = f"%{text}%"
+            query = Note.query.filter(
+                Note.master_id == master_id,
+                db.or_(Note.title.ilike(pattern), Note.content.ilike(pattern))
+            )
+            if theme:
+                query = query.filter(Note.theme == theme)
+            results = []
+            for note in query.order_by(Note.updated_at.desc()).limit(limit).all():
+                result = note.to_summary_dict()
+                result['title_highlight'] = note.title
+                result['snippet'] = note.content[:200]
+                result['rank'] = None
+                results.append(result)
         
         return jsonify({
-            'notes': [note.to_dict() for note in notes]
+            'query': text,
+            'results': results
         }), 200
         
     except Exception as e:
@@ -49,6 +184,8 @@ def create_note():
         )
         
         db.session.add(note)
+        db.session.flush()
+        record_revision(note, None)
         db.session.commit()
         
         return jsonify({
@@ -68,12 +205,18 @@ def get_note(note_id):
     
     try:
         master_id = session['user_id']
-        note = Note.query.filter_by(id=note_id, master_id=master_id).first()
+        version = db.session.query(Note.updated_at).filter_by(id=note_id, master_id=master_id).first()
         
-        if not note:
+        if not version:
             return jsonify({'error': 'Anotação não encontrada'}), 404
         
-        return jsonify({'note': note.to_dict()}), 200
+        etag = compute_etag('note', note_id, version.updated_at)
+        
+        def build():
+            note = Note.query.get(note_id)
+            return jsonify({'note': note.to_dict()}), 200
+        
+        return conditional_response(etag, build)
         
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
@@ -86,23 +229,20 @@ def update_note(note_id):
     
     try:
         master_id = session['user_id']
-        note = Note.query.filter_by(id=note_id, master_id=master_id).first()
-        
-        if not note:
-            return jsonify({'error': 'Anotação não encontrada'}), 404
-        
         data = request.get_json()
         
-        if 'title' in data:
-            note.title = data['title']
-        if 'content' in data:
-            note.content = data['content']
-        if 'theme' in data:
-            note.theme = data['theme']
+        def change(note):
+            if 'title' in data:
+                note.title = data['title']
+            if 'content' in data:
+                note.content = data['content']
+            if 'theme' in data:
+                note.theme = data['theme']
         
-        note.updated_at = datetime.utcnow()
+        note = edit_note(note_id, master_id, change)
         
-        db.session.commit()
+        if not note:
+            return jsonify({'error': 'Anotação não encontrada'}), 404
         
         return jsonify({
             'message': 'Anotação atualizada com sucesso',
@@ -126,6 +266,7 @@ def delete_note(note_id):
         if not note:
             return jsonify({'error': 'Anotação não encontrada'}), 404
         
+        NoteRevision.query.filter_by(note_id=note.id).delete(synchronize_session=False)
         db.session.delete(note)
         db.session.commit()
         
@@ -135,3 +276,96 @@ def delete_note(note_id):
         db.session.rollback()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+@notes_bp.route('/notes/<int:note_id>/revisions', methods=['GET'])
+def get_note_revisions(note_id):
+    """Histórico de revisões da nota, da mais recente para a mais antiga (?before=<número>&limit=)"""
+    auth_error = require_master()
+    if auth_error:
+        return auth_error
+    
+    try:
+        master_id = session['user_id']
+        if not db.session.query(Note.id).filter_by(id=note_id, master_id=master_id).first():
+            return jsonify({'error': 'Anotação não encontrada'}), 404
+        
+        limit = min(max(request.args.get('limit', 50, type=int), 1), MAX_REVISIONS_PAGE)
+        before = request.args.get('before', type=int)
+        
+        query = NoteRevision.query.filter(NoteRevision.note_id == note_id)
+        if before is not None:
+            query = query.filter(NoteRevision.number < before)
+        revisions = query.order_by(NoteRevision.number.desc()).limit(limit).all()
+        
+        return jsonify({
+            'revisions': [revision.to_summary_dict() for revision in revisions],
+            'next_before': revisions[-1].number if len(revisions) == limit else None
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@notes_bp.route('/notes/<int:note_id>/revisions/<int:number>', methods=['GET'])
+def get_note_revision(note_id, number):
+    """Conteúdo completo da nota em uma revisão"""
+    auth_error = require_master()
+    if auth_error:
+        return auth_error
+    
+    try:
+        master_id = session['user_id']
+        if not db.session.query(Note.id).filter_by(id=note_id, master_id=master_id).first():
+            return jsonify({'error': 'Anotação não encontrada'}), 404
+        
+        stored = db.session.query(NoteRevision.id, NoteRevision.created_at).filter_by(note_id=note_id, number=number).first()
+        if not stored:
+            return jsonify({'error': 'Revisão não encontrada'}), 404
+        
+        # O texto de uma revisão não muda depois de gravado (a compactação só remove intermediárias)
+        etag = compute_etag('note-revision', stored.id, stored.created_at)
+        
+        def build():
+            revision, content = materialize(note_id, number)
+            return jsonify({
+                'revision': dict(revision.to_summary_dict(), content=content)
+            }), 200
+        
+        return conditional_response(etag, build)
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@notes_bp.route('/notes/<int:note_id>/revisions/<int:number>/restore', methods=['POST'])
+def restore_note_revision(note_id, number):
+    """Volta a nota ao estado de uma revisão (gravado como uma nova revisão)"""
+    auth_error = require_master()
+    if auth_error:
+        return auth_error
+    
+    try:
+        master_id = session['user_id']
+        if not Note.query.filter_by(id=note_id, master_id=master_id).first():
+            return jsonify({'error': 'Anotação não encontrada'}), 404
+        
+        materialized = materialize(note_id, number)
+        if materialized is None:
+            return jsonify({'error': 'Revisão não encontrada'}), 404
+        revision, content = materialized
+        
+        def change(note):
+            note.title = revision.title
+            note.content = content
+            note.theme = revision.theme
+        
+        note = edit_note(note_id, master_id, change, always_record=True)
+        
+        if not note:
+            return jsonify({'error': 'Anotação não encontrada'}), 404
+        
+        return jsonify({
+            'message': 'Anotação restaurada com sucesso',
+            'note': note.to_dict()
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
@@ -0,0 +1,83 @@
+from flask import Blueprint, current_app, render_template, request, send_from_directory, url_for
+from src.assets import AssetManifest, precompressed_variant
+from src.http_cache import compute_etag, conditional_response
+import mimetypes
+import threading
+
+pages_bp = Blueprint('pages', __name__)
+
+# Cache de um ano para arquivos com hash no nome (o nome muda quando o conteúdo muda)
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+_rendered_pages = {}
+_rendered_lock = threading.Lock()
+
+def asset_manifest():
+    manifest = current_app.extensions.get('asset_manifest')
+    if manifest is None:
+        manifest = current_app.extensions['asset_manifest'] = AssetManifest(current_app.config['STATIC_FOLDER'])
+    return manifest
+
+@pages_bp.app_template_global()
+def asset_url(filename):
+    """URL do arquivo estático com hash no nome, se o build de assets foi executado"""
+    return url_for('pages.serve_static', filename=asset_manifest().url_name(filename))
+
+def render_page(template_name):
+    """Renderiza um template estático uma única vez por build de assets.
+
+    Em modo debug (ou com TEMPLATES_AUTO_RELOAD) o template é sempre renderizado.
+    """
+    if current_app.debug or current_app.config.get('TEMPLATES_AUTO_RELOAD'):
+        return render_template(template_name)
+
+    key = (template_name, asset_manifest().refresh().version)
+    page = _rendered_pages.get(key)
+    if page is None:
+        body = render_template(template_name)
+        page = (compute_etag('page', body), body)
+        with _rendered_lock:
+            _rendered_pages[key] = page
+    etag, body = page
+    return conditional_response(etag, lambda: body)
+
+@pages_bp.route("/")
+def index():
+    return render_page("index.html")
+
+@pages_bp.route("/logins/<path:filename>")
+def serve_logins(filename):
+    # Agora os arquivos de login estão diretamente na pasta templates
+    return render_page(filename)
+
+@pages_bp.route("/painemestre/<path:filename>")
+def serve_painel_mestre(filename):
+    # Agora os arquivos do painel do mestre estão diretamente na pasta templates
+    return render_page(filename)
+
+@pages_bp.route("/jogador/<path:filename>")
+def serve_jogador(filename):
+    # Agora os arquivos do jogador estão diretamente na pasta templates
+    return render_page(filename)
+
+@pages_bp.route('/static/<path:filename>')
+def serve_static(filename):
+    # Servir a variante pré-comprimida (.br/.gz) quando o cliente aceita
+    encoding, served = precompressed_variant(current_app.config['STATIC_FOLDER'], filename, request.accept_encodings)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = send_from_directory(current_app.config['STATIC_FOLDER'], served, mimetype=mimetype)
+
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+
+    if asset_manifest().is_fingerprinted(filename):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        # Arquivos sem hash: o navegador revalida com ETag/Last-Modified
+        response.cache_control.no_cache = True
+        response.cache_control.max_age = None
+    return response
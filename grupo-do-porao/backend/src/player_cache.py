@@ -0,0 +1,80 @@
+from flask import Response, current_app
+from src.models.user import Player
+from src.sharding import shard_key
+from collections import OrderedDict
+import threading
+
+# Quantidade máxima de jogadores com JSON pré-serializado em memória
+MAX_CACHED_PLAYERS = 4096
+
+class PlayerResponseCache:
+    """Cache LRU do JSON já serializado de cada jogador, validado pela coluna version.
+
+    As entradas são indexadas por (shard, id): com sharding os ids se repetem entre mesas.
+    """
+
+    def __init__(self, max_entries=MAX_CACHED_PLAYERS):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, player_id, version):
+        key = (shard_key(), player_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, player_id, version, body):
+        key = (shard_key(), player_id)
+        with self._lock:
+            self._entries[key] = (version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, player_id):
+        key = (shard_key(), player_id)
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def encode(self, player):
+        """Serializa o jogador e guarda o resultado para a versão atual da linha"""
+        body = current_app.json.dumps(player.to_dict()).encode('utf-8')
+        self.put(player.id, player.version, body)
+        return body
+
+    def bodies_for(self, versions):
+        """Recebe pares (id, version) e devolve o JSON de cada jogador na mesma ordem.
+
+        Apenas os jogadores ausentes ou desatualizados no cache são carregados
+        do banco, em uma única consulta.
+        """
+        bodies = {}
+        missing = []
+        for player_id, version in versions:
+            body = self.get(player_id, version)
+            if body is None:
+                missing.append(player_id)
+            else:
+                bodies[player_id] = body
+
+        if missing:
+            for player in Player.query.filter(Player.id.in_(missing)).all():
+                bodies[player.id] = self.encode(player)
+
+        return [bodies[player_id] for player_id, _ in versions if player_id in bodies]
+
+player_cache = PlayerResponseCache()
+
+def json_bytes_response(key, body, status=200):
+    """Monta uma resposta {"key": <body>} a partir de JSON já serializado"""
+    if isinstance(body, list):
+        body = b'[' + b', '.join(body) + b']'
+    return Response(b'{"' + key.encode('utf-8') + b'": ' + body + b'}', status=status, mimetype='application/json')
@@ -1,10 +1,33 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, Response, request, jsonify, session, stream_with_context
 from src.models.user import db, User, Player
+from src.events import publish_event
+from src.player_cache import player_cache, json_bytes_response
+from src.live_session import live_sessions
+from src.http_cache import compute_etag, conditional_response
+from src.security import HashingBusyError
+from sqlalchemy import case, update
+from sqlalchemy.orm.exc import StaleDataError
+from datetime import datetime
+import csv
+import io
+import json
 import secrets
 import string
 
 players_bp = Blueprint('players', __name__)
 
+# Quantidade máxima de jogadores por requisição de importação/atualização em lote
+MAX_BULK_PLAYERS = 200
+
+# Colunas do export em CSV (items e debuffs são exportados como JSON)
+EXPORT_FIELDS = ('id', 'name', 'age', 'money', 'health', 'mana', 'vigor', 'items', 'debuffs', 'avatar_url', 'player_username')
+
+# Atributos de status limitados entre 0 e 100
+STATUS_FIELDS = ('health', 'mana', 'vigor')
+
+# Campos do jogador repassados aos clientes da mesa quando alterados
+PLAYER_EVENT_FIELDS = ('name', 'age', 'money', 'health', 'mana', 'vigor', 'items', 'debuffs', 'avatar_url', 'player_username')
+
 def require_master():
     """Decorator para verificar se o usuário é um mestre logado"""
     if 'user_id' not in session or not session.get('is_master'):
@@ -15,6 +38,45 @@ def generate_player_password():
     """Gera uma senha aleatória para o jogador"""
     return ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(8))
 
+def clamp_status(expression):
+    """Limita uma expressão SQL ao intervalo 0-100 (equivalente a MAX(0, MIN(100, x)))"""
+    return case((expression < 0, 0), (expression > 100, 100), else_=expression)
+
+def apply_player_fields(player, data):
+    """Aplica os campos editáveis da ficha (exceto credenciais) ao jogador"""
+    if 'name' in data:
+        player.name = data['name']
+    if 'age' in data:
+        player.age = data['age']
+    if 'money' in data:
+        player.money = data['money']
+    if 'health' in data:
+        player.health = max(0, min(100, data['health']))
+    if 'mana' in data:
+        player.mana = max(0, min(100, data['mana']))
+    if 'vigor' in data:
+        player.vigor = max(0, min(100, data['vigor']))
+    if 'items' in data:
+        player.set_items(data['items'])
+    if 'debuffs' in data:
+        player.set_debuffs(data['debuffs'])
+    if 'avatar_url' in data:
+        player.avatar_url = data['avatar_url']
+
+def sync_live_status(master_id, player_data, data):
+    """Mantém a sessão ao vivo coerente com uma ficha gravada diretamente no banco"""
+    live = live_sessions.get(master_id)
+    if live is None:
+        return
+    if data is None:
+        # Jogador novo: passa a fazer parte da sessão com o status gravado
+        live.track(player_data['id'], player_data)
+        return
+    values = {field: player_data[field] for field in STATUS_FIELDS if field in data}
+    status = live.apply(player_data['id'], values=values, dirty=False) if values else live.status(player_data['id'])
+    if status:
+        player_data.update(status)
+
 @players_bp.route('/players', methods=['GET'])
 def get_players():
     auth_error = require_master()
@@ -23,11 +85,20 @@ def get_players():
     
     try:
         master_id = session['user_id']
-        players = Player.query.filter_by(master_id=master_id).all()
         
-        return jsonify({
-            'players': [player.to_dict() for player in players]
-        }), 200
+        # Consultar apenas (id, version) e reaproveitar o JSON dos jogadores inalterados
+        versions = db.session.query(Player.id, Player.version).filter_by(master_id=master_id).order_by(Player.id).all()
+        
+        # Em sessão ao vivo o status vem da memória (ainda não gravado no banco)
+        live = live_sessions.get(master_id)
+        live_revision = live.snapshot()[1] if live else None
+        etag = compute_etag('players', master_id, [tuple(row) for row in versions], live_revision)
+        
+        def build_response():
+            bodies = player_cache.bodies_for(versions)
+            return json_bytes_response('players', live.overlay(bodies) if live else bodies)
+        
+        return conditional_response(etag, build_response)
         
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
@@ -75,6 +146,7 @@ def create_player():
         
         # Retornar dados do jogador incluindo a senha gerada
         player_data = player.to_dict()
+        sync_live_status(master_id, player_data, None)
         player_data['generated_password'] = player_password
         
         return jsonify({
@@ -82,6 +154,9 @@ def create_player():
             'player': player_data
         }), 201
         
+    except HashingBusyError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
@@ -90,20 +165,30 @@ def create_player():
 def get_player(player_id):
     try:
         # Verificar se é mestre ou jogador
+        query = db.session.query(Player.id, Player.version).filter(Player.id == player_id)
         if 'user_id' in session and session.get('is_master'):
             master_id = session['user_id']
-            player = Player.query.filter_by(id=player_id, master_id=master_id).first()
+            query = query.filter(Player.master_id == master_id)
         elif 'player_id' in session:
             if session['player_id'] != player_id:
                 return jsonify({'error': 'Acesso negado'}), 403
-            player = Player.query.get(player_id)
+            master_id = session.get('master_id')
         else:
             return jsonify({'error': 'Acesso negado'}), 403
         
-        if not player:
+        row = query.first()
+        if not row:
             return jsonify({'error': 'Jogador não encontrado'}), 404
         
-        return jsonify({'player': player.to_dict()}), 200
+        live = live_sessions.get(master_id)
+        live_status = live.status(row.id) if live else None
+        etag = compute_etag('player', row.id, row.version, live_status)
+        
+        def build_response():
+            body = player_cache.bodies_for([row])[0]
+            return json_bytes_response('player', live.overlay([body])[0] if live_status else body)
+        
+        return conditional_response(etag, build_response)
         
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
@@ -124,24 +209,7 @@ def update_player(player_id):
         data = request.get_json()
         
         # Atualizar campos
-        if 'name' in data:
-            player.name = data['name']
-        if 'age' in data:
-            player.age = data['age']
-        if 'money' in data:
-            player.money = data['money']
-        if 'health' in data:
-            player.health = max(0, min(100, data['health']))
-        if 'mana' in data:
-            player.mana = max(0, min(100, data['mana']))
-        if 'vigor' in data:
-            player.vigor = max(0, min(100, data['vigor']))
-        if 'items' in data:
-            player.set_items(data['items'])
-        if 'debuffs' in data:
-            player.set_debuffs(data['debuffs'])
-        if 'avatar_url' in data:
-            player.avatar_url = data['avatar_url']
+        apply_player_fields(player, data)
         
         # Atualizar credenciais do jogador se fornecidas
         if 'player_username' in data:
@@ -159,11 +227,26 @@ def update_player(player_id):
         
         db.session.commit()
         
+        player_data = player.to_dict()
+        sync_live_status(master_id, player_data, data)
+        
+        # Notificar a mesa apenas com os campos alterados
+        changes = {key: player_data[key] for key in PLAYER_EVENT_FIELDS if key in data}
+        if changes:
+            changes['id'] = player.id
+            publish_event(player.master_id, 'player_updated', changes)
+        
         return jsonify({
             'message': 'Jogador atualizado com sucesso',
-            'player': player.to_dict()
+            'player': player_data
         }), 200
         
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({'error': 'Jogador alterado por outra requisição, tente novamente'}), 409
+    except HashingBusyError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
@@ -183,6 +266,11 @@ def delete_player(player_id):
         
         db.session.delete(player)
         db.session.commit()
+        player_cache.invalidate(player_id)
+        
+        live = live_sessions.get(master_id)
+        if live:
+            live.forget(player_id)
         
         return jsonify({'message': 'Jogador removido com sucesso'}), 200
         
@@ -196,27 +284,51 @@ def update_player_status(player_id):
         # Permitir que tanto mestre quanto jogador atualizem status
         if 'user_id' in session and session.get('is_master'):
             master_id = session['user_id']
-            player = Player.query.filter_by(id=player_id, master_id=master_id).first()
         elif 'player_id' in session and session['player_id'] == player_id:
-            player = Player.query.get(player_id)
+            master_id = session.get('master_id')
         else:
             return jsonify({'error': 'Acesso negado'}), 403
         
+        data = request.get_json()
+        
+        # Sessão ao vivo: alterar apenas a memória (e o journal), sem ir ao banco
+        live = live_sessions.get(master_id)
+        if live:
+            values = {field: data[field] for field in STATUS_FIELDS if field in data}
+            status = live.apply(player_id, values=values)
+            if status is not None:
+                if values:
+                    publish_event(master_id, 'player_status', dict({field: status[field] for field in values}, id=player_id))
+                return jsonify({
+                    'message': 'Status atualizado com sucesso',
+                    'player': dict(status, id=player_id),
+                    'live': True
+                }), 200
+        
+        player = Player.query.filter_by(id=player_id, master_id=master_id).first()
         if not player:
             return jsonify({'error': 'Jogador não encontrado'}), 404
         
-        data = request.get_json()
-        
-        # Atualizar apenas status
-        if 'health' in data:
-            player.health = max(0, min(100, data['health']))
-        if 'mana' in data:
-            player.mana = max(0, min(100, data['mana']))
-        if 'vigor' in data:
-            player.vigor = max(0, min(100, data['vigor']))
+        # Atualizar apenas status, com um UPDATE direto: atualizações simultâneas do
+        # mesmo jogador não entram em conflito com o controle de versão do ORM
+        values = {field: max(0, min(100, data[field])) for field in STATUS_FIELDS if field in data}
+        if values:
+            values['version'] = Player.version + 1
+            values['updated_at'] = datetime.utcnow()
+            db.session.execute(
+                update(Player)
+                .where(Player.id == player.id)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
         
         db.session.commit()
         
+        changes = {key: getattr(player, key) for key in ('health', 'mana', 'vigor') if key in data}
+        if changes:
+            changes['id'] = player.id
+            publish_event(player.master_id, 'player_status', changes)
+        
         return jsonify({
             'message': 'Status atualizado com sucesso',
             'player': player.to_dict()
@@ -226,3 +338,288 @@ def update_player_status(player_id):
         db.session.rollback()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+
+def parse_bulk_payload():
+    """Lê a lista de jogadores do corpo JSON ([...] ou {"players": [...]}) ou NDJSON"""
+    if request.mimetype == 'application/x-ndjson':
+        lines = request.get_data(as_text=True).splitlines()
+        return [json.loads(line) for line in lines if line.strip()]
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('players')
+    return data if isinstance(data, list) else None
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def bulk_entry_error(entry):
+    """Mensagem de erro de uma entrada do lote, ou None se ela é válida"""
+    if not isinstance(entry, dict):
+        return 'Entrada inválida'
+    if 'id' in entry and (not isinstance(entry['id'], int) or isinstance(entry['id'], bool)):
+        return 'Id do jogador inválido'
+    if 'id' not in entry and not entry.get('name'):
+        return 'Nome do jogador é obrigatório'
+    if 'name' in entry and (not isinstance(entry['name'], str) or not entry['name'].strip()):
+        return 'Nome do jogador inválido'
+    for field in ('player_username', 'player_password'):
+        if field in entry and not isinstance(entry[field], str):
+            return f'Campo {field} deve ser texto'
+    for field in ('money', 'health', 'mana', 'vigor'):
+        if field in entry and not is_number(entry[field]):
+            return f'Campo {field} deve ser numérico'
+    for field in ('items', 'debuffs'):
+        if field in entry and not isinstance(entry[field], list):
+            return f'Campo {field} deve ser uma lista'
+    return None
+
+@players_bp.route('/players/bulk', methods=['POST'])
+def bulk_players():
+    auth_error = require_master()
+    if auth_error:
+        return auth_error
+    
+    try:
+        try:
+            entries = parse_bulk_payload()
+        except ValueError:
+            return jsonify({'error': 'NDJSON inválido'}), 400
+        
+        if not entries:
+            return jsonify({'error': 'Lista de jogadores é obrigatória'}), 400
+        if len(entries) > MAX_BULK_PLAYERS:
+            return jsonify({'error': f'Máximo de {MAX_BULK_PLAYERS} jogadores por requisição'}), 400
+        
+        master_id = session['user_id']
+        errors = []
+        
+        for index, entry in enumerate(entries):
+            error = bulk_entry_error(entry)
+            if error:
+                errors.append({'index': index, 'error': error})
+        if errors:
+            return jsonify({'error': 'Dados inválidos', 'details': errors}), 400
+        
+        # Carregar de uma vez todos os jogadores que serão atualizados
+        update_ids = [entry['id'] for entry in entries if 'id' in entry]
+        players_by_id = {}
+        if update_ids:
+            players_by_id = {
+                player.id: player
+                for player in Player.query.filter(Player.master_id == master_id, Player.id.in_(update_ids)).all()
+            }
+        
+        # Uma única consulta IN (...) para verificar todos os usernames solicitados
+        requested_usernames = {}
+        for index, entry in enumerate(entries):
+            if 'id' in entry:
+                if 'player_username' in entry:
+                    requested_usernames[index] = entry['player_username']
+            else:
+                requested_usernames[index] = entry.get('player_username', entry['name'].lower().replace(' ', '_'))
+        
+        taken = {}
+        if requested_usernames:
+            rows = db.session.query(Player.id, Player.player_username).filter(
+                Player.player_username.in_(set(requested_usernames.values()))
+            ).all()
+            taken = {row.player_username: row.id for row in rows}
+        
+        created = []
+        updated = []
+        
+        for index, entry in enumerate(entries):
+            if 'id' in entry:
+                player = players_by_id.get(entry['id'])
+                if not player:
+                    errors.append({'index': index, 'error': 'Jogador não encontrado'})
+                    continue
+                
+                apply_player_fields(player, entry)
+                
+                if index in requested_usernames:
+                    username = requested_usernames[index]
+                    if taken.get(username, player.id) != player.id:
+                        errors.append({'index': index, 'error': 'Username do jogador já está em uso'})
+                        continue
+                    taken[username] = player.id
+                    player.player_username = username
+                
+                if entry.get('player_password'):
+                    player.set_player_password(entry['player_password'])
+                
+                updated.append((player, entry))
+            else:
+                username = requested_usernames[index]
+                if username in taken:
+                    username = f"{username}_{secrets.randbelow(1000)}"
+                    while username in taken:
+                        username = f"{requested_usernames[index]}_{secrets.randbelow(1000)}"
+                taken[username] = None
+                
+                player_password = generate_player_password()
+                player = Player(master_id=master_id, player_username=username, money=0, health=100, mana=50, vigor=75)
+                apply_player_fields(player, entry)
+                if 'items' not in entry:
+                    player.set_items([])
+                if 'debuffs' not in entry:
+                    player.set_debuffs([])
+                player.set_player_password(player_password)
+                
+                db.session.add(player)
+                created.append((player, player_password))
+        
+        if errors:
+            db.session.rollback()
+            return jsonify({'error': 'Dados inválidos', 'details': errors}), 400
+        
+        # Todas as criações e atualizações em uma única transação
+        db.session.commit()
+        
+        created_data = []
+        for player, player_password in created:
+            player_data = player.to_dict()
+            sync_live_status(master_id, player_data, None)
+            player_data['generated_password'] = player_password
+            created_data.append(player_data)
+        
+        updated_data = []
+        for player, entry in updated:
+            player_data = player.to_dict()
+            sync_live_status(master_id, player_data, entry)
+            updated_data.append(player_data)
+            
+            changes = {key: player_data[key] for key in PLAYER_EVENT_FIELDS if key in entry}
+            if changes:
+                changes['id'] = player.id
+                publish_event(master_id, 'player_updated', changes)
+        
+        return jsonify({
+            'message': f'{len(created_data)} jogadores criados e {len(updated_data)} atualizados',
+            'created': created_data,
+            'updated': updated_data
+        }), 200
+        
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({'error': 'Jogador alterado por outra requisição, tente novamente'}), 409
+    except HashingBusyError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@players_bp.route('/players/export', methods=['GET'])
+def export_players():
+    auth_error = require_master()
+    if auth_error:
+        return auth_error
+    
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'Formato inválido. Use ndjson ou csv'}), 400
+    
+    master_id = session['user_id']
+    query = Player.query.filter_by(master_id=master_id).order_by(Player.id).yield_per(100)
+    
+    def export_row(player):
+        player_data = player.to_dict()
+        return {field: player_data[field] for field in EXPORT_FIELDS}
+    
+    def generate_ndjson():
+        for player in query:
+            yield json.dumps(export_row(player)) + '\n'
+    
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        for player in query:
+            row = export_row(player)
+            row['items'] = json.dumps(row['items'])
+            row['debuffs'] = json.dumps(row['debuffs'])
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    
+    if export_format == 'csv':
+        body, mimetype = generate_csv(), 'text/csv'
+    else:
+        body, mimetype = generate_ndjson(), 'application/x-ndjson'
+    
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=jogadores.{export_format}'}
+    )
+
+@players_bp.route('/players/status', methods=['PATCH'])
+def update_party_status():
+    auth_error = require_master()
+    if auth_error:
+        return auth_error
+    
+    try:
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('player_ids'), list) or not data['player_ids']:
+            return jsonify({'error': 'Lista de jogadores é obrigatória'}), 400
+        
+        deltas = data.get('deltas') or {}
+        if not isinstance(deltas, dict) or not deltas:
+            return jsonify({'error': 'Informe ao menos uma variação de status'}), 400
+        
+        invalid = [key for key, value in deltas.items() if key not in STATUS_FIELDS or not isinstance(value, int) or isinstance(value, bool)]
+        if invalid:
+            return jsonify({'error': f'Variações inválidas: {", ".join(invalid)}'}), 400
+        
+        try:
+            player_ids = [int(player_id) for player_id in data['player_ids']]
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Lista de jogadores inválida'}), 400
+        
+        master_id = session['user_id']
+        fields = [field for field in STATUS_FIELDS if field in deltas]
+        
+        live = live_sessions.get(master_id)
+        if live:
+            # Sessão ao vivo: aplicar as variações em memória, gravadas no próximo flush
+            changes = []
+            for player_id in player_ids:
+                status = live.apply(player_id, deltas={field: deltas[field] for field in fields})
+                if status is not None:
+                    change = dict({field: status[field] for field in fields}, id=player_id)
+                    changes.append(change)
+                    publish_event(master_id, 'player_status', change)
+            return jsonify({'players': changes, 'live': True}), 200
+        
+        values = {field: clamp_status(getattr(Player, field) + deltas[field]) for field in fields}
+        # Atualização em massa não passa pelo contador de versão do ORM: incrementar manualmente
+        values['version'] = Player.version + 1
+        values['updated_at'] = datetime.utcnow()
+        
+        # Um único UPDATE para toda a party, devolvendo apenas os campos alterados
+        statement = (
+            update(Player)
+            .where(Player.master_id == master_id, Player.id.in_(player_ids))
+            .values(**values)
+            .returning(Player.id, *[getattr(Player, field) for field in fields])
+            .execution_options(synchronize_session=False)
+        )
+        rows = db.session.execute(statement).all()
+        db.session.commit()
+        
+        changes = []
+        for row in rows:
+            change = dict(zip(['id'] + fields, row))
+            changes.append(change)
+            publish_event(master_id, 'player_status', change)
+        
+        return jsonify({'players': changes}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
@@ -0,0 +1,152 @@
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from functools import lru_cache
+import os
+import threading
+import time
+
+# Método de hash padrão (formato completo do werkzeug: algoritmo:parâmetros)
+DEFAULT_PASSWORD_HASH_METHOD = 'pbkdf2:sha256:600000'
+
+# Limites padrão do pool de hashing
+DEFAULT_HASH_WORKERS = os.cpu_count() or 2
+DEFAULT_HASH_QUEUE_SIZE = 32
+DEFAULT_HASH_TIMEOUT = 10
+
+# Limites padrão de tentativas de login (por janela de tempo)
+DEFAULT_LOGIN_WINDOW_SECONDS = 300
+DEFAULT_LOGIN_MAX_ATTEMPTS_PER_USER = 5
+DEFAULT_LOGIN_MAX_ATTEMPTS_PER_IP = 20
+
+class HashingBusyError(Exception):
+    """Fila do pool de hashing cheia: o servidor está sobrecarregado de logins"""
+    pass
+
+class HashingPool:
+    """Executa hashing de senhas em threads dedicadas com fila limitada"""
+
+    def __init__(self, max_workers, max_pending, timeout):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def run(self, function, *args, **kwargs):
+        # Recusar imediatamente em vez de enfileirar sem limite
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusyError('Servidor ocupado, tente novamente em instantes')
+        try:
+            future = self._executor.submit(function, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result(timeout=self.timeout)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_hashing_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = current_app.config
+                _pool = HashingPool(
+                    config.get('HASH_WORKERS', DEFAULT_HASH_WORKERS),
+                    config.get('HASH_QUEUE_SIZE', DEFAULT_HASH_QUEUE_SIZE),
+                    config.get('HASH_TIMEOUT', DEFAULT_HASH_TIMEOUT)
+                )
+    return _pool
+
+def password_hash_method():
+    return current_app.config.get('PASSWORD_HASH_METHOD', DEFAULT_PASSWORD_HASH_METHOD)
+
+def hash_password(password):
+    """Gera o hash da senha no pool de hashing usando o custo configurado"""
+    return get_hashing_pool().run(generate_password_hash, password, method=password_hash_method())
+
+def verify_password(password_hash, password):
+    """Verifica a senha no pool de hashing"""
+    return get_hashing_pool().run(check_password_hash, password_hash, password)
+
+@lru_cache(maxsize=16)
+def normalize_hash_method(method):
+    """Prefixo que o werkzeug grava no hash para o método configurado.
+
+    Formas abreviadas ('scrypt', 'pbkdf2', 'pbkdf2:sha512') recebem os
+    parâmetros padrão, como em werkzeug.security.generate_password_hash.
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        n, r, p = args or (2 ** 15, 8, 1)
+        return f'scrypt:{int(n)}:{int(r)}:{int(p)}'
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    return method
+
+def needs_rehash(password_hash):
+    """Indica se o hash foi gerado com um método/custo diferente do configurado"""
+    return password_hash.split('$', 1)[0] != normalize_hash_method(password_hash_method())
+
+class LoginThrottle:
+    """Limita tentativas de login falhas por chave (IP ou username) em uma janela deslizante"""
+
+    def __init__(self):
+        self._failures = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, attempts, now, window):
+        while attempts and attempts[0] <= now - window:
+            attempts.popleft()
+
+    def retry_after(self, keys, window, limits):
+        """Segundos até a próxima tentativa permitida, ou None se liberado.
+
+        keys e limits são sequências paralelas (ex: chave de IP e de usuário).
+        """
+        now = time.monotonic()
+        wait = None
+        with self._lock:
+            for key, limit in zip(keys, limits):
+                attempts = self._failures.get(key)
+                if not attempts:
+                    continue
+                self._prune(attempts, now, window)
+                if len(attempts) >= limit:
+                    remaining = attempts[0] + window - now
+                    wait = max(wait or 0, remaining)
+        return int(wait) + 1 if wait is not None else None
+
+    def record_failure(self, keys, window):
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                attempts = self._failures.setdefault(key, deque())
+                self._prune(attempts, now, window)
+                attempts.append(now)
+
+            # Evitar crescimento ilimitado: descartar chaves sem falhas recentes
+            if len(self._failures) > 10000:
+                for key in [key for key, attempts in self._failures.items() if not attempts or attempts[-1] <= now - window]:
+                    del self._failures[key]
+
+    def reset(self, keys):
+        with self._lock:
+            for key in keys:
+                self._failures.pop(key, None)
+
+login_throttle = LoginThrottle()
+
+def login_throttle_settings():
+    config = current_app.config
+    return (
+        config.get('LOGIN_WINDOW_SECONDS', DEFAULT_LOGIN_WINDOW_SECONDS),
+        (
+            config.get('LOGIN_MAX_ATTEMPTS_PER_IP', DEFAULT_LOGIN_MAX_ATTEMPTS_PER_IP),
+            config.get('LOGIN_MAX_ATTEMPTS_PER_USER', DEFAULT_LOGIN_MAX_ATTEMPTS_PER_USER)
+        )
+    )
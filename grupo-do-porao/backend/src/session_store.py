@@ -0,0 +1,43 @@
+from flask import current_app, session
+from flask_session.sessions import FileSystemSessionInterface
+
+class FileSystemSessionStore(FileSystemSessionInterface):
+    """Sessões no servidor (Flask-Session + cachelib): o cookie guarda apenas o id assinado.
+
+    Diferente da interface padrão do Flask-Session, o arquivo só é regravado
+    quando a sessão muda, então requisições comuns fazem apenas uma leitura.
+    """
+
+    def save_session(self, app, session, response):
+        if session and not self.should_set_cookie(app, session):
+            return
+        super().save_session(app, session, response)
+
+    def regenerate(self, session):
+        """Troca o id da sessão mantendo os dados (evita fixação de sessão no login)"""
+        self.cache.delete(self.key_prefix + session.sid)
+        session.sid = self._generate_sid()
+        session.modified = True
+
+def init_sessions(app):
+    """Instala o armazenamento de sessões configurado em SESSION_TYPE ('filesystem' ou 'cookie')"""
+    session_type = app.config.get('SESSION_TYPE', 'cookie')
+    if session_type == 'filesystem':
+        app.session_interface = FileSystemSessionStore(
+            app.config['SESSION_FILE_DIR'],
+            app.config.get('SESSION_FILE_THRESHOLD', 10000),
+            app.config.get('SESSION_FILE_MODE', 0o600),
+            app.config.get('SESSION_KEY_PREFIX', 'session:'),
+            app.config.get('SESSION_USE_SIGNER', True),
+            app.config.get('SESSION_PERMANENT', True)
+        )
+    elif session_type != 'cookie':
+        raise ValueError(f"SESSION_TYPE inválido: {session_type}")
+
+def start_session(**values):
+    """Inicia uma sessão autenticada com um novo id e os dados informados"""
+    session.clear()
+    regenerate = getattr(current_app.session_interface, 'regenerate', None)
+    if regenerate:
+        regenerate(session)
+    session.update(values)
@@ -0,0 +1,356 @@
+from flask import current_app, has_request_context
+from src.database import engine_options, install_sqlite_pragmas, migrate
+from src.events import current_master_id
+from src.models.user import db, Player, ShardRoute, ShardPlayerLogin, User
+from sqlalchemy import create_engine, delete, event, func, insert, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+import alembic.command
+import os
+import threading
+import time
+
+# Tabelas copiadas para o shard, pais antes dos filhos (todas têm master_id)
+SHARD_COPY_ORDER = (
+    'player', 'inventory_item', 'debuff', 'note', 'note_revision',
+    'dice_roll', 'chat_message', 'game_state'
+)
+
+COPY_BATCH_SIZE = 1000
+
+# Busca textual das notas no SQLite (mesma DDL da revisão 0002_performance_schema)
+NOTE_SEARCH_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS note_fts USING fts5(
+        title, content, theme,
+        content='note', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS note_fts_ai AFTER INSERT ON note BEGIN
+        INSERT INTO note_fts(rowid, title, content, theme) VALUES (new.id, new.title, new.content, new.theme);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS note_fts_ad AFTER DELETE ON note BEGIN
+        INSERT INTO note_fts(note_fts, rowid, title, content, theme) VALUES ('delete', old.id, old.title, old.content, old.theme);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS note_fts_au AFTER UPDATE ON note BEGIN
+        INSERT INTO note_fts(note_fts, rowid, title, content, theme) VALUES ('delete', old.id, old.title, old.content, old.theme);
+        INSERT INTO note_fts(rowid, title, content, theme) VALUES (new.id, new.title, new.content, new.theme);
+    END""",
+)
+
+# O alembic.command usa um contexto global: uma migração de shard por vez
+_migration_lock = threading.Lock()
+
+# Mestre fixado fora de uma requisição (threads e comandos); UNSET usa a sessão HTTP
+UNSET = object()
+_scoped_master = ContextVar('scoped_master', default=UNSET)
+
+class ShardEngines:
+    """Engines abertos por shard, em LRU: os menos usados saem do cache.
+
+    O engine retirado não recebe dispose(): uma sessão em andamento no shard
+    ainda pode estar usando o pool dele. As conexões são fechadas quando o
+    engine deixa de ser referenciado e é coletado.
+    """
+
+    def __init__(self, config, max_open):
+        self.config = config
+        self.max_open = max_open
+        self._engines = OrderedDict()
+        self._lock = threading.Lock()
+
+    def url(self, name):
+        return self.config['SHARD_URL'].format(shard=name)
+
+    def get(self, name):
+        with self._lock:
+            engine = self._engines.get(name)
+            if engine is not None:
+                self._engines.move_to_end(name)
+                return engine
+
+            url = self.url(name)
+            parsed = make_url(url)
+            if parsed.get_backend_name() == 'sqlite' and parsed.database:
+                os.makedirs(os.path.dirname(os.path.abspath(parsed.database)), exist_ok=True)
+            shard_config = dict(self.config, SQLALCHEMY_DATABASE_URI=url)
+            engine = create_engine(url, **engine_options(shard_config))
+            install_sqlite_pragmas(engine, shard_config)
+            self._engines[name] = engine
+
+            while len(self._engines) > self.max_open:
+                self._engines.popitem(last=False)
+            return engine
+
+class ShardRouter:
+    """Resolve o shard do mestre atual a partir do catálogo (shard_route) no banco principal"""
+
+    def __init__(self, app):
+        self.config = app.config
+        self.engines = ShardEngines(app.config, app.config['SHARD_MAX_OPEN_ENGINES'])
+        self.route_ttl = app.config['SHARD_ROUTE_CACHE_SECONDS']
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def shard_name(self, master_id):
+        """Shard do mestre (None = banco principal), com cache de SHARD_ROUTE_CACHE_SECONDS"""
+        now = time.monotonic()
+        cached = self._routes.get(master_id)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+
+        # Consulta direta no engine principal: a sessão ORM chamaria o roteamento de novo
+        with db.engine.connect() as connection:
+            name = connection.execute(
+                select(ShardRoute.shard).where(ShardRoute.master_id == master_id)
+            ).scalar()
+        with self._lock:
+            self._routes[master_id] = (name, now + self.route_ttl)
+        return name
+
+    def forget(self, master_id):
+        with self._lock:
+            self._routes.pop(master_id, None)
+
+    def engine_for(self, master_id):
+        if master_id is None:
+            return None
+        name = self.shard_name(master_id)
+        return self.engines.get(name) if name else None
+
+    def current_engine(self):
+        master_id = _scoped_master.get()
+        if master_id is UNSET:
+            master_id = current_master_id() if has_request_context() else None
+        return self.engine_for(master_id)
+
+def init_sharding(app):
+    """Habilita o roteamento das tabelas de mesa para shards por mestre (SHARDING_ENABLED)"""
+    if app.config.get('SHARDING_ENABLED'):
+        app.extensions['sharding'] = ShardRouter(app)
+
+def sharding_router():
+    return current_app.extensions.get('sharding')
+
+def shard_key():
+    """Identifica o banco da mesa atual (para caches indexados por id de linha)"""
+    router = sharding_router()
+    if router is None:
+        return None
+    master_id = _scoped_master.get()
+    if master_id is UNSET:
+        master_id = current_master_id() if has_request_context() else None
+    return router.shard_name(master_id) if master_id is not None else None
+
+@contextmanager
+def master_scope(master_id):
+    """Fixa a mesa usada pelo roteamento fora de uma requisição (threads, comandos)"""
+    token = _scoped_master.set(master_id)
+    try:
+        yield
+    finally:
+        _scoped_master.reset(token)
+
+@event.listens_for(Player, 'after_insert')
+def register_player_login(mapper, connection, player):
+    """Registra no catálogo os logins de jogadores criados em shards"""
+    router = sharding_router()
+    if router is None or not player.player_username or connection.engine.url == db.engine.url:
+        return
+    register_player_logins([(player.player_username, player.master_id)])
+
+@event.listens_for(Player, 'after_update')
+def register_renamed_player_login(mapper, connection, player):
+    if db.inspect(player).attrs.player_username.history.has_changes():
+        register_player_login(mapper, connection, player)
+
+def register_player_logins(entries):
+    """Insere pares (login, mestre) no catálogo, ignorando os já existentes"""
+    with db.engine.begin() as connection:
+        for username, master_id in entries:
+            exists = connection.execute(
+                select(ShardPlayerLogin.master_id)
+                .where(ShardPlayerLogin.player_username == username, ShardPlayerLogin.master_id == master_id)
+            ).first()
+            if not exists:
+                connection.execute(insert(ShardPlayerLogin).values(player_username=username, master_id=master_id))
+
+def player_login_candidates(username):
+    """Jogadores com o login informado: primeiro nos shards indicados pelo catálogo, depois no banco principal.
+
+    Os ids só são únicos dentro de cada banco: quem consome deve remover da
+    sessão (expunge) o candidato recusado antes de pedir o próximo.
+    """
+    router = sharding_router()
+    if router is not None:
+        master_ids = db.session.scalars(
+            select(ShardPlayerLogin.master_id).where(ShardPlayerLogin.player_username == username)
+        ).all()
+        for master_id in master_ids:
+            with master_scope(master_id):
+                player = Player.query.filter_by(player_username=username, master_id=master_id).first()
+            # Entradas antigas do catálogo (jogador removido ou renomeado) custam só uma consulta
+            if player is not None:
+                yield player
+
+    with master_scope(None):
+        players = Player.query.filter_by(player_username=username).all()
+    yield from players
+
+def migrate_shard(connection):
+    """Aplica as migrações pendentes em um shard existente (comandos e inicialização)"""
+    config = migrate.get_config()
+    config.attributes['connection'] = connection
+    with _migration_lock:
+        alembic.command.upgrade(config, 'head')
+    connection.commit()
+
+def create_shard_schema(connection):
+    """Cria o esquema de um shard novo a partir dos modelos e o marca na última revisão.
+
+    Não executa as migrações: é seguro e rápido dentro de uma requisição (cadastro).
+    """
+    db.metadata.create_all(connection)
+    if connection.dialect.name == 'sqlite' and connection.exec_driver_sql(
+        "SELECT sqlite_compileoption_used('ENABLE_FTS5')"
+    ).scalar():
+        for ddl in NOTE_SEARCH_DDL:
+            connection.exec_driver_sql(ddl)
+    MigrationContext.configure(connection).stamp(ScriptDirectory.from_config(migrate.get_config()), 'head')
+    connection.commit()
+
+def shard_revision(connection):
+    """Revisão do esquema do shard (None se o shard ainda não tem esquema)"""
+    return MigrationContext.configure(connection).get_current_revision()
+
+def ensure_shard(router, name, master_id):
+    """Cria/atualiza o esquema do shard e copia a linha do mestre (alvo das chaves estrangeiras)"""
+    engine = router.engines.get(name)
+    if engine.dialect.name == 'postgresql':
+        # No PostgreSQL cada shard é um schema (SHARD_URL com search_path={shard})
+        with engine.begin() as connection:
+            connection.exec_driver_sql(f'CREATE SCHEMA IF NOT EXISTS {engine.dialect.identifier_preparer.quote(name)}')
+
+    with engine.connect() as connection:
+        revision = shard_revision(connection)
+        if revision is None:
+            create_shard_schema(connection)
+        elif revision != ScriptDirectory.from_config(migrate.get_config()).get_current_head():
+            migrate_shard(connection)
+
+    user_table = User.__table__
+    with db.engine.connect() as source:
+        user = source.execute(select(user_table).where(user_table.c.id == master_id)).mappings().first()
+    with engine.begin() as target:
+        if user and not target.execute(select(user_table.c.id).where(user_table.c.id == master_id)).first():
+            target.execute(insert(user_table), [dict(user)])
+    return engine
+
+def assign_shard(master_id, name=None):
+    """Cria o shard de um mestre novo (sem dados) e o registra no catálogo"""
+    router = sharding_router()
+    if router is None:
+        return None
+    name = name or current_app.config['SHARD_NAME_TEMPLATE'].format(master_id=master_id)
+    ensure_shard(router, name, master_id)
+    with db.engine.begin() as connection:
+        connection.execute(insert(ShardRoute).values(master_id=master_id, shard=name))
+    router.forget(master_id)
+    return name
+
+def place_new_master(master_id):
+    """Coloca o mestre recém-criado no seu próprio shard, se SHARD_NEW_MASTERS estiver ativo"""
+    if sharding_router() is not None and current_app.config.get('SHARD_NEW_MASTERS'):
+        return assign_shard(master_id)
+    return None
+
+def copy_rows(source, target, table, master_id):
+    rows = source.execute(select(table).where(table.c.master_id == master_id).order_by(*table.primary_key.columns))
+    copied = 0
+    while True:
+        batch = rows.mappings().fetchmany(COPY_BATCH_SIZE)
+        if not batch:
+            return copied
+        target.execute(insert(table), [dict(row) for row in batch])
+        copied += len(batch)
+
+def count_rows(connection, table, master_id):
+    return connection.execute(select(func.count()).select_from(table).where(table.c.master_id == master_id)).scalar()
+
+def rebalance_master(master_id, name=None, dry_run=False):
+    """Move os dados de um mestre do banco principal para o seu shard.
+
+    Copia as tabelas de mesa (pais antes dos filhos), confere as contagens,
+    registra a rota no catálogo e só então remove as linhas do banco principal.
+    Retorna {tabela: linhas movidas}, ou None se o mestre já está em um shard.
+    """
+    router = sharding_router()
+    if router is None:
+        raise RuntimeError('Sharding desabilitado (SHARDING_ENABLED=1)')
+    if router.shard_name(master_id) is not None:
+        return None
+
+    tables = [db.metadata.tables[name] for name in SHARD_COPY_ORDER]
+    name = name or current_app.config['SHARD_NAME_TEMPLATE'].format(master_id=master_id)
+
+    with db.engine.connect() as source:
+        counts = {table.name: count_rows(source, table, master_id) for table in tables}
+    if dry_run:
+        return counts
+
+    engine = ensure_shard(router, name, master_id)
+    with db.engine.connect() as source, engine.begin() as target:
+        # Restos de uma tentativa anterior interrompida
+        for table in reversed(tables):
+            target.execute(delete(table).where(table.c.master_id == master_id))
+        for table in tables:
+            copied = copy_rows(source, target, table, master_id)
+            if copied != counts[table.name] or count_rows(target, table, master_id) != copied:
+                raise RuntimeError(f'Contagem divergente ao copiar {table.name} do mestre {master_id}')
+
+        usernames = [row[0] for row in target.execute(
+            select(Player.__table__.c.player_username)
+            .where(Player.__table__.c.master_id == master_id, Player.__table__.c.player_username.isnot(None))
+        )]
+
+    register_player_logins([(username, master_id) for username in usernames])
+    with db.engine.begin() as connection:
+        try:
+            connection.execute(insert(ShardRoute).values(master_id=master_id, shard=name))
+        except IntegrityError:
+            raise RuntimeError(f'Mestre {master_id} foi movido por outro processo')
+        for table in reversed(tables):
+            connection.execute(delete(table).where(table.c.master_id == master_id))
+    router.forget(master_id)
+    return counts
+
+def unsharded_masters():
+    """Mestres que ainda estão no banco principal"""
+    routed = select(ShardRoute.master_id)
+    with db.engine.connect() as connection:
+        return list(connection.execute(
+            select(User.id).where(User.id.not_in(routed)).order_by(User.id)
+        ).scalars())
+
+def sharded_masters():
+    """Mestres com shard no catálogo (vazio com sharding desabilitado)"""
+    if sharding_router() is None:
+        return []
+    with db.engine.connect() as connection:
+        return list(connection.execute(select(ShardRoute.master_id).order_by(ShardRoute.master_id)).scalars())
+
+def upgrade_shards(app):
+    """Aplica as migrações pendentes em todos os shards do catálogo"""
+    router = app.extensions.get('sharding')
+    if router is None:
+        return []
+    with app.app_context():
+        with db.engine.connect() as connection:
+            routes = connection.execute(select(ShardRoute.master_id, ShardRoute.shard)).all()
+        for master_id, name in routes:
+            ensure_shard(router, name, master_id)
+    return [name for _, name in routes]
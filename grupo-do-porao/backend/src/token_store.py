@@ -0,0 +1,116 @@
+from flask import current_app
+from src.models.user import db, PasswordResetToken
+from datetime import datetime, timedelta
+import hashlib
+import threading
+import time
+
+# Intervalo mínimo (segundos) entre limpezas de tokens expirados
+SWEEP_INTERVAL = 300
+
+# Limite de tokens mantidos pelo armazenamento em memória
+MAX_MEMORY_TOKENS = 10000
+
+def hash_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+class SQLTokenStore:
+    """Tokens de recuperação no banco, compartilhados entre todos os workers"""
+
+    def __init__(self, sweep_interval=SWEEP_INTERVAL):
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0
+
+    def put(self, token, user_id, ttl):
+        self._maybe_sweep()
+        # Apenas o token mais recente de cada usuário continua válido
+        PasswordResetToken.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+        db.session.add(PasswordResetToken(
+            token_hash=hash_token(token),
+            user_id=user_id,
+            expires_at=datetime.utcnow() + ttl
+        ))
+        db.session.commit()
+
+    def get(self, token):
+        entry = db.session.get(PasswordResetToken, hash_token(token))
+        if not entry:
+            return None
+        return {'user_id': entry.user_id, 'expires_at': entry.expires_at}
+
+    def delete(self, token):
+        PasswordResetToken.query.filter_by(token_hash=hash_token(token)).delete(synchronize_session=False)
+        db.session.commit()
+
+    def sweep(self):
+        """Remove todos os tokens expirados (usa o índice em expires_at)"""
+        removed = PasswordResetToken.query.filter(
+            PasswordResetToken.expires_at < datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return removed
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        if now - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = now
+            self.sweep()
+
+class MemoryTokenStore:
+    """Tokens em memória com expiração, para testes e execução em um único processo"""
+
+    def __init__(self, max_entries=MAX_MEMORY_TOKENS):
+        self.max_entries = max_entries
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def put(self, token, user_id, ttl):
+        with self._lock:
+            self._sweep_locked()
+            for key in [key for key, entry in self._tokens.items() if entry['user_id'] == user_id]:
+                del self._tokens[key]
+            if len(self._tokens) >= self.max_entries:
+                # Descartar o token que expira primeiro para manter a memória limitada
+                oldest = min(self._tokens, key=lambda key: self._tokens[key]['expires_at'])
+                del self._tokens[oldest]
+            self._tokens[hash_token(token)] = {
+                'user_id': user_id,
+                'expires_at': datetime.utcnow() + ttl
+            }
+
+    def get(self, token):
+        with self._lock:
+            entry = self._tokens.get(hash_token(token))
+            return dict(entry) if entry else None
+
+    def delete(self, token):
+        with self._lock:
+            self._tokens.pop(hash_token(token), None)
+
+    def sweep(self):
+        with self._lock:
+            return self._sweep_locked()
+
+    def _sweep_locked(self):
+        now = datetime.utcnow()
+        expired = [key for key, entry in self._tokens.items() if entry['expires_at'] < now]
+        for key in expired:
+            del self._tokens[key]
+        return len(expired)
+
+TOKEN_STORES = {
+    'sql': SQLTokenStore,
+    'memory': MemoryTokenStore
+}
+
+_stores = {}
+
+def get_token_store():
+    """Retorna o armazenamento configurado em RESET_TOKEN_STORE ('sql' ou 'memory')"""
+    kind = current_app.config.get('RESET_TOKEN_STORE', 'sql')
+    if kind not in _stores:
+        _stores[kind] = TOKEN_STORES[kind]()
+    return _stores[kind]
+
+def reset_token_ttl():
+    return timedelta(seconds=current_app.config.get('RESET_TOKEN_TTL_SECONDS', 3600))
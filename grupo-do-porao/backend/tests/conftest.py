@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.app import create_app
+from src.config import TestConfig
+from src.database import upgrade_database
+
+@pytest.fixture
+def app(tmp_path):
+    class Config(TestConfig):
+        # Banco em arquivo: as requisições simultâneas usam conexões diferentes
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        METRICS_ENABLED = False
+        LIVE_SESSION_JOURNAL_DIR = str(tmp_path / 'live_journal')
+        LIVE_SESSION_FLUSH_SECONDS = 3600
+
+    app = create_app(Config)
+    upgrade_database(app)
+    return app
+
+@pytest.fixture
+def master_client(app):
+    client = app.test_client()
+    client.post('/api/auth/register', json={'username': 'mestre', 'email': 'mestre@example.com', 'password': 'senha'})
+    return client
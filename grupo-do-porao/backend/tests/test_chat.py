@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy import event
+
+from src.chat import chat_buffers
+from src.models.user import db, ChatMessage
+
+@pytest.fixture(autouse=True)
+def clear_chat_buffers():
+    yield
+    chat_buffers.clear()
+
+def insert_from_other_worker(app, content):
+    # Mensagem gravada por outro processo: não passa pelo buffer deste
+    with app.app_context():
+        db.session.add(ChatMessage(master_id=1, author='Outro', kind='message', content=content))
+        db.session.commit()
+
+def count_chat_queries(app, callback):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'chat_message' in statement:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        callback()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return len(statements)
+
+def test_single_worker_replay_is_served_from_memory(app, master_client):
+    first = master_client.post('/api/chat/messages', json={'content': 'oi'}).get_json()['message']
+    master_client.get('/api/chat/messages')
+
+    def replay():
+        response = master_client.get(f"/api/chat/messages?after={first['id'] - 1}")
+        assert [message['content'] for message in response.get_json()['messages']] == ['oi']
+
+    assert count_chat_queries(app, replay) == 0
+
+def test_multiple_workers_reload_buffer_with_messages_from_others(app, master_client):
+    app.config['WORKER_PROCESSES'] = 2
+    first = master_client.post('/api/chat/messages', json={'content': 'oi'}).get_json()['message']
+    master_client.get('/api/chat/messages')
+
+    insert_from_other_worker(app, 'de outro worker')
+
+    response = master_client.get(f"/api/chat/messages?after={first['id']}")
+    assert [message['content'] for message in response.get_json()['messages']] == ['de outro worker']
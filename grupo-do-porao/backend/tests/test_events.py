@@ -0,0 +1,19 @@
+from src.events import broker
+
+def test_stream_limit_returns_503(app, master_client):
+    app.config['EVENT_STREAM_MAX_CLIENTS'] = 2
+    streams = [master_client.get('/api/events/stream') for _ in range(2)]
+    try:
+        assert [stream.status_code for stream in streams] == [200, 200]
+        response = master_client.get('/api/events/stream')
+        assert response.status_code == 503
+        assert response.headers['Retry-After']
+    finally:
+        for stream in reversed(streams):
+            stream.close()
+
+    # Streams encerrados liberam as vagas
+    assert broker.total_subscribers() == 0
+    response = master_client.get('/api/events/stream')
+    assert response.status_code == 200
+    response.close()
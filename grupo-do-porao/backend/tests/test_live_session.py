@@ -0,0 +1,56 @@
+import pytest
+
+from src.live_session import live_sessions, recover_live_sessions
+from src.models.user import db, Player
+
+@pytest.fixture(autouse=True)
+def clear_live_sessions():
+    yield
+    live_sessions._sessions.clear()
+
+def create_player(client, name):
+    return client.post('/api/players', json={'name': name}).get_json()['player']['id']
+
+def player_health(app, player_id):
+    with app.app_context():
+        return db.session.get(Player, player_id).health
+
+def test_startup_recovery_applies_pending_journal(app, master_client):
+    player_id = create_player(master_client, 'Ana')
+    assert master_client.post('/api/live/start').status_code == 200
+    master_client.put(f'/api/players/{player_id}/status', json={'health': 20})
+
+    # Queda do processo: a sessão em memória se perde, o journal fica no disco
+    live_sessions._sessions.clear()
+    recover_live_sessions(app)
+
+    assert player_health(app, player_id) == 20
+
+def test_recovery_does_not_overwrite_newer_writes(app, master_client):
+    changed_id = create_player(master_client, 'Ana')
+    untouched_id = create_player(master_client, 'Bia')
+    master_client.post('/api/live/start')
+    master_client.put(f'/api/players/{changed_id}/status', json={'health': 20})
+    master_client.put(f'/api/players/{untouched_id}/status', json={'health': 30})
+
+    live_sessions._sessions.clear()
+    # Escrita direta depois da queda, antes da recuperação
+    master_client.put(f'/api/players/{changed_id}/status', json={'health': 90})
+
+    assert master_client.post('/api/live/start').get_json()['recovered'] == 1
+    assert player_health(app, changed_id) == 90
+    assert player_health(app, untouched_id) == 30
+
+def test_recovery_after_flush_and_direct_edits(app, master_client):
+    player_id = create_player(master_client, 'Ana')
+    master_client.post('/api/live/start')
+    master_client.post(f'/api/players/{player_id}/items', json={'name': 'Espada'})
+    master_client.put(f'/api/players/{player_id}', json={'name': 'Ana Clara'})
+    master_client.put(f'/api/players/{player_id}/status', json={'health': 55})
+    master_client.post('/api/live/flush')
+    master_client.put(f'/api/players/{player_id}/status', json={'health': 44})
+
+    live_sessions._sessions.clear()
+    recover_live_sessions(app)
+
+    assert player_health(app, player_id) == 44
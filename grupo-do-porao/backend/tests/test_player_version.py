@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event
+
+from src.models.user import db, Player
+
+def create_player(client, **fields):
+    response = client.post('/api/players', json=dict({'name': 'Ana'}, **fields))
+    assert response.status_code == 201
+    return response.get_json()['player']['id']
+
+def test_concurrent_status_updates_do_not_conflict(app, master_client):
+    player_id = create_player(master_client)
+    with master_client.session_transaction() as session:
+        cookie_session = dict(session)
+
+    def update_status(health):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session.update(cookie_session)
+        return client.put(f'/api/players/{player_id}/status', json={'health': health}).status_code
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        statuses = list(executor.map(update_status, range(40)))
+
+    assert statuses == [200] * 40
+    with app.app_context():
+        # Cada atualização incrementa a versão usada pelo cache de respostas
+        assert db.session.get(Player, player_id).version == 41
+
+def test_status_update_bumps_version(app, master_client):
+    player_id = create_player(master_client)
+    etag = master_client.get(f'/api/players/{player_id}').headers['ETag']
+
+    response = master_client.put(f'/api/players/{player_id}/status', json={'mana': 150})
+    assert response.status_code == 200
+    assert response.get_json()['player']['mana'] == 100
+
+    response = master_client.get(f'/api/players/{player_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['player']['mana'] == 100
+
+def test_full_update_with_stale_version_returns_conflict(app, master_client):
+    player_id = create_player(master_client)
+
+    def concurrent_edit(mapper, connection, player):
+        # Outra requisição grava o jogador entre a leitura e o UPDATE desta
+        table = Player.__table__
+        connection.execute(table.update().where(table.c.id == player.id).values(version=table.c.version + 1))
+
+    event.listen(Player, 'before_update', concurrent_edit)
+    try:
+        response = master_client.put(f'/api/players/{player_id}', json={'name': 'Bia'})
+    finally:
+        event.remove(Player, 'before_update', concurrent_edit)
+
+    assert response.status_code == 409
+    assert master_client.get(f'/api/players/{player_id}').get_json()['player']['name'] == 'Ana'
@@ -0,0 +1,23 @@
+from sqlalchemy import text
+
+from src.sharding import ShardEngines
+
+def test_evicted_engine_keeps_its_pool(app, tmp_path):
+    config = dict(app.config, SHARD_URL=f"sqlite:///{tmp_path}/{{shard}}.db")
+    engines = ShardEngines(config, max_open=1)
+
+    first = engines.get('a')
+    with first.connect() as connection:
+        connection.execute(text('CREATE TABLE t (x INTEGER)'))
+        connection.commit()
+        pooled = connection.connection.dbapi_connection
+
+    # Outro shard tira o primeiro do LRU entre duas transações de uma sessão no shard
+    assert engines.get('b') is not first
+
+    with first.connect() as connection:
+        assert connection.connection.dbapi_connection is pooled
+        connection.execute(text('INSERT INTO t VALUES (1)'))
+        assert connection.execute(text('SELECT count(*) FROM t')).scalar() == 1
+
+    assert engines.get('a') is not first